@@ -0,0 +1,98 @@
+"""Compare plain-string and block-compressed session contexts.
+
+Reports memory footprint, build time and slice/chunk/search latency for a synthetic
+context of ``--size-mb`` megabytes::
+
+    python benchmarks/bench_context_storage.py --size-mb 16 --block-chars 65536
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from rlm_mcp.context_store import CompressedText
+
+_WORDS = (
+    "the quick brown fox jumps over lazy dog server session context token budget "
+    "guardrail sandbox snippet worker document chunk index search result answer"
+).split()
+
+
+def make_text(size_chars: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    line_no = 0
+    while total < size_chars:
+        line = f"{line_no:08d} " + " ".join(rng.choice(_WORDS) for _ in range(12)) + "\n"
+        lines.append(line)
+        total += len(line)
+        line_no += 1
+    return "".join(lines)[:size_chars]
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _time_slices(source: object, starts: list[int], width: int) -> list[float]:
+    samples = []
+    for start in starts:
+        begin = time.perf_counter()
+        source[start : start + width]  # type: ignore[index]
+        samples.append((time.perf_counter() - begin) * 1e6)
+    return samples
+
+
+def _row(label: str, samples: list[float]) -> str:
+    return f"  {label:<22} avg {sum(samples) / len(samples):9.1f} us   p95 {_percentile(samples, 0.95):9.1f} us"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=16.0)
+    parser.add_argument("--block-chars", type=int, default=65_536)
+    parser.add_argument("--slice-chars", type=int, default=4_000)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    text = make_text(int(args.size_mb * 1024 * 1024))
+    rng = random.Random(1)
+    starts = [rng.randrange(0, max(1, len(text) - args.slice_chars)) for _ in range(args.reads)]
+    needle = text[-40:-20]
+
+    print(f"context: {len(text):,} chars, slices of {args.slice_chars:,} chars, {args.reads} reads")
+    print(f"plain str: {sys.getsizeof(text):,} bytes")
+    print(_row("slice", _time_slices(text, starts, args.slice_chars)))
+    begin = time.perf_counter()
+    text.find(needle)
+    print(f"  {'find (near end)':<22} {(time.perf_counter() - begin) * 1000:9.2f} ms")
+
+    for codec in ("zlib", "lzma"):
+        begin = time.perf_counter()
+        blocks = CompressedText.from_text(text, codec=codec, block_chars=args.block_chars)
+        build_ms = (time.perf_counter() - begin) * 1000
+        print(
+            f"{codec}: {blocks.compressed_bytes:,} bytes in {blocks.block_count} blocks "
+            f"({blocks.compressed_bytes / sys.getsizeof(text):.1%} of plain), built in {build_ms:.0f} ms"
+        )
+        print(_row("slice, cold cache", _time_slices(blocks, starts, args.slice_chars)))
+        # Reads clustered in one region are what the LRU block cache is for.
+        local = [start % (args.block_chars * 4) for start in starts]
+        _time_slices(blocks, local, args.slice_chars)
+        print(_row("slice, warm cache", _time_slices(blocks, local, args.slice_chars)))
+        begin = time.perf_counter()
+        for _ in blocks.iter_chunks(args.block_chars):
+            pass
+        print(f"  {'full chunk scan':<22} {(time.perf_counter() - begin) * 1000:9.2f} ms")
+        begin = time.perf_counter()
+        assert blocks.find(needle) == text.find(needle)
+        print(f"  {'find (near end)':<22} {(time.perf_counter() - begin) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Compare the sandbox ``rlm_tools`` helpers against the per-line loops snippets write by hand.
+
+Each helper runs on a synthetic log of ``--lines`` lines next to a naive equivalent; results are
+checked for equality before timings are reported::
+
+    python benchmarks/bench_rlm_tools.py --lines 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Callable
+
+from rlm_mcp import rlm_tools
+
+_LEVELS = ("INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR")
+_WORDS = (
+    "request served cache miss upstream timeout retry user session token budget worker queue "
+    "disk latency index shard replica commit"
+).split()
+_PATTERNS = ["ERROR", "WARN", "timeout", r"user=\d+", "cache miss"]
+
+
+def make_log(lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(
+        f"2024-01-{1 + n * 28 // lines:02d}T{n % 86400 // 3600:02d}:00 {rng.choice(_LEVELS)} "
+        f"user={rng.randrange(1000)} " + " ".join(rng.choice(_WORDS) for _ in range(8)) + "\n"
+        for n in range(lines)
+    )
+
+
+def naive_grep(text: str, pattern: str) -> list[tuple[int, str]]:
+    regex = re.compile(pattern)
+    return [(number, line) for number, line in enumerate(text.split("\n")[:-1], 1) if regex.search(line)]
+
+
+def naive_count(text: str, patterns: list[str]) -> dict[str, int]:
+    counts = dict.fromkeys(patterns, 0)
+    compiled = [(pattern, re.compile(pattern)) for pattern in patterns]
+    for line in text.splitlines():
+        for pattern, regex in compiled:
+            counts[pattern] += len(regex.findall(line))
+    return counts
+
+
+def naive_top(text: str, k: int) -> list[tuple[str, int]]:
+    counts: dict[str, int] = {}
+    for line in text.splitlines():
+        for token in re.findall(r"\w+", line.lower()):
+            counts[token] = counts.get(token, 0) + 1
+    return Counter(counts).most_common(k)
+
+
+def naive_around(text: str, pattern: str, width: int) -> int:
+    regex = re.compile(pattern)
+    windows = 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        for match in regex.finditer(line):
+            text[max(0, offset + match.start() - width) : offset + match.end() + width]
+            windows += 1
+        offset += len(line)
+    return windows
+
+
+def naive_chunks(text: str, max_chars: int) -> list[str]:
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _timed(run: Callable[[], Any]) -> tuple[Any, float]:
+    begin = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - begin) * 1000
+
+
+def _compare(label: str, naive: Callable[[], Any], tools: Callable[[], Any], same: Callable[[Any, Any], bool]) -> None:
+    expected, naive_ms = _timed(naive)
+    actual, tools_ms = _timed(tools)
+    assert same(expected, actual), f"{label}: results differ"
+    print(f"  {label:<16} naive {naive_ms:9.1f} ms   rlm_tools {tools_ms:9.1f} ms   {naive_ms / max(tools_ms, 1e-6):6.1f}x")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--chunk-chars", type=int, default=64_000)
+    args = parser.parse_args(argv)
+
+    text = make_log(args.lines)
+    print(f"log: {args.lines:,} lines, {len(text):,} chars")
+    _compare("grep", lambda: naive_grep(text, "ERROR"), lambda: rlm_tools.grep(text, "ERROR"), lambda a, b: a == b)
+    _compare(
+        "count_patterns",
+        lambda: naive_count(text, _PATTERNS),
+        lambda: rlm_tools.count_patterns(text, _PATTERNS),
+        lambda a, b: a == b,
+    )
+    _compare(
+        "top_tokens",
+        lambda: naive_top(text, 20),
+        lambda: rlm_tools.top_tokens(text, 20),
+        lambda a, b: dict(a) == dict(b),
+    )
+    # Windows are merged by rlm_tools, so only check that it found some and never more than naive.
+    _compare(
+        "around",
+        lambda: naive_around(text, "timeout", 100),
+        lambda: rlm_tools.around(text, "timeout", width=100),
+        lambda a, b: 0 < len(b) <= a,
+    )
+    _compare(
+        "chunk_by_size",
+        lambda: naive_chunks(text, args.chunk_chars),
+        lambda: rlm_tools.chunk_by_size(text, args.chunk_chars),
+        lambda a, b: "".join(a) == "".join(b) == text,
+    )
+
+
+if __name__ == "__main__":
+    main()
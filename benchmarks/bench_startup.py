@@ -0,0 +1,121 @@
+"""Measure cold start of the stdio server the way an MCP client sees it.
+
+Each run spawns a fresh server process and times the first ``tools/list`` response and the first
+``rlm_run_repl`` result after spawn. The medians are checked against a regression budget and the
+script exits non-zero when either is over::
+
+    python benchmarks/bench_startup.py --runs 5 --budget-tools-list-ms 1500 --budget-first-run-ms 2500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+_PROTOCOL_VERSION = "2025-03-26"
+
+
+class _StdioClient:
+    def __init__(self, command: list[str]) -> None:
+        env = dict(os.environ)
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+            bufsize=1,
+        )
+        self._next_id = 0
+
+    def request(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        self._next_id += 1
+        self._send({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {}})
+        while True:
+            line = self.process.stdout.readline()  # type: ignore[union-attr]
+            if not line:
+                raise RuntimeError(f"server exited before answering {method}")
+            message = json.loads(line)
+            if message.get("id") == self._next_id:
+                if "error" in message:
+                    raise RuntimeError(f"{method} failed: {message['error']}")
+                return message["result"]
+
+    def notify(self, method: str) -> None:
+        self._send({"jsonrpc": "2.0", "method": method})
+
+    def call_tool(self, name: str, params: dict[str, Any]) -> dict[str, Any]:
+        result = self.request("tools/call", {"name": name, "arguments": {"params": params}})
+        payload = json.loads(result["content"][0]["text"])
+        if not payload.get("ok"):
+            raise RuntimeError(f"{name} failed: {payload.get('error')}")
+        return payload["data"]
+
+    def close(self) -> None:
+        self.process.stdin.close()  # type: ignore[union-attr]
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def _send(self, message: dict[str, Any]) -> None:
+        self.process.stdin.write(json.dumps(message) + "\n")  # type: ignore[union-attr]
+        self.process.stdin.flush()  # type: ignore[union-attr]
+
+
+def measure_once(command: list[str]) -> dict[str, float]:
+    begin = time.perf_counter()
+    client = _StdioClient(command)
+    try:
+        client.request(
+            "initialize",
+            {"protocolVersion": _PROTOCOL_VERSION, "capabilities": {}, "clientInfo": {"name": "bench", "version": "0"}},
+        )
+        client.notify("notifications/initialized")
+        tools = client.request("tools/list")["tools"]
+        tools_list_ms = (time.perf_counter() - begin) * 1000
+        if not any(tool["name"] == "rlm_run_repl" for tool in tools):
+            raise RuntimeError("rlm_run_repl is not listed")
+        session_id = client.call_tool("rlm_init_context", {"context_text": "alpha beta gamma"})["session_id"]
+        out = client.call_tool("rlm_run_repl", {"session_id": session_id, "code": "print(len(context.split()))"})
+        first_run_ms = (time.perf_counter() - begin) * 1000
+        if out["stdout"].strip() != "3":
+            raise RuntimeError(f"unexpected rlm_run_repl output: {out['stdout']!r}")
+    finally:
+        client.close()
+    return {"tools_list_ms": tools_list_ms, "first_run_ms": first_run_ms}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--server-command", default=None, help="default: this Python running rlm_mcp.server")
+    parser.add_argument("--budget-tools-list-ms", type=float, default=1500.0)
+    parser.add_argument("--budget-first-run-ms", type=float, default=2500.0)
+    args = parser.parse_args(argv)
+    command = shlex.split(args.server_command) if args.server_command else [sys.executable, "-m", "rlm_mcp.server"]
+
+    samples = [measure_once(command) for _ in range(max(1, args.runs))]
+    over_budget = False
+    for key, budget in (("tools_list_ms", args.budget_tools_list_ms), ("first_run_ms", args.budget_first_run_ms)):
+        values = [sample[key] for sample in samples]
+        median = statistics.median(values)
+        verdict = "ok" if median <= budget else "OVER BUDGET"
+        over_budget |= median > budget
+        print(f"  {key:<14} median {median:8.1f} ms   min {min(values):8.1f}   max {max(values):8.1f}   budget {budget:8.1f}  {verdict}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
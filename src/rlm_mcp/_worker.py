@@ -0,0 +1,1015 @@
+"""Sandbox worker: executes one snippet payload in its own interpreter.
+
+It runs as ``python -I -S`` (from cached bytecode, or as source in a container), in a
+subinterpreter, or under a sandbox daemon, so it must not import rlm_mcp. It reads a JSON payload
+on stdin, applies resource limits, runs the snippet and writes a JSON result to stdout.
+"""
+
+import array
+import base64
+import builtins
+import collections
+import io
+import json
+import marshal
+import mmap
+import os
+import resource
+import stat
+import sys
+import time
+import types
+from contextlib import redirect_stderr, redirect_stdout
+
+_INLINE_BUFFER_BYTES = 4096
+
+
+class _Buffers:
+    # Buffer-protocol values cross the pipe as descriptors into files under a shared-memory
+    # directory; small buffers, and all of them when the files are unreachable, go inline.
+    def __init__(self, spec):
+        spec = spec or {}
+        directory = spec.get("dir")
+        self.in_path = _arena_path(directory, spec.get("in"), ".in")
+        self.out_path = _arena_path(directory, spec.get("out"), ".out")
+        self._in_map = None
+        self._out_fd = None
+        self._out_capacity = 0
+        self._out_size = 0
+
+    def load(self, descriptor):
+        if "b64" in descriptor:
+            return _make_buffer(descriptor, base64.b64decode(descriptor["b64"]))
+        if self._in_map is None:
+            if self.in_path is None:
+                raise ValueError("buffer descriptor without a usable arena")
+            fd = os.open(self.in_path, os.O_RDONLY | os.O_NOFOLLOW)
+            try:
+                self._in_map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+        start = descriptor["offset"]
+        with memoryview(self._in_map)[start:start + descriptor["size"]] as view:
+            return _make_buffer(descriptor, view)
+
+    def dump(self, value):
+        if isinstance(value, array.array):
+            descriptor, view = {"kind": "array", "typecode": value.typecode}, memoryview(value).cast("B")
+        else:
+            descriptor, view = {"kind": type(value).__name__}, memoryview(value)
+        offset = self._place(view) if view.nbytes >= _INLINE_BUFFER_BYTES else None
+        if offset is not None:
+            descriptor["offset"] = offset
+            descriptor["size"] = view.nbytes
+        else:
+            descriptor["b64"] = base64.b64encode(view).decode("ascii")
+        return descriptor
+
+    def _place(self, view):
+        # The service pre-sized the out file sparsely; RLIMIT_FSIZE forbids growing it, so each
+        # buffer is copied in through its own page-aligned mapping.
+        if self._out_fd is None:
+            if not self.out_path:
+                return None
+            try:
+                self._out_fd = os.open(self.out_path, os.O_RDWR | os.O_NOFOLLOW)
+                stats = os.fstat(self._out_fd)
+                if not stat.S_ISREG(stats.st_mode) or stats.st_nlink != 1:
+                    raise OSError("buffer arena is not a private regular file")
+                self._out_capacity = stats.st_size
+            except OSError:
+                # Read-only jails cannot write to the service's directory.
+                self.out_path = None
+                return None
+        granularity = mmap.ALLOCATIONGRANULARITY
+        offset = -(-self._out_size // granularity) * granularity
+        if offset + view.nbytes > self._out_capacity:
+            return None
+        try:
+            # Touching pages of a full tmpfs would raise SIGBUS, so check for room first.
+            stats = os.statvfs(os.path.dirname(self.out_path))
+            if stats.f_bavail * stats.f_frsize < view.nbytes:
+                return None
+            with mmap.mmap(self._out_fd, view.nbytes, offset=offset) as target:
+                target[:] = view
+        except (OSError, ValueError):
+            return None
+        self._out_size = offset + view.nbytes
+        return offset
+
+    def close(self):
+        if self._in_map is not None:
+            self._in_map.close()
+        if self._out_fd is not None:
+            os.close(self._out_fd)
+
+
+def _arena_path(directory, path, suffix):
+    # Only the executor's own arena files are mapped: rlm-buf-*.in/.out directly inside its
+    # shared-memory directory. Anything else is ignored and its buffers go inline.
+    if not isinstance(directory, str) or not isinstance(path, str) or not directory:
+        return None
+    name = os.path.basename(path)
+    if not name.startswith("rlm-buf-") or not name.endswith(suffix):
+        return None
+    if os.path.realpath(os.path.dirname(path)) != os.path.realpath(directory):
+        return None
+    return path
+
+
+def _make_buffer(descriptor, data):
+    if descriptor.get("kind") == "array":
+        values = array.array(descriptor["typecode"])
+        values.frombytes(data)
+        return values
+    if descriptor.get("kind") == "bytearray":
+        return bytearray(data)
+    return bytes(data)
+
+
+def _encode(value, buffers):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, list):
+        return [_encode(v, buffers) for v in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v, buffers) for v in value]}
+    if isinstance(value, set):
+        return {"__set__": [_encode(v, buffers) for v in value]}
+    if isinstance(value, dict):
+        return {"__dict__": [[str(k), _encode(v, buffers)] for k, v in value.items()]}
+    if isinstance(value, (bytes, bytearray, array.array)):
+        return {"__buffer__": buffers.dump(value)}
+    return {"__repr__": repr(value)}
+
+
+def _decode(value, buffers):
+    if isinstance(value, list):
+        return [_decode(v, buffers) for v in value]
+    if isinstance(value, dict):
+        if "__tuple__" in value:
+            return tuple(_decode(v, buffers) for v in value["__tuple__"])
+        if "__set__" in value:
+            return set(_decode(v, buffers) for v in value["__set__"])
+        if "__dict__" in value:
+            return {k: _decode(v, buffers) for k, v in value["__dict__"]}
+        if "__buffer__" in value:
+            return buffers.load(value["__buffer__"])
+        if "__repr__" in value:
+            return value["__repr__"]
+    return value
+
+
+def _apply_limits(payload):
+    cpu_seconds = max(1, int(payload.get("cpu_seconds", 2)))
+    memory_limit_bytes = int(payload.get("memory_limit_bytes", 268435456))
+    max_open_files = max(16, int(payload.get("max_open_files", 32)))
+    max_file_size_bytes = int(payload.get("max_file_size_bytes", 0))
+
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    if hasattr(resource, "RLIMIT_AS"):
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    if hasattr(resource, "RLIMIT_NOFILE"):
+        resource.setrlimit(resource.RLIMIT_NOFILE, (max_open_files, max_open_files))
+    if hasattr(resource, "RLIMIT_FSIZE"):
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_size_bytes, max_file_size_bytes))
+
+
+_MS_RDONLY = 0x1
+_MS_NOSUID = 0x2
+_MS_NODEV = 0x4
+_MS_NOEXEC = 0x8
+_MS_REMOUNT = 0x20
+_MS_NOATIME = 0x400
+_MS_NODIRATIME = 0x800
+_MS_BIND = 0x1000
+_MS_RELATIME = 0x200000
+_MS_STRICTATIME = 0x1000000
+
+# Syscalls refused with EPERM inside the namespace jail, by machine.
+_SECCOMP_DENYLIST = {
+    "x86_64": (0xC000003E, (
+        41, 42, 101, 103, 135, 155, 161, 163, 165, 166, 167, 168, 169, 175, 176, 246, 248, 249, 250,
+        272, 298, 304, 308, 310, 311, 313, 321, 323, 428, 429, 430, 431, 432, 442,
+    )),
+    "aarch64": (0xC00000B7, (
+        39, 40, 41, 51, 89, 92, 97, 104, 105, 106, 116, 117, 142, 198, 203, 217, 218, 219, 224, 225,
+        241, 265, 268, 270, 271, 273, 280, 282, 428, 429, 430, 431, 432, 442,
+    )),
+}
+
+
+def _libc_call(libc, name, *args):
+    import ctypes
+
+    if getattr(libc, name)(*args) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{name} failed: {os.strerror(errno)}")
+
+
+def _remount_read_only(libc, mount_point):
+    st = os.statvfs(mount_point)
+    flags = _MS_REMOUNT | _MS_BIND | _MS_RDONLY
+    flags |= st.f_flag & (_MS_NOSUID | _MS_NODEV | _MS_NOEXEC | _MS_NODIRATIME)
+    if st.f_flag & os.ST_NOATIME:
+        flags |= _MS_NOATIME
+    elif st.f_flag & os.ST_RELATIME:
+        flags |= _MS_RELATIME
+    else:
+        flags |= _MS_STRICTATIME
+    _libc_call(libc, "mount", None, mount_point.encode(), None, flags, None)
+
+
+def _install_seccomp_filter(libc):
+    import ctypes
+    import struct
+
+    entry = _SECCOMP_DENYLIST.get(os.uname().machine)
+    if entry is None:
+        return False
+    arch, denied = entry
+    deny = 0x00050000 | 1  # SECCOMP_RET_ERRNO | EPERM
+    allow = 0x7FFF0000
+    program = [
+        (0x20, 0, 0, 4),  # ld [arch]
+        (0x15, 1, 0, arch),  # jeq arch
+        (0x06, 0, 0, deny),
+        (0x20, 0, 0, 0),  # ld [nr]
+        (0x35, 0, 1, 0x40000000),  # jge x32 syscall range
+        (0x06, 0, 0, deny),
+    ]
+    for nr in denied:
+        program.append((0x15, 0, 1, nr))
+        program.append((0x06, 0, 0, deny))
+    program.append((0x06, 0, 0, allow))
+
+    filters = ctypes.create_string_buffer(b"".join(struct.pack("HBBI", *op) for op in program))
+
+    class _SockFprog(ctypes.Structure):
+        _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_void_p)]
+
+    fprog = _SockFprog(len(program), ctypes.cast(filters, ctypes.c_void_p))
+    _libc_call(libc, "prctl", 38, 1, 0, 0, 0)  # PR_SET_NO_NEW_PRIVS
+    _libc_call(libc, "prctl", 22, 2, ctypes.byref(fprog), 0, 0)  # PR_SET_SECCOMP, SECCOMP_MODE_FILTER
+    return True
+
+
+def _enter_jail(jail):
+    # Runs as root of a fresh user+mount+net+pid namespace created by `unshare`.
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mount.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_void_p]
+    with open("/proc/self/mountinfo", "r", encoding="utf-8") as handle:
+        mount_points = [
+            line.split()[4].encode().decode("unicode_escape") for line in handle if line.strip()
+        ]
+    _remount_read_only(libc, "/")
+    for mount_point in mount_points:
+        if mount_point not in {"/", "/proc"}:
+            try:
+                _remount_read_only(libc, mount_point)
+            except OSError:
+                pass
+    tmpfs_options = f"size={int(jail.get('tmpfs_size_mb', 32))}m,mode=1777".encode()
+    _libc_call(
+        libc, "mount", b"tmpfs", b"/tmp", b"tmpfs", _MS_NOSUID | _MS_NODEV | _MS_NOEXEC, tmpfs_options
+    )
+    if jail.get("seccomp", True):
+        _install_seccomp_filter(libc)
+
+
+def _build_safe_builtins(allowed_import_roots):
+    safe = {
+        "abs": builtins.abs,
+        "all": builtins.all,
+        "any": builtins.any,
+        "bool": builtins.bool,
+        "bytearray": builtins.bytearray,
+        "bytes": builtins.bytes,
+        "dict": builtins.dict,
+        "enumerate": builtins.enumerate,
+        "Exception": builtins.Exception,
+        "float": builtins.float,
+        "ImportError": builtins.ImportError,
+        "int": builtins.int,
+        "isinstance": builtins.isinstance,
+        "len": builtins.len,
+        "list": builtins.list,
+        "max": builtins.max,
+        "min": builtins.min,
+        "ModuleNotFoundError": builtins.ModuleNotFoundError,
+        "print": builtins.print,
+        "range": builtins.range,
+        "set": builtins.set,
+        "sorted": builtins.sorted,
+        "str": builtins.str,
+        "sum": builtins.sum,
+        "tuple": builtins.tuple,
+        "zip": builtins.zip,
+    }
+
+    def guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+        root = name.split(".")[0]
+        if root not in allowed_import_roots:
+            raise ImportError(f"import '{name}' is blocked by sandbox policy")
+        if root == "rlm_tools":
+            _install_rlm_tools()
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    safe["__import__"] = guarded_import
+    return safe
+
+
+# Replaced with the source of rlm_mcp/rlm_tools.py when the service assembles the worker.
+_RLM_TOOLS_SOURCE = None
+
+
+def _install_rlm_tools():
+    # Built on first import only, so snippets that never use it do not pay for compiling it.
+    if "rlm_tools" not in sys.modules:
+        module = types.ModuleType("rlm_tools")
+        exec(compile(_RLM_TOOLS_SOURCE, "<rlm-tools>", "exec"), module.__dict__)
+        sys.modules["rlm_tools"] = module
+
+
+def _load_code(payload):
+    blob = payload.get("code_object")
+    if blob and payload.get("code_cache_tag") == sys.implementation.cache_tag:
+        return marshal.loads(base64.b64decode(blob))
+    return payload.get("code", "")
+
+
+# Source of the `docs` sequence. It is executed in its own namespace holding only safe
+# builtins, so snippets cannot reach worker globals through its methods.
+_DOCS_SOURCE = '''
+class Document:
+    __slots__ = ("_source", "_start", "_end", "index", "id", "metadata")
+
+    def __init__(self, source, start, end, index, doc_id, metadata):
+        self._source = source
+        self._start = start
+        self._end = end
+        self.index = index
+        self.id = doc_id
+        self.metadata = metadata
+
+    @property
+    def text(self):
+        return self._source[self._start:self._end]
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __repr__(self):
+        return "Document(id=%r, chars=%d)" % (self.id, self._end - self._start)
+
+
+class Documents:
+    def __init__(self, source, ids, starts, ends, metadata, positions=None):
+        self._source = source
+        self._ids = ids
+        self._starts = starts
+        self._ends = ends
+        self._metadata = metadata
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            document = self.get(key)
+            if document is None:
+                raise KeyError(key)
+            return document
+        if isinstance(key, slice):
+            picked = range(len(self._ids))[key]
+            return Documents(
+                self._source,
+                [self._ids[i] for i in picked],
+                [self._starts[i] for i in picked],
+                [self._ends[i] for i in picked],
+                [self._metadata[i] for i in picked],
+            )
+        return self._document(range(len(self._ids))[key])
+
+    def __iter__(self):
+        for position in range(len(self._ids)):
+            yield self._document(position)
+
+    def get(self, doc_id, default=None):
+        if self._positions is None:
+            self._positions = {value: position for position, value in enumerate(self._ids)}
+        position = self._positions.get(doc_id)
+        return default if position is None else self._document(position)
+
+    def ids(self):
+        return list(self._ids)
+
+    def batch(self, size):
+        for start in range(0, len(self._ids), max(1, size)):
+            yield self[start:start + size]
+
+    def _document(self, position):
+        return Document(
+            self._source,
+            self._starts[position],
+            self._ends[position],
+            position,
+            self._ids[position],
+            self._metadata[position],
+        )
+
+    def __repr__(self):
+        return "<docs: %d documents>" % len(self._ids)
+'''
+_DOCS_CODE = compile(_DOCS_SOURCE, "<rlm-docs>", "exec")
+
+_DEDUP_SOURCE = '''
+class NearDuplicates:
+    def __init__(self, source, starts, ends, representative):
+        self._source = source
+        self._starts = starts
+        self._ends = ends
+        self._representative = representative
+
+    def __len__(self):
+        return len(self._starts)
+
+    def chunk(self, index):
+        return self._source[self._starts[index]:self._ends[index]]
+
+    def representative(self, index):
+        return self._representative[index]
+
+    def representatives(self):
+        return [index for index, rep in enumerate(self._representative) if index == rep]
+
+    def distinct(self):
+        for index in self.representatives():
+            yield index, self.chunk(index)
+
+    def members(self, index):
+        rep = self._representative[index]
+        return [other for other, value in enumerate(self._representative) if value == rep]
+
+    def clusters(self, min_size=2):
+        groups = {}
+        for index, rep in enumerate(self._representative):
+            groups.setdefault(rep, []).append(index)
+        return [members for members in groups.values() if len(members) >= min_size]
+
+    def expand(self, results):
+        return [results[rep] for rep in self._representative]
+
+    def __repr__(self):
+        return "<dedup: %d chunks, %d distinct>" % (len(self._starts), len(self.representatives()))
+'''
+_DEDUP_CODE = compile(_DEDUP_SOURCE, "<rlm-dedup>", "exec")
+
+_OUTLINE_SOURCE = '''
+class Section:
+    __slots__ = ("_outline", "index")
+
+    def __init__(self, outline, index):
+        self._outline = outline
+        self.index = index
+
+    @property
+    def title(self):
+        return self._outline._titles[self.index]
+
+    @property
+    def kind(self):
+        return self._outline._kinds[self.index]
+
+    @property
+    def level(self):
+        return self._outline._levels[self.index]
+
+    @property
+    def start(self):
+        return self._outline._starts[self.index]
+
+    @property
+    def end(self):
+        return self._outline._ends[self.index]
+
+    @property
+    def text(self):
+        return self._outline._source[self.start:self.end]
+
+    @property
+    def parent(self):
+        parent = self._outline._parents[self.index]
+        return None if parent == -1 else Section(self._outline, parent)
+
+    @property
+    def children(self):
+        return [Section(self._outline, child) for child in self._outline._children(self.index)]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return "Section(%s %r, chars=%d)" % (self.kind, self.title, self.end - self.start)
+
+
+class Outline:
+    def __init__(self, source, fmt, starts, ends, parents, levels, kinds, titles):
+        self._source = source
+        self.format = fmt
+        self._starts = starts
+        self._ends = ends
+        self._parents = parents
+        self._levels = levels
+        self._kinds = kinds
+        self._titles = titles
+        self._child_lists = None
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        return Section(self, range(len(self._starts))[index])
+
+    def __iter__(self):
+        for index in range(len(self._starts)):
+            yield Section(self, index)
+
+    def roots(self):
+        return [Section(self, index) for index in self._children(-1)]
+
+    def sections(self, kind=None, level=None):
+        return [
+            Section(self, index)
+            for index in range(len(self._starts))
+            if (kind is None or self._kinds[index] == kind) and (level is None or self._levels[index] == level)
+        ]
+
+    def find(self, title):
+        needle = title.lower()
+        return [Section(self, index) for index, value in enumerate(self._titles) if needle in value.lower()]
+
+    def chunk_spans(self, max_chars):
+        # (start, end) spans tiling the context, cut on section boundaries where possible.
+        max_chars = max(1, max_chars)
+        return list(self._spans(0, len(self._source), self._children(-1), max_chars))
+
+    def chunks(self, max_chars):
+        return [self._source[start:end] for start, end in self.chunk_spans(max_chars)]
+
+    def _children(self, index):
+        if self._child_lists is None:
+            self._child_lists = {}
+            for child, parent in enumerate(self._parents):
+                self._child_lists.setdefault(parent, []).append(child)
+        return self._child_lists.get(index, [])
+
+    def _spans(self, start, end, children, max_chars):
+        # Gaps between sections are pieces too, so the spans tile [start, end) exactly.
+        pieces = []
+        cursor = start
+        for child in children:
+            if self._starts[child] > cursor:
+                pieces.append((cursor, self._starts[child], None))
+            pieces.append((self._starts[child], self._ends[child], child))
+            cursor = self._ends[child]
+        if cursor < end:
+            pieces.append((cursor, end, None))
+        current = None
+        for piece_start, piece_end, child in pieces:
+            if piece_end - piece_start > max_chars:
+                if current is not None:
+                    yield current
+                    current = None
+                nested = self._children(child) if child is not None else []
+                if nested:
+                    yield from self._spans(piece_start, piece_end, nested, max_chars)
+                else:
+                    yield from self._split(piece_start, piece_end, max_chars)
+            elif current is not None and piece_end - current[0] <= max_chars:
+                current = (current[0], piece_end)
+            else:
+                if current is not None:
+                    yield current
+                current = (piece_start, piece_end)
+        if current is not None:
+            yield current
+
+    def _split(self, start, end, max_chars):
+        while start < end:
+            stop = min(start + max_chars, end)
+            if stop < end:
+                newline = self._source.rfind("\\n", start, stop)
+                if newline >= start:
+                    stop = newline + 1
+            yield (start, stop)
+            start = stop
+
+    def __repr__(self):
+        return "<outline: %s, %d sections>" % (self.format, len(self._starts))
+'''
+_OUTLINE_CODE = compile(_OUTLINE_SOURCE, "<rlm-outline>", "exec")
+
+
+def _helper_namespace(code, module_name, safe_builtins):
+    helper_builtins = dict(safe_builtins)
+    for name in ("__build_class__", "property", "slice", "repr", "KeyError"):
+        helper_builtins[name] = getattr(builtins, name)
+    namespace = {"__builtins__": helper_builtins, "__name__": module_name}
+    exec(code, namespace)
+    return namespace
+
+
+def _build_documents(source, corpus, safe_builtins):
+    return _helper_namespace(_DOCS_CODE, "rlm_docs", safe_builtins)["Documents"](
+        source,
+        corpus.get("ids", []),
+        corpus.get("starts", []),
+        corpus.get("ends", []),
+        corpus.get("metadata", []),
+    )
+
+
+def _build_duplicates(source, dedup, safe_builtins):
+    return _helper_namespace(_DEDUP_CODE, "rlm_dedup", safe_builtins)["NearDuplicates"](
+        source, dedup["starts"], dedup["ends"], dedup["representative"]
+    )
+
+
+def _build_outline(source, outline, safe_builtins):
+    return _helper_namespace(_OUTLINE_CODE, "rlm_outline", safe_builtins)["Outline"](
+        source,
+        outline["format"],
+        outline["starts"],
+        outline["ends"],
+        outline["parents"],
+        outline["levels"],
+        outline["kinds"],
+        outline["titles"],
+    )
+
+
+_TRUNCATION_MARKER = "\n...[truncated by sandbox output limit]...\n"
+
+
+class _LimitExceeded(BaseException):
+    # Not an Exception subclass, so snippets cannot swallow it with `except Exception`.
+    pass
+
+
+class _BoundedWriter(io.TextIOBase):
+    # Keeps a head and a tail window so memory stays flat however much a snippet prints.
+    def __init__(self, limit, hard_limit=0):
+        self.head_limit = max(0, limit) - max(0, limit) // 2
+        self.tail_limit = max(0, limit) // 2
+        self.hard_limit = max(0, hard_limit)
+        self.head = []
+        self.head_size = 0
+        self.tail = collections.deque()
+        self.tail_size = 0
+        self.written = 0
+        self.dropped = 0
+        self.tripped = None
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self.append(text)
+        if self.hard_limit and self.written > self.hard_limit:
+            self.tripped = f"OutputLimitError: snippet output exceeded {self.hard_limit} chars"
+            raise _LimitExceeded(self.tripped)
+        return len(text)
+
+    def append(self, text):
+        self.written += len(text)
+        room = self.head_limit - self.head_size
+        if room > 0:
+            piece = text[:room]
+            self.head.append(piece)
+            self.head_size += len(piece)
+            text = text[len(piece):]
+        if not text:
+            return
+        if len(text) >= self.tail_limit:
+            self.dropped += self.tail_size + len(text) - self.tail_limit
+            self.tail.clear()
+            text = text[len(text) - self.tail_limit:] if self.tail_limit else ""
+            self.tail_size = 0
+            if text:
+                self.tail.append(text)
+                self.tail_size = len(text)
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_limit:
+            excess = self.tail_size - self.tail_limit
+            first = self.tail[0]
+            if len(first) <= excess:
+                self.tail.popleft()
+                self.tail_size -= len(first)
+                self.dropped += len(first)
+            else:
+                self.tail[0] = first[excess:]
+                self.tail_size -= excess
+                self.dropped += excess
+
+    def getvalue(self):
+        head = "".join(self.head)
+        tail = "".join(self.tail)
+        if self.dropped:
+            return head + _TRUNCATION_MARKER + tail
+        return head + tail
+
+
+_WORKER_FILENAME = "<rlm-worker>"
+_SNIPPET_FILENAME = "<string>"
+
+
+def _current_rss():
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _peak_rss(usage):
+    # ru_maxrss keeps the parent's high-water mark across fork+exec, so prefer this
+    # process image's own VmHWM where /proc provides it.
+    try:
+        with open("/proc/self/status", "rb") as handle:
+            for line in handle:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+class _Watchdog:
+    # CPU/wall/memory watchdog for embedded runs, where process-wide rlimits cannot be used.
+    TOOL_ID = 3
+    CHECK_EVERY = 1024
+
+    def __init__(self, payload):
+        self.cpu_limit = max(1, int(payload.get("cpu_seconds", 2)))
+        self.wall_limit = max(1, int(payload.get("timeout_ms", 2000))) / 1000.0
+        self.memory_limit = int(payload.get("memory_limit_bytes", 268435456))
+        self.ticks = 0
+        self.peak_memory_bytes = 0
+        self.tripped = None
+
+    def start(self):
+        self.cpu_start = time.thread_time()
+        self.wall_start = time.monotonic()
+        self.rss_start = _current_rss()
+        monitoring = sys.monitoring
+        monitoring.use_tool_id(self.TOOL_ID, "rlm-sandbox-watchdog")
+        monitoring.register_callback(self.TOOL_ID, monitoring.events.JUMP, self._on_event)
+        monitoring.register_callback(self.TOOL_ID, monitoring.events.PY_START, self._on_event)
+        monitoring.set_events(self.TOOL_ID, monitoring.events.JUMP | monitoring.events.PY_START)
+
+    def stop(self):
+        monitoring = sys.monitoring
+        monitoring.set_events(self.TOOL_ID, 0)
+        monitoring.register_callback(self.TOOL_ID, monitoring.events.JUMP, None)
+        monitoring.register_callback(self.TOOL_ID, monitoring.events.PY_START, None)
+        monitoring.free_tool_id(self.TOOL_ID)
+        self._sample_memory()
+
+    def _on_event(self, code, *args):
+        if code.co_filename == _WORKER_FILENAME:
+            return sys.monitoring.DISABLE
+        if self.tripped is None:
+            self.ticks += 1
+            if self.ticks % self.CHECK_EVERY:
+                return None
+            self._check()
+        if self.tripped is not None:
+            raise _LimitExceeded(self.tripped)
+        return None
+
+    def _sample_memory(self):
+        rss = _current_rss()
+        if rss and self.rss_start:
+            self.peak_memory_bytes = max(self.peak_memory_bytes, rss - self.rss_start)
+
+    def _check(self):
+        self._sample_memory()
+        if time.thread_time() - self.cpu_start > self.cpu_limit or time.monotonic() - self.wall_start > self.wall_limit:
+            self.tripped = "TimeoutError: sandbox subinterpreter exceeded execution limits"
+        elif self.peak_memory_bytes > self.memory_limit:
+            self.tripped = "MemoryError: sandbox subinterpreter exceeded memory limit"
+
+
+_PROFILE_TOP = 15
+_PROFILE_FULL_SITES = 200
+
+
+class _Profiler:
+    # Created only when a run asks for a profile, so unprofiled runs never import cProfile
+    # or tracemalloc and pay nothing for them.
+    def __init__(self, modes):
+        self.profiler = None
+        self.tracing = False
+        self.errors = {}
+        if "cpu" in modes:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+        self.memory = "memory" in modes
+
+    def start(self):
+        if self.memory:
+            try:
+                # Not importable in isolated subinterpreters; the run goes on without it.
+                import tracemalloc
+
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(1)
+                    self.tracing = True
+            except Exception as exc:
+                self.errors["memory"] = f"{type(exc).__name__}: {exc}"
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.tracing:
+            import tracemalloc
+
+            self.snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, _WORKER_FILENAME)]
+            )
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def report(self):
+        report = {}
+        if self.profiler is not None:
+            try:
+                report["cpu"] = self._cpu_report()
+            except Exception as exc:
+                report["cpu"] = {"error": f"{type(exc).__name__}: {exc}"}
+        if self.tracing:
+            report["memory"] = self._memory_report()
+        for mode, error in self.errors.items():
+            report[mode] = {"error": error}
+        return report
+
+    def _cpu_report(self):
+        import pstats
+
+        full = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=full)
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            if filename == _WORKER_FILENAME or "_lsprof.Profiler" in name or name == "<built-in method builtins.exec>":
+                continue
+            where = name if filename == "~" else f"{name} ({os.path.basename(filename)}:{line})"
+            rows.append([where, calls, round(tottime * 1000, 3), round(cumtime * 1000, 3)])
+        rows.sort(key=lambda row: row[3], reverse=True)
+        stats.sort_stats("cumulative").print_stats()
+        return {
+            "total_ms": round(stats.total_tt * 1000, 3),
+            "top": rows[:_PROFILE_TOP],
+            "full": full.getvalue(),
+        }
+
+    def _memory_report(self):
+        sites = self.snapshot.statistics("lineno")
+        rows = [[str(stat.traceback[0]), stat.size, stat.count] for stat in sites[:_PROFILE_FULL_SITES]]
+        top = [
+            [f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", stat.size, stat.count]
+            for stat in sites[:_PROFILE_TOP]
+        ]
+        return {
+            "peak_bytes": self.peak_bytes,
+            "retained_bytes": sum(stat.size for stat in sites),
+            "top": top,
+            "full": "\n".join(f"{size:>12} B {count:>8}x  {site}" for site, size, count in rows),
+        }
+
+
+def _execute(payload, watchdog=None):
+    allowed_import_roots = set(payload.get("allowed_import_roots", []))
+    safe_builtins = _build_safe_builtins(allowed_import_roots)
+    scope = {"__builtins__": safe_builtins}
+    buffers = _Buffers(payload.get("buffers"))
+    try:
+        for key, value in payload.get("env", {}).items():
+            scope[key] = _decode(value, buffers)
+    finally:
+        buffers.close()
+    reserved = set()
+    corpus = payload.get("corpus")
+    if corpus is not None:
+        # Documents slice the decoded context in place; only a separately shipped text is copied.
+        source = corpus["text"] if "text" in corpus else scope.get("context", "")
+        scope["docs"] = _build_documents(source, corpus, safe_builtins)
+        reserved.add("docs")
+    dedup = payload.get("dedup")
+    if dedup is not None:
+        # Exposed as `dedup`: near-duplicate clusters over the session's chunk segmentation.
+        source = dedup["text"] if "text" in dedup else scope.get("context", "")
+        scope["dedup"] = _build_duplicates(source, dedup, safe_builtins)
+        reserved.add("dedup")
+    outline = payload.get("outline")
+    if outline is not None:
+        # Exposed as `outline`: the context's section tree, for structure-aware chunking.
+        source = outline["text"] if "text" in outline else scope.get("context", "")
+        scope["outline"] = _build_outline(source, outline, safe_builtins)
+        reserved.add("outline")
+
+    output_limit = int(payload.get("max_output_chars", 200000))
+    hard_limit = int(payload.get("max_output_hard_chars", 0))
+    stdout_buffer = _BoundedWriter(output_limit, hard_limit)
+    stderr_buffer = _BoundedWriter(output_limit, hard_limit)
+    guards = [stdout_buffer, stderr_buffer] + ([watchdog] if watchdog is not None else [])
+    error = None
+    code = _load_code(payload)
+    profiler = _Profiler(payload["profile"]) if payload.get("profile") else None
+
+    try:
+        with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
+            if watchdog is not None:
+                watchdog.start()
+            try:
+                if profiler is not None:
+                    profiler.start()
+                try:
+                    exec(code, scope, scope)
+                finally:
+                    if profiler is not None:
+                        profiler.stop()
+            finally:
+                if watchdog is not None:
+                    watchdog.stop()
+    except _LimitExceeded as exc:
+        error = str(exc)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    tripped = next((guard.tripped for guard in guards if guard.tripped), None)
+    if tripped is not None:
+        error = tripped
+    if error is not None and (stderr_buffer.written == 0 or tripped is not None):
+        stderr_buffer.append(error + "\n")
+
+    out_env = {}
+    if watchdog is None or watchdog.tripped is None:
+        # A tripped watchdog mirrors a killed subprocess worker: no variable updates.
+        buffers = _Buffers(payload.get("buffers"))
+        try:
+            for key, value in scope.items():
+                if not key.startswith("__") and key not in reserved:
+                    out_env[key] = _encode(value, buffers)
+        finally:
+            buffers.close()
+
+    result = {
+        "stdout": stdout_buffer.getvalue(),
+        "stderr": stderr_buffer.getvalue(),
+        "stdout_dropped_chars": stdout_buffer.dropped,
+        "stderr_dropped_chars": stderr_buffer.dropped,
+        "error": error,
+        "env": out_env,
+    }
+    if profiler is not None:
+        result["profile"] = profiler.report()
+    return result
+
+
+def run_embedded(payload_json, out_fd):
+    # Entry point for in-process (subinterpreter) execution: result JSON is written to out_fd.
+    payload = json.loads(payload_json)
+    watchdog = _Watchdog(payload)
+    cpu_start = time.thread_time()
+    result = _execute(payload, watchdog)
+    result["cpu_ms"] = int((time.thread_time() - cpu_start) * 1000)
+    result["peak_memory_bytes"] = watchdog.peak_memory_bytes
+    view = memoryview(json.dumps(result).encode("utf-8"))
+    while view:
+        view = view[os.write(out_fd, view):]
+
+
+def main():
+    payload = json.loads(sys.stdin.read())
+    if payload.get("jail"):
+        _enter_jail(payload["jail"])
+    _apply_limits(payload)
+    result = _execute(payload)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    result["cpu_ms"] = int((usage.ru_utime + usage.ru_stime) * 1000)
+    result["peak_memory_bytes"] = _peak_rss(usage)
+    sys.stdout.write(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import base64
+import mmap
+import os
+import uuid
+from array import array
+from typing import Any
+
+BUFFER_TYPES = (bytes, bytearray, array)
+# Below this size a base64 string in the JSON payload is cheaper than touching a file.
+INLINE_MAX_BYTES = 4096
+
+
+def default_shm_directory() -> str | None:
+    """Directory for buffer arenas: ``RLM_SANDBOX_SHM_DIR`` ("" disables them), else ``/dev/shm``."""
+    configured = os.getenv("RLM_SANDBOX_SHM_DIR")
+    if configured is not None:
+        return configured.strip() or None
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return None
+
+
+def describe_buffer(value: bytes | bytearray | array) -> tuple[dict[str, Any], memoryview]:
+    if isinstance(value, array):
+        return {"kind": "array", "typecode": value.typecode}, memoryview(value).cast("B")
+    return {"kind": type(value).__name__}, memoryview(value)
+
+
+def make_buffer(descriptor: dict[str, Any], data: Any) -> bytes | bytearray | array:
+    kind = descriptor.get("kind")
+    if kind == "array":
+        values = array(descriptor["typecode"])
+        values.frombytes(data)
+        return values
+    if kind == "bytearray":
+        return bytearray(data)
+    return bytes(data)
+
+
+def inline_buffer(value: bytes | bytearray | array) -> dict[str, Any]:
+    descriptor, view = describe_buffer(value)
+    descriptor["b64"] = base64.b64encode(view).decode("ascii")
+    return descriptor
+
+
+class BufferArena:
+    """Pair of files under a shared-memory directory carrying one sandbox run's buffer values.
+
+    The service appends input buffers to ``in_path`` and sends ``{offset, size}`` descriptors;
+    the worker maps that file. For the way back the service creates ``out_path`` as a sparse file
+    of ``out_capacity`` bytes, which the worker fills through mappings (its RLIMIT_FSIZE of 0
+    forbids growing files) and the service maps in turn. Neither side pushes buffer bytes through
+    the JSON pipe. ``close`` removes both files.
+    """
+
+    def __init__(self, directory: str, out_capacity: int) -> None:
+        self.directory = directory
+        stem = os.path.join(directory, f"rlm-buf-{uuid.uuid4().hex}")
+        self.in_path = stem + ".in"
+        self.out_path = stem + ".out"
+        self.out_capacity = out_capacity
+        self._in: Any = None
+        self._in_size = 0
+        self._out_map: mmap.mmap | None = None
+
+    def spec(self) -> dict[str, str]:
+        """Create the sparse out file and describe both files for the worker payload.
+
+        The worker only maps ``rlm-buf-*`` files directly inside ``dir``.
+        """
+        fd = os.open(self.out_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.ftruncate(fd, self.out_capacity)
+        finally:
+            os.close(fd)
+        return {"dir": self.directory, "in": self.in_path, "out": self.out_path}
+
+    def encode(self, value: bytes | bytearray | array) -> dict[str, Any]:
+        descriptor, view = describe_buffer(value)
+        if view.nbytes < INLINE_MAX_BYTES:
+            return inline_buffer(value)
+        if self._in is None:
+            self._in = open(os.open(self.in_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb")
+        self._in.write(view)
+        descriptor["offset"] = self._in_size
+        descriptor["size"] = view.nbytes
+        self._in_size += view.nbytes
+        return descriptor
+
+    def flush(self) -> None:
+        if self._in is not None:
+            self._in.close()
+            self._in = None
+
+    def decode(self, descriptor: dict[str, Any]) -> bytes | bytearray | array:
+        if "b64" in descriptor:
+            return make_buffer(descriptor, base64.b64decode(descriptor["b64"]))
+        if self._out_map is None:
+            with open(self.out_path, "rb") as handle:
+                self._out_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        start = int(descriptor["offset"])
+        with memoryview(self._out_map)[start : start + int(descriptor["size"])] as view:
+            return make_buffer(descriptor, view)
+
+    def close(self) -> None:
+        self.flush()
+        if self._out_map is not None:
+            self._out_map.close()
+            self._out_map = None
+        for path in (self.in_path, self.out_path):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import lzma
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Any, Iterator
+
+_CODECS = ("zlib", "lzma")
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    return lzma.compress(data, preset=1)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return lzma.decompress(data)
+
+
+class CompressedText:
+    """Read-mostly text stored as independently compressed blocks of ``block_chars`` characters.
+
+    All blocks live in one ``bytes`` object addressed through an offset table, so character
+    ``i`` sits in block ``i // block_chars``. Slices, chunk reads and ``find`` decompress only
+    the blocks they touch, and the last few decompressed blocks are kept in a small LRU cache.
+    """
+
+    def __init__(
+        self,
+        blob: bytes,
+        offsets: array,
+        length: int,
+        *,
+        codec: str = "zlib",
+        block_chars: int = 65_536,
+        cache_blocks: int = 8,
+    ) -> None:
+        if codec not in _CODECS:
+            raise ValueError(f"unsupported context codec: {codec!r}")
+        self.blob = blob
+        self.offsets = offsets
+        self.length = length
+        self.codec = codec
+        self.block_chars = block_chars
+        self.cache_blocks = max(1, cache_blocks)
+        self._cache: OrderedDict[int, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def from_text(
+        cls,
+        text: str,
+        *,
+        codec: str = "zlib",
+        block_chars: int = 65_536,
+        cache_blocks: int = 8,
+    ) -> "CompressedText":
+        if codec not in _CODECS:
+            raise ValueError(f"unsupported context codec: {codec!r}")
+        block_chars = max(1, block_chars)
+        parts: list[bytes] = []
+        offsets = array("Q", [0])
+        for start in range(0, len(text), block_chars):
+            compressed = _compress(codec, text[start : start + block_chars].encode("utf-8", "surrogatepass"))
+            parts.append(compressed)
+            offsets.append(offsets[-1] + len(compressed))
+        return cls(
+            b"".join(parts),
+            offsets,
+            len(text),
+            codec=codec,
+            block_chars=block_chars,
+            cache_blocks=cache_blocks,
+        )
+
+    @property
+    def block_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def compressed_bytes(self) -> int:
+        return len(self.blob) + self.offsets.itemsize * len(self.offsets)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {
+            "blob": self.blob,
+            "offsets": self.offsets,
+            "length": self.length,
+            "codec": self.codec,
+            "block_chars": self.block_chars,
+            "cache_blocks": self.cache_blocks,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(
+            state["blob"],
+            state["offsets"],
+            state["length"],
+            codec=state["codec"],
+            block_chars=state["block_chars"],
+            cache_blocks=state["cache_blocks"],
+        )
+
+    def __getitem__(self, key: int | slice) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step == 1:
+                return self._range(start, stop)
+            positions = range(start, stop, step)
+            if not positions:
+                return ""
+            low, high = min(positions[0], positions[-1]), max(positions[0], positions[-1]) + 1
+            segment = self._range(low, high)
+            return segment[slice(start - low, stop - low if stop - low >= 0 else None, step)]
+
+        index = key + self.length if key < 0 else key
+        if not 0 <= index < self.length:
+            raise IndexError("string index out of range")
+        return self._block(index // self.block_chars)[index % self.block_chars]
+
+    def text(self) -> str:
+        """Decompress the whole text without disturbing the block cache."""
+        return "".join(self._decode(block) for block in range(self.block_count))
+
+    def iter_chunks(self, size: int, *, start: int = 0, end: int | None = None) -> Iterator[str]:
+        start, end, _ = slice(start, end).indices(self.length)
+        size = max(1, size)
+        for offset in range(start, end, size):
+            yield self._range(offset, min(offset + size, end))
+
+    def find(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        start, end, _ = slice(start, end).indices(self.length)
+        if not sub:
+            return start if start <= end else -1
+        keep = len(sub) - 1
+        carry = ""
+        position = start
+        while position < end:
+            block_end = min((position // self.block_chars + 1) * self.block_chars, end)
+            window = carry + self._range(position, block_end)
+            hit = window.find(sub)
+            if hit >= 0:
+                return block_end - len(window) + hit
+            carry = window[-keep:] if keep else ""
+            position = block_end
+        return -1
+
+    def _range(self, start: int, stop: int) -> str:
+        if start >= stop:
+            return ""
+        first, last = start // self.block_chars, (stop - 1) // self.block_chars
+        base = first * self.block_chars
+        if first == last:
+            return self._block(first)[start - base : stop - base]
+        return "".join(self._block(block) for block in range(first, last + 1))[start - base : stop - base]
+
+    def _block(self, block: int) -> str:
+        with self._lock:
+            cached = self._cache.get(block)
+            if cached is not None:
+                self._cache.move_to_end(block)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+        text = self._decode(block)
+        with self._lock:
+            self._cache[block] = text
+            self._cache.move_to_end(block)
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return text
+
+    def _decode(self, block: int) -> str:
+        data = memoryview(self.blob)[self.offsets[block] : self.offsets[block + 1]]
+        return _decompress(self.codec, data).decode("utf-8", "surrogatepass")
+
+
+class ContextView:
+    """Characters ``start:end`` of another session's context, read in place rather than copied.
+
+    ``source`` is the parent's ``str`` or ``CompressedText``; a view of a view points straight at
+    the underlying source. ``owner`` names the session that owns ``source``: when it is set,
+    pickling (the SQLite store) writes only ``(owner, start, end)`` and the store re-attaches the
+    owner's context on load; without it the viewed text is written.
+    """
+
+    def __init__(self, source: str | CompressedText | None, start: int, end: int, owner: str | None = None) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+        self.owner = owner
+
+    @classmethod
+    def of(
+        cls,
+        source: "str | CompressedText | ContextView",
+        start: int,
+        end: int,
+        *,
+        owner: str | None = None,
+    ) -> "ContextView":
+        if isinstance(source, ContextView):
+            return cls(source.source, source.start + start, source.start + end, source.owner)
+        return cls(source, start, end, owner)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getstate__(self) -> dict[str, Any]:
+        if self.owner is not None:
+            return {"owner": self.owner, "start": self.start, "end": self.end}
+        return {"text": self.text()}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        if "owner" in state:
+            # ``source`` stays None until the session store attaches the owner's context.
+            self.__init__(None, state["start"], state["end"], state["owner"])
+        else:
+            self.__init__(state["text"], 0, len(state["text"]))
+
+    def __getitem__(self, key: int | slice) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self.source[self.start + start : self.start + max(start, stop)]
+            return self.text()[key]
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError("string index out of range")
+        return self.source[self.start + index]
+
+    def text(self) -> str:
+        if self.start == 0 and self.end == len(self.source) and isinstance(self.source, str):
+            return self.source
+        return self.source[self.start : self.end]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+
+DOCUMENT_SEPARATOR = "\n\n"
+
+
+@dataclass
+class DocumentIndex:
+    """Per-document offsets, ids and metadata over a session's joined context text.
+
+    The text itself stays in ``SessionState.context_text``; document ``i`` is
+    ``text[starts[i]:ends[i]]``.
+    """
+
+    ids: list[str]
+    starts: array = field(default_factory=lambda: array("q"))
+    ends: array = field(default_factory=lambda: array("q"))
+    metadata: list[dict[str, Any]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"ids": self.ids, "starts": self.starts, "ends": self.ends, "metadata": self.metadata}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._positions
+
+    def add(self, doc_id: str, start: int, end: int, metadata: Mapping[str, Any] | None = None) -> None:
+        if not doc_id:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "every document needs a non-empty id")
+        if doc_id in self._positions:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, f"duplicate document id: {doc_id}")
+        self._positions[doc_id] = len(self.ids)
+        self.ids.append(doc_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.metadata.append(dict(metadata or {}))
+
+    def position(self, doc_id: str) -> int:
+        try:
+            return self._positions[doc_id]
+        except KeyError:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, f"unknown document id: {doc_id}") from None
+
+    def document_text(self, text: str, position: int) -> str:
+        return text[self.starts[position] : self.ends[position]]
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "ids": self.ids,
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "metadata": self.metadata,
+        }
+
+
+def build_corpus(documents: Iterable[Mapping[str, Any]]) -> tuple[str, DocumentIndex]:
+    """Join documents into one context text and index where each of them lives."""
+    parts: list[str] = []
+    index = DocumentIndex(ids=[])
+    offset = 0
+    for document in documents:
+        doc_id = str(document.get("id", ""))
+        text = document.get("text")
+        if not isinstance(text, str):
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, f"document {doc_id} needs a text string")
+        if parts:
+            parts.append(DOCUMENT_SEPARATOR)
+            offset += len(DOCUMENT_SEPARATOR)
+        index.add(doc_id, offset, offset + len(text), document.get("metadata"))
+        parts.append(text)
+        offset += len(text)
+
+    if not index.ids:
+        raise RlmMcpError(ErrorCode.INVALID_INPUT, "documents must not be empty")
+    return "".join(parts), index
+
+
+@dataclass
+class ContextIngest:
+    """Backing buffer for a context that arrives as numbered chunks.
+
+    Chunks are appended as UTF-8 to a private temporary file and the document index is extended
+    as they arrive. ``seal`` decodes the file through ``mmap``, so building the final ``str``
+    needs about 1x the context in memory rather than a list of chunks plus their join.
+    ``touched_at`` (wall clock, so it survives pickling into a shared store) lets the service
+    discard uploads that were abandoned before ``seal``.
+    """
+
+    path: str
+    next_seq: int = 0
+    length: int = 0
+    index: DocumentIndex | None = None
+    # Build the structural outline as soon as the context is sealed.
+    outline: bool = False
+    touched_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, directory: str | None = None) -> "ContextIngest":
+        fd, path = tempfile.mkstemp(prefix="rlm-ingest-", suffix=".txt", dir=directory)
+        os.close(fd)
+        return cls(path=path)
+
+    def append(self, chunk: str, *, doc_id: str | None = None, metadata: Mapping[str, Any] | None = None) -> None:
+        """Append one chunk; a new ``doc_id`` closes the current document and starts another."""
+        if doc_id is not None and (self.index is None or self.index.ids[-1] != doc_id):
+            if self.index is None and self.length:
+                raise RlmMcpError(ErrorCode.INVALID_INPUT, "doc_id must be set on every chunk or on none")
+            if self.index is not None and doc_id in self.index:
+                raise RlmMcpError(ErrorCode.INVALID_INPUT, f"document {doc_id} was already closed by another document")
+            if self.index is None:
+                self.index = DocumentIndex(ids=[])
+            else:
+                self._write(DOCUMENT_SEPARATOR)
+            self.index.add(doc_id, self.length, self.length, metadata)
+
+        self._write(chunk)
+        if self.index is not None:
+            self.index.ends[-1] = self.length
+        self.next_seq += 1
+        self.touched_at = time.time()
+
+    def seal(self) -> tuple[str, DocumentIndex | None]:
+        if self.length == 0:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "cannot seal an empty context")
+        with open(self.path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            text = str(view, "utf-8")
+        self.discard()
+        return text, self.index
+
+    def _write(self, text: str) -> None:
+        with open(self.path, "a", encoding="utf-8", newline="") as handle:
+            handle.write(text)
+        self.length += len(text)
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
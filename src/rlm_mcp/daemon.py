@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import argparse
+import hmac
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+from dataclasses import asdict
+from typing import Any, Iterable
+
+from rlm_mcp.remote import MAX_HELLO_BYTES, PROTOCOL_VERSION, parse_endpoint, recv_message, send_message
+from rlm_mcp.sandbox import SandboxExecutor
+
+_LOCAL_MODES = ("subprocess", "namespace", "container", "subinterpreter")
+# The only payload fields a client chooses. Limits, import policy and the jail come from the
+# daemon's own executor; marshalled code objects and shared-memory buffer paths are refused.
+_CLIENT_FIELDS = ("code", "env", "corpus", "dedup", "outline", "profile")
+_HELLO_TIMEOUT_SECONDS = 10.0
+
+
+class _DaemonRequestHandler(socketserver.BaseRequestHandler):
+    # One persistent connection per client socket; requests are answered in order. Until the
+    # hello frame has been verified only small frames are read, under a short timeout.
+    def handle(self) -> None:
+        daemon: SandboxDaemon = self.server.sandbox_daemon  # type: ignore[attr-defined]
+        self.request.settimeout(min(daemon.idle_timeout, _HELLO_TIMEOUT_SECONDS))
+        try:
+            reply = daemon.hello(recv_message(self.request, max_bytes=MAX_HELLO_BYTES))
+            send_message(self.request, reply)
+        except (EOFError, OSError, ValueError):
+            return
+        if not reply["ok"]:
+            return
+        self.request.settimeout(daemon.idle_timeout)
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (EOFError, OSError, ValueError):
+                return
+            try:
+                send_message(self.request, daemon.handle(message))
+            except OSError:
+                return
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ThreadingTCP6Server(_ThreadingTCPServer):
+    address_family = socket.AF_INET6
+
+
+class _ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SandboxDaemon:
+    """Host a local SandboxExecutor behind Unix and/or TCP sockets for remote sandbox mode.
+
+    Clients send only the snippet and its inputs; every run gets this daemon's limits, with
+    ``timeout_ms`` capped at ``max_timeout_ms``. TCP listeners require a ``token``.
+    """
+
+    def __init__(
+        self,
+        listen: Iterable[str],
+        *,
+        executor: SandboxExecutor | None = None,
+        max_workers: int | None = None,
+        token: str | None = None,
+        idle_timeout: float = 300.0,
+        max_timeout_ms: int = 120_000,
+    ) -> None:
+        listen = list(listen)
+        if token is None and any(parse_endpoint(spec)[0] != socket.AF_UNIX for spec in listen):
+            raise ValueError("TCP listeners require a token (--token or RLM_SANDBOX_REMOTE_TOKEN)")
+        self.executor = executor or SandboxExecutor(sandbox_mode="subprocess")
+        if self.executor.sandbox_mode not in _LOCAL_MODES:
+            raise ValueError(f"sandbox daemon cannot use sandbox_mode={self.executor.sandbox_mode!r}")
+        self.capacity = max(1, max_workers or os.cpu_count() or 1)
+        self.token = token
+        self.max_timeout_ms = max(1, max_timeout_ms)
+        self.idle_timeout = idle_timeout
+        self.active = 0
+        self.completed = 0
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._servers = [self._bind(spec) for spec in listen]
+        if not self._servers:
+            raise ValueError("sandbox daemon needs at least one listen address")
+
+    @property
+    def endpoints(self) -> list[str]:
+        endpoints = []
+        for server in self._servers:
+            if server.address_family == socket.AF_UNIX:
+                endpoints.append(f"unix:{server.server_address}")
+            else:
+                host, port = server.server_address[:2]
+                endpoints.append(f"tcp:{host}:{port}")
+        return endpoints
+
+    def hello(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Answer the frame opening a connection; later frames are read only if this is ok."""
+        if message.get("op") != "hello":
+            return {"ok": False, "error": "expected hello"}
+        if self.token is not None and not hmac.compare_digest(str(message.get("token", "")), self.token):
+            return {"ok": False, "error": "unauthorized"}
+        if message.get("version") != PROTOCOL_VERSION:
+            return {"ok": False, "error": f"unsupported protocol version {message.get('version')!r}"}
+        return {"ok": True, "version": PROTOCOL_VERSION, "load": self.load()}
+
+    def handle(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Answer one request on a connection that has passed ``hello``."""
+        op = message.get("op")
+        if op == "stats":
+            return {"ok": True, "version": PROTOCOL_VERSION, "load": self.load()}
+        if op != "run":
+            return {"ok": False, "error": f"unknown op: {op!r}", "load": self.load()}
+
+        request = message.get("payload")
+        if not isinstance(request, dict) or not isinstance(request.get("code"), str):
+            return {"ok": False, "error": "run requires a payload object with code", "load": self.load()}
+        if not isinstance(request.get("env", {}), dict):
+            return {"ok": False, "error": "payload env must be an object", "load": self.load()}
+        try:
+            timeout_ms = min(max(1, int(message.get("timeout_ms", 2000))), self.max_timeout_ms)
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "timeout_ms must be an integer", "load": self.load()}
+        payload = {"env": {}, **{key: request[key] for key in _CLIENT_FIELDS if key in request}}
+        payload.update(self.executor.policy_payload(timeout_ms))
+
+        with self._slots:
+            with self._lock:
+                self.active += 1
+            try:
+                result, updates = self.executor.execute_payload(payload, timeout_ms=timeout_ms)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+        return {"ok": True, "result": {**asdict(result), "env": updates}, "load": self.load()}
+
+    def load(self) -> dict[str, int]:
+        with self._lock:
+            return {"active": self.active, "capacity": self.capacity, "completed": self.completed}
+
+    def start(self) -> None:
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, name="rlm-sandbox-daemon", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def serve_forever(self) -> None:
+        self.start()
+        for thread in self._threads:
+            thread.join()
+
+    def shutdown(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            if server.address_family == socket.AF_UNIX:
+                try:
+                    os.unlink(server.server_address)
+                except OSError:
+                    pass
+
+    def _bind(self, spec: str) -> socketserver.BaseServer:
+        family, address = parse_endpoint(spec)
+        server: socketserver.BaseServer
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = _ThreadingUnixServer(address, _DaemonRequestHandler)
+            os.chmod(address, 0o600)
+        elif family == socket.AF_INET6:
+            server = _ThreadingTCP6Server(address, _DaemonRequestHandler)
+        else:
+            server = _ThreadingTCPServer(address, _DaemonRequestHandler)
+        server.sandbox_daemon = self  # type: ignore[attr-defined]
+        return server
+
+
+def main(argv: list[str] | None = None) -> None:
+    default_listen = f"unix:{os.path.join(os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), 'rlm-sandbox.sock')}"
+    parser = argparse.ArgumentParser(
+        prog="rlm-sandbox-daemon",
+        description="Host sandbox worker pools for RLM MCP servers running with RLM_SANDBOX_MODE=remote.",
+    )
+    parser.add_argument(
+        "--listen",
+        action="append",
+        help=f"unix:/path or tcp:host:port; repeatable (default: {default_listen})",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="concurrent sandbox runs")
+    parser.add_argument("--sandbox-mode", choices=_LOCAL_MODES, default="subprocess")
+    parser.add_argument(
+        "--token",
+        default=os.getenv("RLM_SANDBOX_REMOTE_TOKEN"),
+        help="shared secret clients must send; required with tcp listeners (default: $RLM_SANDBOX_REMOTE_TOKEN)",
+    )
+    parser.add_argument("--max-timeout-ms", type=int, default=120_000, help="cap on the wall time a client may request")
+    args = parser.parse_args(argv)
+
+    try:
+        daemon = SandboxDaemon(
+            args.listen or [default_listen],
+            executor=SandboxExecutor(sandbox_mode=args.sandbox_mode),
+            max_workers=args.workers,
+            token=args.token,
+            max_timeout_ms=args.max_timeout_ms,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    def _stop(signum: int, frame: Any) -> None:
+        threading.Thread(target=daemon.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print(f"rlm-sandbox-daemon listening on {', '.join(daemon.endpoints)}", flush=True)
+    daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
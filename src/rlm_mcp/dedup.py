@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+DEFAULT_CHUNK_CHARS = 4_000
+DEFAULT_THRESHOLD = 0.8
+_HASH_MASK = (1 << 64) - 1
+_EMPTY_BIN = _HASH_MASK
+
+
+def segment_text(text: str, chunk_chars: int) -> tuple[array, array]:
+    """Split ``text`` into chunks of at most ``chunk_chars``, ending each at its last newline if any."""
+    starts, ends = array("q"), array("q")
+    chunk_chars = max(1, chunk_chars)
+    position = 0
+    while position < len(text):
+        end = min(position + chunk_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", position, end)
+            if newline >= position:
+                end = newline + 1
+        starts.append(position)
+        ends.append(end)
+        position = end
+    return starts, ends
+
+
+def minhash_signature(text: str, num_perm: int, shingle_words: int = 3) -> array:
+    """One-permutation MinHash of the word ``shingle_words``-grams of ``text``.
+
+    Every shingle is hashed once; the hash picks one of ``num_perm`` bins and the bin keeps its
+    minimum, so a signature costs one pass instead of ``num_perm`` hash functions. Empty bins
+    borrow the next non-empty bin to their right (rotation densification) so short chunks still
+    compare bin for bin.
+    """
+    words = text.lower().split()
+    if len(words) < shingle_words:
+        shingles = {tuple(words)}
+    else:
+        shingles = set(zip(*(words[i:] for i in range(shingle_words))))
+    signature = array("Q", [_EMPTY_BIN]) * num_perm
+    for shingle in shingles:
+        value = hash(shingle) & _HASH_MASK
+        slot, rank = value % num_perm, value // num_perm
+        if rank < signature[slot]:
+            signature[slot] = rank
+    filled = [slot for slot in range(num_perm) if signature[slot] != _EMPTY_BIN]
+    if filled and len(filled) < num_perm:
+        dense = array("Q", signature)
+        for slot in range(num_perm):
+            if signature[slot] == _EMPTY_BIN:
+                step = 1
+                while signature[(slot + step) % num_perm] == _EMPTY_BIN:
+                    step += 1
+                dense[slot] = signature[(slot + step) % num_perm]
+        signature = dense
+    return signature
+
+
+def _similarity(left: array, right: array) -> float:
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+@dataclass
+class NearDuplicateIndex:
+    """Chunks of a session's context grouped into near-duplicate clusters.
+
+    ``representative[i]`` is the lowest chunk index in chunk ``i``'s cluster, so a chunk is
+    distinct exactly when it is its own representative. ``chunk_chars`` is 0 when the chunks are
+    the session's documents.
+    """
+
+    chunk_chars: int
+    threshold: float
+    starts: array
+    ends: array
+    representative: array
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def distinct(self) -> int:
+        return sum(1 for index, rep in enumerate(self.representative) if index == rep)
+
+    def clusters(self, *, min_size: int = 2) -> list[list[int]]:
+        """Member chunk indices of every cluster with at least ``min_size`` chunks, in chunk order."""
+        groups: dict[int, list[int]] = {}
+        for index, rep in enumerate(self.representative):
+            groups.setdefault(rep, []).append(index)
+        return [members for members in groups.values() if len(members) >= min_size]
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "representative": self.representative.tolist(),
+        }
+
+
+def build_dedup_index(
+    text: str,
+    starts: Sequence[int],
+    ends: Sequence[int],
+    *,
+    chunk_chars: int,
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> NearDuplicateIndex:
+    """Cluster chunks ``text[starts[i]:ends[i]]`` whose estimated Jaccard similarity is >= ``threshold``.
+
+    LSH banding splits each signature into ``bands`` bands; chunks sharing any band bucket are
+    candidates and are merged (union-find) when their signatures agree on ``threshold`` of bins.
+    """
+    rows = max(1, num_perm // max(1, bands))
+    signatures = [minhash_signature(text[start:end], num_perm) for start, end in zip(starts, ends)]
+    parent = list(range(len(signatures)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    buckets: dict[tuple[int, bytes], int] = {}
+    for index, signature in enumerate(signatures):
+        for band in range(0, num_perm - rows + 1, rows):
+            key = (band, signature[band : band + rows].tobytes())
+            first = buckets.setdefault(key, index)
+            if first == index:
+                continue
+            # Each chunk is verified against the first chunk of the bucket only; shared buckets
+            # in other bands catch most pairs this misses.
+            root, other = find(first), find(index)
+            if root != other and _similarity(signatures[first], signature) >= threshold:
+                parent[max(root, other)] = min(root, other)
+
+    representative = array("q", (find(index) for index in range(len(signatures))))
+    return NearDuplicateIndex(
+        chunk_chars=chunk_chars,
+        threshold=threshold,
+        starts=array("q", starts),
+        ends=array("q", ends),
+        representative=representative,
+    )
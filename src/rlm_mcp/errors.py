@@ -9,6 +9,7 @@ class ErrorCode(str, Enum):
     SESSION_NOT_FOUND = "SESSION_NOT_FOUND"
     GUARDRAIL_STOPPED = "GUARDRAIL_STOPPED"
     SANDBOX_EXEC_ERROR = "SANDBOX_EXEC_ERROR"
+    SERVER_BUSY = "SERVER_BUSY"
     INTERNAL_ERROR = "INTERNAL_ERROR"
 
 
@@ -16,6 +17,7 @@ class ErrorCode(str, Enum):
 class RlmMcpError(Exception):
     code: ErrorCode
     message: str
+    retry_after_seconds: float | None = None
 
     def __str__(self) -> str:
         return f"{self.code.value}: {self.message}"
@@ -17,4 +17,11 @@ class GuardrailController:
         if session.budget_used >= session.config.budget_limit:
             return True, "budget_exceeded"
 
+        if session.config.max_cpu_ms is not None and session.cpu_ms_used >= session.config.max_cpu_ms:
+            return True, "cpu_exceeded"
+
+        max_peak_memory_mb = session.config.max_peak_memory_mb
+        if max_peak_memory_mb is not None and session.peak_memory_bytes >= max_peak_memory_mb * 1024 * 1024:
+            return True, "memory_exceeded"
+
         return False, None
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import itertools
+import os
+import re
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from rlm_mcp.scheduler import AdmissionScheduler
+from rlm_mcp.service import RlmMcpService
+from rlm_mcp.session_store import SqliteSessionStore, shard_for
+
+# Tool arguments carry ``"session_id": "..."``; a JSON string holding that text would have its
+# quotes escaped, so an unescaped match is always a real key. Scanning raw bytes avoids decoding
+# large rlm_init_context bodies just to pick a worker.
+_SESSION_ID_PATTERN = re.compile(rb'(?<!\\)"session_id"\s*:\s*"([^"\\]{1,128})"')
+# Hop-by-hop headers are owned by each connection and must not be forwarded.
+_HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+_WORKER_START_TIMEOUT_SECONDS = 30.0
+_PARENT_POLL_SECONDS = 1.0
+
+
+def route_request(body: bytes, workers: int, fallback: int) -> int:
+    """Pick the worker for a JSON-RPC body: by session_id when present, else ``fallback``."""
+    match = _SESSION_ID_PATTERN.search(body)
+    if match is None:
+        return fallback % workers
+    return shard_for(match.group(1).decode("utf-8", "replace"), workers)
+
+
+def build_router_app(socket_paths: list[str]) -> Any:
+    """Starlette app forwarding MCP streamable-HTTP requests to worker processes over Unix sockets."""
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.background import BackgroundTask
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response, StreamingResponse
+    from starlette.routing import Route
+
+    clients: list[httpx.AsyncClient] = []
+    round_robin = itertools.count()
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        for path in socket_paths:
+            clients.append(
+                httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(uds=path),
+                    base_url="http://rlm-worker",
+                    timeout=httpx.Timeout(None, connect=5.0),
+                )
+            )
+        try:
+            yield
+        finally:
+            for client in clients:
+                await client.aclose()
+            clients.clear()
+
+    async def forward(request: Request) -> Response:
+        body = await request.body()
+        index = route_request(body, len(socket_paths), next(round_robin))
+        client = clients[index]
+        headers = [
+            (name, value) for name, value in request.headers.raw if name.decode("latin-1").lower() not in _HOP_BY_HOP_HEADERS
+        ]
+        upstream_request = client.build_request(
+            request.method,
+            request.url.path,
+            params=request.url.query,
+            headers=headers,
+            content=body,
+        )
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.TransportError as exc:
+            return JSONResponse(
+                {"error": f"rlm worker {index} unavailable: {type(exc).__name__}"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+        response_headers = {
+            name: value for name, value in upstream.headers.items() if name.lower() not in _HOP_BY_HOP_HEADERS
+        }
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    return Starlette(
+        routes=[Route("/{path:path}", forward, methods=["GET", "POST", "DELETE"])],
+        lifespan=lifespan,
+    )
+
+
+def serve_http(
+    *,
+    transport: str = "streamable-http",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 1,
+    session_store: str | None = None,
+    drain_timeout: float = 30.0,
+    log_level: str = "info",
+) -> None:
+    """Serve the MCP tools over HTTP.
+
+    One worker serves directly on ``host:port``. With more workers, each one runs in its own
+    process on a private Unix socket, sessions are shared through a SQLite session store, and a
+    front router keeps every request of a session on the worker that created it. On SIGTERM or
+    SIGINT the listener stops accepting connections and in-flight requests get up to
+    ``drain_timeout`` seconds to finish before the workers are stopped.
+    """
+    import uvicorn
+
+    from rlm_mcp.server import build_mcp_app
+
+    if transport not in ("streamable-http", "sse"):
+        raise ValueError(f"unsupported HTTP transport: {transport!r}")
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if workers > 1 and transport == "sse":
+        raise ValueError("the sse transport keeps per-connection state and runs a single worker; use streamable-http")
+
+    if workers == 1:
+        store = SqliteSessionStore(session_store) if session_store else None
+        mcp = build_mcp_app(RlmMcpService(store=store), host=host, port=port, log_level=log_level.upper())
+        app = mcp.streamable_http_app() if transport == "streamable-http" else mcp.sse_app()
+        _run_uvicorn(uvicorn.Config(app, host=host, port=port, log_level=log_level, timeout_graceful_shutdown=drain_timeout))
+        return
+
+    run_dir = tempfile.mkdtemp(prefix="rlm-mcp-")
+    store_path = session_store or os.path.join(run_dir, "sessions.sqlite3")
+    socket_paths = [os.path.join(run_dir, f"worker-{index}.sock") for index in range(workers)]
+    processes = _start_workers(socket_paths, store_path, host=host, port=port, drain_timeout=drain_timeout, log_level=log_level)
+    try:
+        _wait_for_workers(processes, socket_paths)
+        app = build_router_app(socket_paths)
+        _run_uvicorn(uvicorn.Config(app, host=host, port=port, log_level=log_level, timeout_graceful_shutdown=drain_timeout))
+    finally:
+        _stop_workers(processes, timeout=drain_timeout)
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _run_uvicorn(config: Any) -> None:
+    import uvicorn
+
+    uvicorn.Server(config).run()
+
+
+def _start_workers(
+    socket_paths: list[str],
+    store_path: str,
+    *,
+    host: str,
+    port: int,
+    drain_timeout: float,
+    log_level: str,
+) -> list[Any]:
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index, path in enumerate(socket_paths):
+        process = context.Process(
+            target=_run_worker,
+            args=(index, len(socket_paths), path, store_path, host, port, drain_timeout, log_level),
+            name=f"rlm-mcp-worker-{index}",
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def _run_worker(
+    index: int,
+    count: int,
+    socket_path: str,
+    store_path: str,
+    host: str,
+    port: int,
+    drain_timeout: float,
+    log_level: str,
+) -> None:
+    import uvicorn
+
+    from rlm_mcp.server import build_mcp_app
+
+    # Leave the terminal's process group so Ctrl-C reaches only the router, which drains first
+    # and then stops the workers itself.
+    os.setpgrp()
+    parent = os.getppid()
+    # Every worker admits its share of the host-wide sandbox concurrency and memory budget.
+    service = RlmMcpService(
+        store=SqliteSessionStore(store_path, shard=(index, count)),
+        scheduler=AdmissionScheduler(shard=(index, count)),
+    )
+    # Requests are routed per tool call rather than per MCP session, so workers run stateless.
+    mcp = build_mcp_app(service, host=host, port=port, stateless_http=True, log_level=log_level.upper())
+    server = uvicorn.Server(
+        uvicorn.Config(
+            mcp.streamable_http_app(),
+            uds=socket_path,
+            log_level=log_level,
+            timeout_graceful_shutdown=drain_timeout,
+        )
+    )
+
+    def watch_parent() -> None:
+        while not server.should_exit:
+            if os.getppid() != parent:
+                server.should_exit = True
+                return
+            time.sleep(_PARENT_POLL_SECONDS)
+
+    threading.Thread(target=watch_parent, name="rlm-mcp-parent-watch", daemon=True).start()
+    server.run()
+
+
+def _wait_for_workers(processes: list[Any], socket_paths: list[str]) -> None:
+    deadline = time.monotonic() + _WORKER_START_TIMEOUT_SECONDS
+    pending = list(zip(processes, socket_paths))
+    while pending:
+        process, path = pending[0]
+        if not process.is_alive():
+            raise RuntimeError(f"{process.name} exited during startup (exit code {process.exitcode})")
+        if _socket_accepts(path):
+            pending.pop(0)
+            continue
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{process.name} did not start listening within {_WORKER_START_TIMEOUT_SECONDS:.0f}s")
+        time.sleep(0.05)
+
+
+def _socket_accepts(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def _stop_workers(processes: list[Any], *, timeout: float) -> None:
+    for process in processes:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
+            process.join()
@@ -8,6 +8,8 @@ class SessionConfig:
     max_steps: int = 64
     max_runtime_ms: int = 120_000
     budget_limit: int = 100_000
+    max_cpu_ms: int | None = None
+    max_peak_memory_mb: int | None = None
 
     def __post_init__(self) -> None:
         if self.max_steps <= 0:
@@ -16,3 +18,7 @@ class SessionConfig:
             raise ValueError("max_runtime_ms must be > 0")
         if self.budget_limit <= 0:
             raise ValueError("budget_limit must be > 0")
+        if self.max_cpu_ms is not None and self.max_cpu_ms <= 0:
+            raise ValueError("max_cpu_ms must be > 0")
+        if self.max_peak_memory_mb is not None and self.max_peak_memory_mb <= 0:
+            raise ValueError("max_peak_memory_mb must be > 0")
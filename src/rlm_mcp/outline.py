@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import re
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+OUTLINE_FORMATS = ("markdown", "source_files", "jsonl", "text")
+_SAMPLE_CHARS = 65_536
+# JSONL with more records than this is outlined as groups of records.
+_MAX_RECORD_NODES = 2_000
+_RECORD_GROUPS = 1_000
+
+_HEADING = re.compile(r"^(?P<fence>```|~~~)|^(?P<hashes>#{1,6})[ \t]+(?P<title>[^\n]*?)[ \t#]*$", re.M)
+_FILE_MARKER = re.compile(
+    r"^(?:==> (?P<p1>[^\n]+?) <=="
+    r"|-{3,} (?P<p2>[\w./\-]+\.\w+) -{3,}"
+    r"|#{1,4} ?[Ff]ile: ?`?(?P<p3>[^`\n]+?)`?"
+    r"|<file (?:path|name)=\"(?P<p4>[^\"]+)\">"
+    r"|diff --git a/(?P<p5>\S+) b/\S+"
+    r"|(?://|#|--) ?(?:[Ff]ile|FILE): (?P<p6>\S+))[ \t]*$",
+    re.M,
+)
+_SYMBOL = re.compile(
+    r"^(?:export[ \t]+)?(?:pub[ \t]+)?(?:async[ \t]+)?"
+    r"(?:def|class|function|func|fn|interface|struct|impl|trait|enum|module)[ \t]+(?P<name>[A-Za-z_]\w*)",
+    re.M,
+)
+_RECORD_KEY = re.compile(r"\"(?:id|name|title|key)\"\s*:\s*\"?(?P<value>[^\",}\n]{1,80})")
+
+
+@dataclass
+class Outline:
+    """Sections of a context as a flat tree: node ``i`` spans ``starts[i]:ends[i]`` under ``parents[i]``.
+
+    Nodes are stored in document order, so a parent always precedes its children; ``-1`` marks
+    a root. ``levels`` keeps the heading level (1 for files and records, 0 for documents).
+    """
+
+    format: str
+    starts: array = field(default_factory=lambda: array("q"))
+    ends: array = field(default_factory=lambda: array("q"))
+    parents: array = field(default_factory=lambda: array("q"))
+    levels: array = field(default_factory=lambda: array("b"))
+    kinds: list[str] = field(default_factory=list)
+    titles: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, kind: str, title: str, level: int, start: int, end: int, parent: int) -> int:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.parents.append(parent)
+        self.levels.append(level)
+        self.kinds.append(kind)
+        self.titles.append(title[:200])
+        return len(self.starts) - 1
+
+    def to_tree(self, *, max_depth: int | None = None, max_nodes: int = 500) -> tuple[list[dict[str, Any]], bool]:
+        """Nested node dicts in document order, cut at ``max_depth`` and ``max_nodes``."""
+        roots: list[dict[str, Any]] = []
+        rendered: dict[int, dict[str, Any]] = {}
+        depth: dict[int, int] = {}
+        truncated = False
+        for index in range(len(self)):
+            parent = self.parents[index]
+            if parent != -1 and parent not in rendered:
+                continue
+            depth[index] = 0 if parent == -1 else depth[parent] + 1
+            if (max_depth is not None and depth[index] >= max_depth) or len(rendered) >= max_nodes:
+                truncated = True
+                continue
+            node = {
+                "title": self.titles[index],
+                "kind": self.kinds[index],
+                "level": self.levels[index],
+                "start": self.starts[index],
+                "end": self.ends[index],
+                "size": self.ends[index] - self.starts[index],
+                "children": [],
+            }
+            rendered[index] = node
+            (roots if parent == -1 else rendered[parent]["children"]).append(node)
+        return roots, truncated
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "format": self.format,
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "parents": self.parents.tolist(),
+            "levels": self.levels.tolist(),
+            "kinds": self.kinds,
+            "titles": self.titles,
+        }
+
+
+def detect_format(text: str, start: int = 0, end: int | None = None) -> str:
+    """Guess the structure of ``text[start:end]`` from its first 64 KiB."""
+    end = len(text) if end is None else end
+    sample = text[start : min(end, start + _SAMPLE_CHARS)]
+    lines = [line.strip() for line in sample.splitlines()[:200] if line.strip()]
+    if len(lines) >= 3:
+        records = sum(1 for line in lines if line[0] in "{[" and line[-1] in "}]")
+        # The last sampled line may be cut off mid-record.
+        if records >= len(lines) - 1:
+            return "jsonl"
+    if sum(1 for _ in zip(range(2), _FILE_MARKER.finditer(sample))) >= 2:
+        return "source_files"
+    headings = 0
+    for match in _HEADING.finditer(sample):
+        headings += match.group("hashes") is not None
+        if headings >= 2:
+            return "markdown"
+    return "text"
+
+
+def build_outline(
+    text: str,
+    *,
+    documents: Iterable[tuple[str, int, int]] | None = None,
+    fmt: str | None = None,
+) -> Outline:
+    """Outline ``text`` in one pass; with ``documents`` (id, start, end) each document is a root."""
+    if documents is None:
+        outline = Outline(format=fmt or detect_format(text))
+        _outline_range(outline, text, outline.format, 0, len(text), -1)
+        return outline
+    outline = Outline(format="documents")
+    for doc_id, start, end in documents:
+        root = outline.add("document", doc_id, 0, start, end, -1)
+        _outline_range(outline, text, fmt or detect_format(text, start, end), start, end, root)
+    return outline
+
+
+def _outline_range(outline: Outline, text: str, fmt: str, start: int, end: int, parent: int) -> None:
+    if fmt == "markdown":
+        _outline_markdown(outline, text, start, end, parent)
+    elif fmt == "source_files":
+        _outline_files(outline, text, start, end, parent)
+    elif fmt == "jsonl":
+        _outline_records(outline, text, start, end, parent)
+
+
+def _outline_markdown(outline: Outline, text: str, start: int, end: int, parent: int) -> None:
+    stack: list[int] = []
+    in_fence = False
+    for match in _HEADING.finditer(text, start, end):
+        if match.group("fence") is not None:
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        level = len(match.group("hashes"))
+        while stack and outline.levels[stack[-1]] >= level:
+            outline.ends[stack.pop()] = match.start()
+        node = outline.add("heading", match.group("title"), level, match.start(), end, stack[-1] if stack else parent)
+        stack.append(node)
+
+
+def _outline_files(outline: Outline, text: str, start: int, end: int, parent: int) -> None:
+    markers = list(_FILE_MARKER.finditer(text, start, end))
+    for position, match in enumerate(markers):
+        file_end = markers[position + 1].start() if position + 1 < len(markers) else end
+        path = next(value for value in match.groups() if value is not None)
+        node = outline.add("file", path.strip(), 1, match.start(), file_end, parent)
+        symbols = list(_SYMBOL.finditer(text, match.end(), file_end))
+        for index, symbol in enumerate(symbols):
+            symbol_end = symbols[index + 1].start() if index + 1 < len(symbols) else file_end
+            outline.add("symbol", symbol.group("name"), 2, symbol.start(), symbol_end, node)
+
+
+def _outline_records(outline: Outline, text: str, start: int, end: int, parent: int) -> None:
+    total = text.count("\n", start, end) + (0 if text.endswith("\n", start, end) else 1)
+    per_node = 1 if total <= _MAX_RECORD_NODES else -(-total // _RECORD_GROUPS)
+    number = 0
+    group_start = start
+    position = start
+    while position < end:
+        newline = text.find("\n", position, end)
+        line_end = end if newline == -1 else newline + 1
+        number += 1
+        if number % per_node == 0 or line_end >= end:
+            first = number - (number - 1) % per_node
+            if per_node == 1:
+                key = _RECORD_KEY.search(text, position, min(line_end, position + 400))
+                title = f"record {number}" + (f": {key.group('value').strip()}" if key else "")
+            else:
+                title = f"records {first}-{number}"
+            outline.add("record", title, 1, group_start, line_end, parent)
+            group_start = line_end
+        position = line_end
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping
+
+
+@dataclass(slots=True)
+class PipelineNode:
+    name: str
+    code: str
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    # Names of the nodes producing this node's inputs; inputs nobody produces come from the session.
+    depends_on: tuple[str, ...] = ()
+
+
+def build_pipeline(specs: Iterable[Mapping[str, Any]]) -> list[PipelineNode]:
+    """Validate node specs and wire each input to the node declaring it as an output.
+
+    Raises ``ValueError`` for duplicate names, an output declared by two nodes, variable names
+    that are not identifiers, and dependency cycles.
+    """
+    nodes: list[PipelineNode] = []
+    producers: dict[str, str] = {}
+    for spec in specs:
+        name = str(spec.get("name", "")).strip()
+        if not name:
+            raise ValueError("every pipeline node needs a name")
+        if any(node.name == name for node in nodes):
+            raise ValueError(f"duplicate pipeline node name: {name!r}")
+        inputs = tuple(spec.get("inputs") or ())
+        outputs = tuple(spec.get("outputs") or ())
+        for var in inputs + outputs:
+            if not isinstance(var, str) or not var.isidentifier():
+                raise ValueError(f"node {name!r}: {var!r} is not a valid variable name")
+        for var in outputs:
+            if var in producers:
+                raise ValueError(f"variable {var!r} is an output of both {producers[var]!r} and {name!r}")
+            producers[var] = name
+        nodes.append(PipelineNode(name=name, code=str(spec.get("code", "")), inputs=inputs, outputs=outputs))
+    if not nodes:
+        raise ValueError("pipeline has no nodes")
+
+    for node in nodes:
+        # A node may update one of its own inputs in place; that reads the session value.
+        node.depends_on = tuple(
+            dict.fromkeys(producers[var] for var in node.inputs if var in producers and producers[var] != node.name)
+        )
+    _check_acyclic(nodes)
+    return nodes
+
+
+def _check_acyclic(nodes: list[PipelineNode]) -> None:
+    remaining = {node.name: set(node.depends_on) for node in nodes}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"pipeline has a dependency cycle through: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def execute_pipeline(
+    nodes: list[PipelineNode],
+    run_node: Callable[[PipelineNode], Any],
+    on_finished: Callable[[PipelineNode, Any], bool],
+    *,
+    max_parallel: int,
+) -> list[PipelineNode]:
+    """Run ``nodes`` on a thread pool as soon as their dependencies have succeeded.
+
+    ``run_node`` executes in a pool thread; ``on_finished`` runs on the calling thread, one node
+    at a time, and returns False to stop scheduling further nodes (a failed node or a tripped
+    guardrail). Nodes already running are allowed to finish. Returns the nodes that never ran.
+    """
+    max_parallel = max(1, max_parallel)
+    pending = list(nodes)
+    succeeded: set[str] = set()
+    running: dict[Future[Any], PipelineNode] = {}
+    stopped = False
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="rlm-pipeline") as pool:
+        while True:
+            if not stopped:
+                for node in list(pending):
+                    if len(running) >= max_parallel:
+                        break
+                    if all(dep in succeeded for dep in node.depends_on):
+                        pending.remove(node)
+                        running[pool.submit(run_node, node)] = node
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                if on_finished(node, future.result()):
+                    succeeded.add(node.name)
+                else:
+                    stopped = True
+    return pending
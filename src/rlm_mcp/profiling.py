@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any
+
+PROFILE_MODES = ("cpu", "memory")
+
+
+def profile_modes(profile: str | None) -> list[str]:
+    """``"cpu"``, ``"memory"`` or ``"all"`` as the list of profilers the worker should run."""
+    if not profile:
+        return []
+    if profile == "all":
+        return list(PROFILE_MODES)
+    if profile not in PROFILE_MODES:
+        raise ValueError(f"unsupported profile mode: {profile!r}")
+    return [profile]
+
+
+def format_profile_summary(profile: dict[str, Any]) -> str:
+    """Compact text of the top functions and allocation sites; counted against the session budget."""
+    lines: list[str] = []
+    cpu = profile.get("cpu")
+    if cpu is not None:
+        if "error" in cpu:
+            lines.append(f"cpu profile unavailable: {cpu['error']}")
+        else:
+            lines.append(f"cpu {cpu['total_ms']:.1f} ms; top functions by cumulative time:")
+            lines.append(f"{'cum_ms':>10} {'own_ms':>10} {'calls':>8}  function")
+            for where, calls, own_ms, cum_ms in cpu["top"]:
+                lines.append(f"{cum_ms:>10.1f} {own_ms:>10.1f} {calls:>8}  {where}")
+    memory = profile.get("memory")
+    if memory is not None:
+        if "error" in memory:
+            lines.append(f"memory profile unavailable: {memory['error']}")
+        else:
+            lines.append(
+                f"memory peak {_kib(memory['peak_bytes'])}, retained {_kib(memory['retained_bytes'])}; top allocation sites:"
+            )
+            lines.append(f"{'size':>12} {'blocks':>8}  site")
+            for site, size, count in memory["top"]:
+                lines.append(f"{_kib(size):>12} {count:>8}  {site}")
+    return "\n".join(lines)
+
+
+def profile_artifact(profile: dict[str, Any]) -> str:
+    """Full profile text stored behind a handle for ``rlm_read_output``."""
+    sections = []
+    if "full" in profile.get("cpu", {}):
+        sections.append("== cProfile (sorted by cumulative time) ==\n" + profile["cpu"]["full"].strip("\n"))
+    if "full" in profile.get("memory", {}):
+        sections.append("== tracemalloc (allocations still live after the snippet) ==\n" + profile["memory"]["full"])
+    return "\n\n".join(sections) + "\n"
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
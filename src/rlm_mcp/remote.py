@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import json
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+# Wire format shared by RemoteExecutorPool and the sandbox daemon: a 4-byte big-endian length
+# followed by one UTF-8 JSON object. Every connection opens with a small hello frame carrying the
+# token; the daemon accepts larger frames only once that has been verified.
+_HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 512 * 1024 * 1024
+MAX_HELLO_BYTES = 64 * 1024
+PROTOCOL_VERSION = 2
+
+
+class RemoteExecutorError(Exception):
+    """Transport-level failure talking to a sandbox daemon."""
+
+
+class RemoteUnavailableError(RemoteExecutorError):
+    """No sandbox daemon endpoint could be reached."""
+
+
+def parse_endpoint(spec: str) -> tuple[int, str | tuple[str, int]]:
+    """Parse ``unix:/path``, ``tcp:host:port`` or ``host:port`` into a socket family and address."""
+    value = spec.strip()
+    if value.startswith("unix:"):
+        path = value[len("unix:") :]
+        if not path:
+            raise ValueError(f"invalid unix endpoint: {spec!r}")
+        return socket.AF_UNIX, path
+    if value.startswith("tcp:"):
+        value = value[len("tcp:") :]
+    host, sep, port = value.rpartition(":")
+    if not sep or not host or not port.isdigit():
+        raise ValueError(f"invalid endpoint {spec!r}; expected unix:/path or tcp:host:port")
+    return socket.AF_INET6 if ":" in host.strip("[]") else socket.AF_INET, (host.strip("[]"), int(port))
+
+
+def send_message(sock: socket.socket, message: dict[str, Any]) -> None:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    if len(body) > MAX_MESSAGE_BYTES:
+        raise ValueError(f"message of {len(body)} bytes exceeds {MAX_MESSAGE_BYTES}")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_message(sock: socket.socket, *, max_bytes: int = MAX_MESSAGE_BYTES) -> dict[str, Any]:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > max_bytes:
+        raise ValueError(f"message of {size} bytes exceeds {max_bytes}")
+    message = json.loads(_recv_exact(sock, size))
+    if not isinstance(message, dict):
+        raise ValueError("message must be a JSON object")
+    return message
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise EOFError("connection closed by peer")
+        received += count
+    return bytes(buffer)
+
+
+def connect(spec: str, *, timeout: float) -> socket.socket:
+    family, address = parse_endpoint(spec)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+@dataclass(slots=True)
+class _Endpoint:
+    spec: str
+    idle: list[socket.socket] = field(default_factory=list)
+    inflight: int = 0
+    reported_active: int = 0
+    capacity: int = 1
+    completed: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+
+    def load(self) -> float:
+        return max(self.inflight, self.reported_active) / max(1, self.capacity)
+
+
+class RemoteExecutorPool:
+    """Route worker payloads to sandbox daemons with connection pooling, load-aware placement
+    and session affinity."""
+
+    def __init__(
+        self,
+        endpoints: Iterable[str],
+        *,
+        token: str | None = None,
+        max_idle_per_endpoint: int = 4,
+        connect_timeout: float = 2.0,
+        response_grace_seconds: float = 5.0,
+        retry_down_seconds: float = 5.0,
+        max_affinity_entries: int = 10_000,
+    ) -> None:
+        self._endpoints = [_Endpoint(spec=spec.strip()) for spec in endpoints if spec.strip()]
+        if not self._endpoints:
+            raise ValueError("remote sandbox mode requires at least one daemon endpoint")
+        for endpoint in self._endpoints:
+            parse_endpoint(endpoint.spec)
+        self.token = token
+        self.max_idle_per_endpoint = max(0, max_idle_per_endpoint)
+        self.connect_timeout = connect_timeout
+        self.response_grace_seconds = response_grace_seconds
+        self.retry_down_seconds = retry_down_seconds
+        self.max_affinity_entries = max(1, max_affinity_entries)
+        self._affinity: OrderedDict[str, _Endpoint] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, payload: dict[str, Any], *, timeout_ms: int, affinity_key: str | None = None) -> dict[str, Any]:
+        request = {"op": "run", "version": PROTOCOL_VERSION, "payload": payload, "timeout_ms": timeout_ms}
+        tried: set[str] = set()
+        while True:
+            endpoint = self._choose(affinity_key, tried)
+            if endpoint is None:
+                raise RemoteUnavailableError("no sandbox daemon endpoint is reachable")
+            tried.add(endpoint.spec)
+            try:
+                try:
+                    sock, reused = self._checkout(endpoint)
+                except OSError:
+                    # Nothing was sent, so another endpoint can safely take the run.
+                    self._mark_down(endpoint)
+                    continue
+                try:
+                    response = self._request(
+                        endpoint,
+                        sock,
+                        reused,
+                        request,
+                        timeout=timeout_ms / 1000.0 + self.response_grace_seconds,
+                    )
+                except (OSError, EOFError, ValueError) as exc:
+                    self._mark_down(endpoint)
+                    raise RemoteExecutorError(
+                        f"sandbox daemon {endpoint.spec} failed: {type(exc).__name__}: {exc}"
+                    ) from exc
+            finally:
+                with self._lock:
+                    endpoint.inflight -= 1
+
+            self._record_load(endpoint, response.get("load"))
+            if not response.get("ok"):
+                raise RemoteExecutorError(f"sandbox daemon {endpoint.spec} rejected run: {response.get('error')}")
+            return response["result"]
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "endpoint": endpoint.spec,
+                    "inflight": endpoint.inflight,
+                    "reported_active": endpoint.reported_active,
+                    "capacity": endpoint.capacity,
+                    "completed": endpoint.completed,
+                    "failures": endpoint.failures,
+                    "idle_connections": len(endpoint.idle),
+                    "healthy": endpoint.down_until <= now,
+                }
+                for endpoint in self._endpoints
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            for endpoint in self._endpoints:
+                idle, endpoint.idle = endpoint.idle, []
+                for sock in idle:
+                    sock.close()
+
+    def _choose(self, affinity_key: str | None, tried: set[str]) -> _Endpoint | None:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self._endpoints if e.spec not in tried and e.down_until <= now]
+            if not candidates:
+                return None
+            pinned = self._affinity.get(affinity_key) if affinity_key is not None else None
+            if pinned in candidates and pinned.load() < 1.0:
+                chosen = pinned
+            else:
+                chosen = min(candidates, key=_Endpoint.load)
+            if affinity_key is not None:
+                self._affinity[affinity_key] = chosen
+                self._affinity.move_to_end(affinity_key)
+                while len(self._affinity) > self.max_affinity_entries:
+                    self._affinity.popitem(last=False)
+            chosen.inflight += 1
+            return chosen
+
+    def _connect(self, endpoint: _Endpoint) -> socket.socket:
+        sock = connect(endpoint.spec, timeout=self.connect_timeout)
+        hello: dict[str, Any] = {"op": "hello", "version": PROTOCOL_VERSION}
+        if self.token is not None:
+            hello["token"] = self.token
+        try:
+            send_message(sock, hello)
+            response = recv_message(sock, max_bytes=MAX_HELLO_BYTES)
+        except (EOFError, ValueError) as exc:
+            sock.close()
+            raise ConnectionError(f"hello failed: {exc}") from exc
+        except BaseException:
+            sock.close()
+            raise
+        if not response.get("ok"):
+            sock.close()
+            raise RemoteExecutorError(f"sandbox daemon {endpoint.spec} rejected connection: {response.get('error')}")
+        self._record_load(endpoint, response.get("load"))
+        return sock
+
+    def _request(
+        self,
+        endpoint: _Endpoint,
+        sock: socket.socket,
+        reused: bool,
+        request: dict[str, Any],
+        *,
+        timeout: float,
+    ) -> dict[str, Any]:
+        try:
+            sock.settimeout(timeout)
+            send_message(sock, request)
+            response = recv_message(sock)
+        except (BrokenPipeError, ConnectionResetError, EOFError):
+            sock.close()
+            if not reused:
+                raise
+            # The daemon dropped an idle pooled connection before reading; retry on a fresh one.
+            sock = self._connect(endpoint)
+            try:
+                sock.settimeout(timeout)
+                send_message(sock, request)
+                response = recv_message(sock)
+            except BaseException:
+                sock.close()
+                raise
+        except BaseException:
+            sock.close()
+            raise
+        self._checkin(endpoint, sock)
+        return response
+
+    def _checkout(self, endpoint: _Endpoint) -> tuple[socket.socket, bool]:
+        with self._lock:
+            if endpoint.idle:
+                return endpoint.idle.pop(), True
+        return self._connect(endpoint), False
+
+    def _checkin(self, endpoint: _Endpoint, sock: socket.socket) -> None:
+        with self._lock:
+            endpoint.completed += 1
+            if len(endpoint.idle) < self.max_idle_per_endpoint:
+                endpoint.idle.append(sock)
+                return
+        sock.close()
+
+    def _record_load(self, endpoint: _Endpoint, load: Any) -> None:
+        if not isinstance(load, dict):
+            return
+        with self._lock:
+            endpoint.reported_active = int(load.get("active", endpoint.reported_active))
+            endpoint.capacity = max(1, int(load.get("capacity", endpoint.capacity)))
+
+    def _mark_down(self, endpoint: _Endpoint) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.down_until = time.monotonic() + self.retry_down_seconds
+            idle, endpoint.idle = endpoint.idle, []
+        for sock in idle:
+            sock.close()
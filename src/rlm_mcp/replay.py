@@ -0,0 +1,499 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import atexit
+import inspect
+import json
+import os
+import shlex
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from rlm_mcp.errors import RlmMcpError
+
+# Arguments recorded as their size only; replays fill them with synthetic text of that length.
+_SIZED_FIELDS = frozenset({"context_text", "chunk", "text", "final_text"})
+_FILLER = "The quick brown fox jumps over the lazy dog. "
+
+
+class TrajectoryRecorder:
+    """Append every tool call a server handles to a JSON-lines trajectory file.
+
+    Each line holds the tool name, the session it belongs to, its offset from the session's
+    ``rlm_init_context``, its latency, request/response sizes and outcome. ``rlm_spawn_child``
+    events also carry ``child_session``; a child's offsets count from its root session's start.
+    Context text, chunks and document bodies are recorded as ``{"__size__": n}`` so recordings
+    keep the load shape without the data.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._session_starts: dict[str, float] = {}
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+
+    @classmethod
+    def from_env(cls) -> "TrajectoryRecorder | None":
+        path = os.getenv("RLM_RECORD_TRAJECTORIES", "").strip()
+        return cls(path) if path else None
+
+    @classmethod
+    def shared(cls) -> "TrajectoryRecorder | None":
+        """Return this process's recorder for ``RLM_RECORD_TRAJECTORIES``, opening it once.
+
+        Every server built in the process appends through the same descriptor; it is closed at
+        interpreter exit.
+        """
+        path = os.getenv("RLM_RECORD_TRAJECTORIES", "").strip()
+        if not path:
+            return None
+        with _SHARED_LOCK:
+            recorder = _SHARED.get(path)
+            if recorder is None:
+                if not _SHARED:
+                    atexit.register(close_shared_recorders)
+                recorder = _SHARED[path] = cls(path)
+            return recorder
+
+    def wrap(self, tool: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(method)
+
+        def recorded(*args: Any, **kwargs: Any) -> Any:
+            arguments = dict(signature.bind(*args, **kwargs).arguments)
+            return self.call(tool, arguments, lambda: method(*args, **kwargs))
+
+        recorded.__name__ = getattr(method, "__name__", tool)
+        return recorded
+
+    def call(self, tool: str, arguments: dict[str, Any], invoke: Callable[[], Any]) -> Any:
+        """Run ``invoke`` and record it as one ``tool`` call; recorded calls it makes are not recorded."""
+        if getattr(self._local, "active", False):
+            return invoke()
+        started = time.monotonic()
+        self._local.active = True
+        try:
+            result = invoke()
+        except Exception as exc:
+            code = exc.code.value if isinstance(exc, RlmMcpError) else "INTERNAL_ERROR"
+            self.record(tool, arguments, started, None, error_code=code)
+            raise
+        finally:
+            self._local.active = False
+        self.record(tool, arguments, started, result)
+        return result
+
+    def record(
+        self,
+        tool: str,
+        arguments: dict[str, Any],
+        started: float,
+        result: Any,
+        *,
+        error_code: str | None = None,
+    ) -> None:
+        session = arguments.get("session_id")
+        if session is None and isinstance(result, dict):
+            session = result.get("session_id")
+        child = result.get("session_id") if tool == "rlm_spawn_child" and isinstance(result, dict) else None
+        with self._lock:
+            if session is not None:
+                session_start = self._session_starts.setdefault(session, started)
+            else:
+                session_start = started
+            if child is not None:
+                self._session_starts[child] = session_start
+        event = {
+            "ts": time.time(),
+            "session": session,
+            "tool": tool,
+            "offset_s": round(started - session_start, 6),
+            "duration_ms": round((time.monotonic() - started) * 1000, 3),
+            "args": _redact(arguments),
+            "request_chars": len(json.dumps(arguments, ensure_ascii=False, default=str)),
+            "response_chars": len(json.dumps(result, ensure_ascii=False, default=str)) if result is not None else 0,
+            "ok": error_code is None,
+            "error_code": error_code,
+            "guardrail_stop": result.get("guardrail_stop") if isinstance(result, dict) else None,
+        }
+        if child is not None:
+            event["child_session"] = child
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            # One write per event: O_APPEND keeps lines whole when several processes share the file.
+            if self._fd >= 0:
+                os.write(self._fd, line)
+            if tool == "rlm_finalize" and session is not None:
+                self._session_starts.pop(session, None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+_SHARED: dict[str, TrajectoryRecorder] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def close_shared_recorders() -> None:
+    """Close the recorders handed out by ``TrajectoryRecorder.shared``."""
+    with _SHARED_LOCK:
+        recorders = list(_SHARED.values())
+        _SHARED.clear()
+    for recorder in recorders:
+        recorder.close()
+
+
+def _redact(value: Any, key: str | None = None) -> Any:
+    if isinstance(value, str) and key in _SIZED_FIELDS:
+        return {"__size__": len(value)}
+    if isinstance(value, dict):
+        return {k: _redact(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v, key) for v in value]
+    return value
+
+
+def _synthesize(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"__size__"}:
+            size = int(value["__size__"])
+            return (_FILLER * (size // len(_FILLER) + 1))[:size]
+        return {k: _synthesize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_synthesize(v) for v in value]
+    return value
+
+
+@dataclass
+class Trajectory:
+    session: str
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+
+def load_trajectories(path: str) -> list[Trajectory]:
+    """Group a recording into per-session trajectories that start with ``rlm_init_context``.
+
+    Calls on child sessions join the trajectory of the root session that spawned them.
+    """
+    by_session: dict[str, Trajectory] = {}
+    parents: dict[str, str] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            session = event.get("session")
+            if session is None:
+                continue
+            if event.get("child_session"):
+                parents[event["child_session"]] = session
+            by_session.setdefault(session, Trajectory(session)).events.append(event)
+    for child in list(by_session):
+        root = child
+        while root in parents and parents[root] in by_session:
+            root = parents[root]
+        if root != child:
+            by_session[root].events.extend(by_session.pop(child).events)
+    trajectories = []
+    for trajectory in by_session.values():
+        trajectory.events.sort(key=lambda e: e["offset_s"])
+        if trajectory.events and trajectory.events[0]["tool"] == "rlm_init_context":
+            trajectories.append(trajectory)
+    return trajectories
+
+
+@dataclass
+class CallOutcome:
+    ok: bool
+    data: Any = None
+    error_code: str | None = None
+
+
+class HandlerDriver:
+    """Replay target calling ``create_tool_handlers`` in this process, one thread per call."""
+
+    def __init__(self, handlers: dict[str, Callable[..., Any]]) -> None:
+        self.handlers = handlers
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> CallOutcome:
+        try:
+            data = await asyncio.to_thread(self.handlers[tool], **arguments)
+        except RlmMcpError as exc:
+            return CallOutcome(ok=False, error_code=exc.code.value)
+        except Exception:  # noqa: BLE001
+            return CallOutcome(ok=False, error_code="INTERNAL_ERROR")
+        return CallOutcome(ok=True, data=data)
+
+    def server_pid(self) -> int | None:
+        return os.getpid()
+
+    async def close(self) -> None:
+        return None
+
+
+class StdioDriver:
+    """Replay target speaking MCP to a local ``rlm-mcp`` subprocess over stdio."""
+
+    def __init__(self, command: list[str]) -> None:
+        self.command = command
+        self._session: Any = None
+        self._stack: Any = None
+
+    async def start(self) -> None:
+        from contextlib import AsyncExitStack
+
+        from mcp import ClientSession
+        from mcp.client.stdio import StdioServerParameters, stdio_client
+
+        self._stack = AsyncExitStack()
+        # The server under test must not record into the trajectory file being replayed.
+        env = {key: value for key, value in os.environ.items() if key != "RLM_RECORD_TRAJECTORIES"}
+        params = StdioServerParameters(command=self.command[0], args=self.command[1:], env=env)
+        read, write = await self._stack.enter_async_context(stdio_client(params))
+        self._session = await self._stack.enter_async_context(ClientSession(read, write))
+        await self._session.initialize()
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> CallOutcome:
+        try:
+            result = await self._session.call_tool(tool, {"params": _tool_params(arguments)})
+        except Exception:  # noqa: BLE001
+            return CallOutcome(ok=False, error_code="TRANSPORT_ERROR")
+        # Input validation failures come back as plain-text errors, not as a JSON payload.
+        if result.isError:
+            return CallOutcome(ok=False, error_code="TOOL_ERROR")
+        payload = result.structuredContent
+        if payload is None and result.content:
+            try:
+                payload = json.loads(getattr(result.content[0], "text", ""))
+            except ValueError:
+                payload = None
+        if not isinstance(payload, dict):
+            return CallOutcome(ok=False, error_code="TOOL_ERROR")
+        if not payload.get("ok"):
+            return CallOutcome(ok=False, error_code=payload.get("error", {}).get("code"))
+        return CallOutcome(ok=True, data=payload.get("data"))
+
+    def server_pid(self) -> int | None:
+        # The SDK does not expose the child pid; it is the one child of this process running Python.
+        try:
+            for entry in os.listdir("/proc"):
+                if entry.isdigit():
+                    with open(f"/proc/{entry}/stat", encoding="ascii") as handle:
+                        if int(handle.read().rsplit(")", 1)[1].split()[1]) == os.getpid():
+                            return int(entry)
+        except OSError:
+            return None
+        return None
+
+    async def close(self) -> None:
+        if self._stack is not None:
+            await self._stack.aclose()
+
+
+def _tool_params(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Recorded handler arguments as the tool's input model takes them.
+
+    Handlers get the session limits as one ``session_config`` dict while ``rlm_init_context``
+    takes them as top-level fields; unset arguments are left to the model's defaults.
+    """
+    params = {key: value for key, value in arguments.items() if key != "session_config" and value is not None}
+    params.update({key: value for key, value in (arguments.get("session_config") or {}).items() if value is not None})
+    return params
+
+
+@dataclass
+class ReplayReport:
+    wall_seconds: float = 0.0
+    calls: int = 0
+    trajectories: int = 0
+    errors: int = 0
+    guardrail_stops: int = 0
+    stopped_trajectories: int = 0
+    latencies_ms: dict[str, list[float]] = field(default_factory=dict)
+    errors_by_code: dict[str, int] = field(default_factory=dict)
+    rss_samples: list[tuple[float, int]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        per_tool = {}
+        for tool, samples in sorted(self.latencies_ms.items()):
+            ordered = sorted(samples)
+            per_tool[tool] = {
+                "calls": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.50), 3),
+                "p95_ms": round(_percentile(ordered, 0.95), 3),
+                "p99_ms": round(_percentile(ordered, 0.99), 3),
+                "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+            }
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "trajectories": self.trajectories,
+            "calls": self.calls,
+            "throughput_calls_per_s": round(self.calls / self.wall_seconds, 3) if self.wall_seconds else 0.0,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "errors_by_code": self.errors_by_code,
+            "guardrail_stop_rate": round(self.stopped_trajectories / self.trajectories, 4) if self.trajectories else 0.0,
+            "guardrail_stop_calls": self.guardrail_stops,
+            "latency_by_tool": per_tool,
+            "rss_bytes": {
+                "max": max((rss for _, rss in self.rss_samples), default=0),
+                "samples": [[round(t, 2), rss] for t, rss in self.rss_samples],
+            },
+        }
+
+
+async def replay(
+    trajectories: list[Trajectory],
+    driver: Any,
+    *,
+    concurrency: int = 1,
+    iterations: int = 1,
+    speedup: float = 1.0,
+    rss_interval: float = 1.0,
+) -> ReplayReport:
+    """Replay trajectories on ``concurrency`` lanes, each running ``iterations`` of them back to back.
+
+    Calls keep their recorded offsets divided by ``speedup``; ``speedup <= 0`` sends every call
+    as soon as the previous one in its trajectory returns.
+    """
+    if not trajectories:
+        raise ValueError("no replayable trajectories (each needs an rlm_init_context event)")
+    report = ReplayReport()
+    started = time.monotonic()
+    done = asyncio.Event()
+    pid = driver.server_pid()
+
+    async def sample_rss() -> None:
+        while not done.is_set():
+            rss = _rss_bytes(pid)
+            if rss is not None:
+                report.rss_samples.append((time.monotonic() - started, rss))
+            try:
+                await asyncio.wait_for(done.wait(), timeout=rss_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_lane(lane: int) -> None:
+        for iteration in range(iterations):
+            trajectory = trajectories[(lane + iteration * concurrency) % len(trajectories)]
+            await _replay_one(trajectory, driver, report, speedup)
+
+    sampler = asyncio.create_task(sample_rss())
+    try:
+        await asyncio.gather(*(run_lane(lane) for lane in range(concurrency)))
+    finally:
+        report.wall_seconds = time.monotonic() - started
+        done.set()
+        await sampler
+    return report
+
+
+async def _replay_one(trajectory: Trajectory, driver: Any, report: ReplayReport, speedup: float) -> None:
+    started = time.monotonic()
+    # Recorded session ids (the root's and its children's) to the ids the target handed out.
+    session_ids: dict[str, str] = {}
+    stopped = False
+    for event in trajectory.events:
+        if speedup > 0:
+            delay = started + event["offset_s"] / speedup - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        arguments = _synthesize(event.get("args") or {})
+        if "session_id" in arguments:
+            if arguments["session_id"] not in session_ids:
+                # Its init_context or spawn_child failed during this replay.
+                continue
+            arguments["session_id"] = session_ids[arguments["session_id"]]
+
+        call_started = time.monotonic()
+        outcome = await driver.call(event["tool"], arguments)
+        report.latencies_ms.setdefault(event["tool"], []).append((time.monotonic() - call_started) * 1000)
+        report.calls += 1
+        if not outcome.ok:
+            report.errors += 1
+            code = outcome.error_code or "UNKNOWN"
+            report.errors_by_code[code] = report.errors_by_code.get(code, 0) + 1
+            if event["tool"] == "rlm_init_context":
+                break
+            continue
+        if event["tool"] == "rlm_init_context":
+            session_ids[event["session"]] = outcome.data["session_id"]
+        elif event.get("child_session") and isinstance(outcome.data, dict):
+            session_ids[event["child_session"]] = outcome.data["session_id"]
+        if isinstance(outcome.data, dict) and outcome.data.get("guardrail_stop"):
+            report.guardrail_stops += 1
+            stopped = True
+    report.trajectories += 1
+    report.stopped_trajectories += int(stopped)
+
+
+def _rss_bytes(pid: int | None) -> int | None:
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def _run(args: argparse.Namespace, trajectories: list[Trajectory]) -> ReplayReport:
+    if args.target == "stdio":
+        command = shlex.split(args.server_command) if args.server_command else [sys.executable, "-m", "rlm_mcp.server"]
+        driver: Any = StdioDriver(command)
+        await driver.start()
+    else:
+        from rlm_mcp.server import create_tool_handlers
+
+        driver = HandlerDriver(create_tool_handlers())
+    try:
+        return await replay(
+            trajectories,
+            driver,
+            concurrency=args.concurrency,
+            iterations=args.iterations,
+            speedup=args.speedup,
+            rss_interval=args.rss_interval,
+        )
+    finally:
+        await driver.close()
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="rlm-mcp-replay",
+        description="Replay recorded RLM MCP trajectories against a local server and report load metrics.",
+    )
+    parser.add_argument("recording", help="JSON-lines file written with RLM_RECORD_TRAJECTORIES / --record")
+    parser.add_argument("--target", choices=("handlers", "stdio"), default="handlers")
+    parser.add_argument("--concurrency", type=int, default=1, help="trajectories replayed at the same time")
+    parser.add_argument("--iterations", type=int, default=1, help="trajectories each concurrent lane replays in turn")
+    parser.add_argument("--speedup", type=float, default=1.0, help="divide recorded think time by this; 0 = no waits")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="seconds between server RSS samples")
+    parser.add_argument(
+        "--server-command",
+        help="server command line for --target stdio (default: this Python running rlm_mcp.server)",
+    )
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    report = asyncio.run(_run(args, load_trajectories(args.recording)))
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
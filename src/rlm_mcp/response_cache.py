@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class ResponseCache:
+    """LRU of rendered read-only tool responses.
+
+    Keys include the session's state version, so an entry is never invalidated explicitly: any
+    mutation moves the version and later reads miss, while the stale entries age out of the LRU.
+    ``max_entries`` of 0 disables caching.
+    """
+
+    def __init__(self, max_entries: int | None = None) -> None:
+        self.max_entries = max(
+            0, max_entries if max_entries is not None else int(os.getenv("RLM_RESPONSE_CACHE_ENTRIES", "512"))
+        )
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> dict[str, Any] | None:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key: Hashable, response: dict[str, Any]) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from array import array
+
+OUTPUT_STREAMS = ("stdout", "stderr")
+
+
+def output_handle(step_index: int, stream: str) -> str:
+    """Handle of one step's stored stream, unique within its session."""
+    return f"step-{step_index}-{stream}"
+
+
+def encode_output(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def decode_output(data: bytes) -> str:
+    return data.decode("utf-8", "surrogatepass")
+
+
+def line_starts(data: bytes) -> array:
+    """Byte offset at which each line of ``data`` starts; an empty blob has no lines."""
+    starts = array("q")
+    if not data:
+        return starts
+    starts.append(0)
+    position = data.find(b"\n")
+    while position != -1 and position + 1 < len(data):
+        starts.append(position + 1)
+        position = data.find(b"\n", position + 1)
+    return starts
+
+
+def utf8_trim(data: bytes) -> tuple[int, int]:
+    """Bytes to drop from the front and back of ``data`` so it holds only whole UTF-8 characters.
+
+    Byte ranges may cut a multi-byte character in half; callers move their window inward by
+    these amounts so paging through a blob never returns or skips a partial character.
+    """
+    head = 0
+    while head < min(3, len(data)) and data[head] & 0xC0 == 0x80:
+        head += 1
+
+    tail = 0
+    for back in range(1, min(4, len(data) - head) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue
+        need = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+        if need > back:
+            tail = back
+        break
+    return head, tail
@@ -0,0 +1,174 @@
+"""Bulk text analytics for sandbox snippets, importable there as ``rlm_tools``.
+
+Every helper scans with C-level ``re``/``str`` calls and loops in Python at most once per match
+or chunk, never once per line, so snippets over millions of lines stay inside ``RLIMIT_CPU``.
+Patterns are compiled with ``re.MULTILINE`` so ``^`` and ``$`` anchor at lines. The module uses
+only the standard library: the sandbox worker executes this file as the ``rlm_tools`` module.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Iterable
+
+__all__ = ["around", "chunk_by_regex", "chunk_by_size", "count_patterns", "grep", "top_tokens"]
+
+_REGEX_SYNTAX = frozenset("\\.^$*+?{}[]|()")
+
+
+def _compile(pattern: str | re.Pattern[str], ignore_case: bool) -> re.Pattern[str]:
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    return re.compile(pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+
+
+def grep(
+    text: str,
+    pattern: str | re.Pattern[str],
+    *,
+    ignore_case: bool = False,
+    max_matches: int | None = None,
+) -> list[tuple[int, str]]:
+    """``(line_number, line)`` for each line of ``text`` matching ``pattern``; numbers start at 1."""
+    regex = _compile(pattern, ignore_case)
+    found: list[tuple[int, str]] = []
+    line_number = 1
+    counted = 0
+    position = 0
+    while max_matches is None or len(found) < max_matches:
+        match = regex.search(text, position)
+        if match is None:
+            break
+        start = text.rfind("\n", 0, match.start()) + 1
+        end = text.find("\n", match.start())
+        if end == -1:
+            end = len(text)
+        line_number += text.count("\n", counted, start)
+        counted = start
+        found.append((line_number, text[start:end]))
+        # Later matches on the same line would report it again.
+        position = end + 1
+        if position > len(text):
+            break
+    return found
+
+
+def count_patterns(
+    text: str,
+    patterns: Iterable[str],
+    *,
+    ignore_case: bool = False,
+) -> dict[str, int]:
+    """Non-overlapping occurrences of each of ``patterns`` in ``text``.
+
+    Plain strings are counted with ``str.count`` and the rest with one ``findall`` each. Separate
+    C-level scans beat a single combined alternation, which CPython's ``re`` tries branch by
+    branch at every position.
+    """
+    counts = {}
+    for pattern in patterns:
+        if not ignore_case and _REGEX_SYNTAX.isdisjoint(pattern):
+            counts[pattern] = text.count(pattern)
+        else:
+            counts[pattern] = len(_compile(pattern, ignore_case).findall(text))
+    return counts
+
+
+def top_tokens(
+    text: str,
+    k: int = 20,
+    *,
+    pattern: str = r"\w+",
+    lowercase: bool = True,
+    stopwords: Iterable[str] = (),
+) -> list[tuple[str, int]]:
+    """The ``k`` most frequent tokens of ``text`` as ``(token, count)``, most frequent first."""
+    counts = Counter(re.findall(pattern, text.lower() if lowercase else text))
+    for word in stopwords:
+        counts.pop(word, None)
+    return counts.most_common(k)
+
+
+def around(
+    text: str,
+    pattern: str | re.Pattern[str],
+    *,
+    width: int = 200,
+    ignore_case: bool = False,
+    max_windows: int | None = None,
+) -> list[tuple[int, int, str]]:
+    """``width`` characters either side of each match as ``(start, end, text[start:end])``.
+
+    Overlapping windows are merged, so a dense run of matches comes back as one window.
+    """
+    regex = _compile(pattern, ignore_case)
+    windows: list[list[int]] = []
+    for match in regex.finditer(text):
+        start = max(0, match.start() - width)
+        end = min(len(text), match.end() + width)
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+            continue
+        if max_windows is not None and len(windows) >= max_windows:
+            break
+        windows.append([start, end])
+    return [(start, end, text[start:end]) for start, end in windows]
+
+
+def chunk_by_size(text: str, max_chars: int, *, overlap: int = 0) -> list[str]:
+    """Chunks of at most ``max_chars``, each ending at its last newline when it has one.
+
+    With ``overlap`` every chunk after the first starts that many characters before the previous
+    chunk ended.
+    """
+    max_chars = max(1, max_chars)
+    overlap = max(0, min(overlap, max_chars - 1))
+    chunks = []
+    position = 0
+    while position < len(text):
+        end = min(position + max_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", position, end)
+            if newline >= position:
+                end = newline + 1
+        chunks.append(text[position:end])
+        if end >= len(text):
+            break
+        position = max(position + 1, end - overlap)
+    return chunks
+
+
+def chunk_by_regex(
+    text: str,
+    pattern: str | re.Pattern[str],
+    *,
+    max_chars: int | None = None,
+    ignore_case: bool = False,
+) -> list[str]:
+    """Split ``text`` before every match of ``pattern`` (e.g. ``r"^## "`` or ``r"^\\d{4}-\\d\\d-\\d\\d"``).
+
+    With ``max_chars``, consecutive pieces are packed into chunks up to that size and pieces
+    longer than it are cut with :func:`chunk_by_size`.
+    """
+    regex = _compile(pattern, ignore_case)
+    cuts = [match.start() for match in regex.finditer(text) if match.start() > 0]
+    bounds = [0, *dict.fromkeys(cuts), len(text)]
+    pieces = [text[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+    if max_chars is None:
+        return pieces
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        if len(piece) > max_chars:
+            chunks.extend(chunk_by_size(piece, max_chars))
+            continue
+        current.append(piece)
+        size += len(piece)
+    if current:
+        chunks.append("".join(current))
+    return chunks
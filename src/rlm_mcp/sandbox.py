@@ -1,144 +1,142 @@
 from __future__ import annotations
 
+import base64
+import functools
+import hashlib
+import importlib.util
 import json
+import marshal
 import os
+import select
+import selectors
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from dataclasses import dataclass
-from textwrap import dedent
 from typing import Any
 
-_WORKER_CODE = dedent(
-    r"""
-    import builtins
-    import io
-    import json
-    import resource
-    import sys
-    from contextlib import redirect_stderr, redirect_stdout
+from rlm_mcp import rlm_tools
+from rlm_mcp.buffers import BUFFER_TYPES, BufferArena, default_shm_directory, inline_buffer, make_buffer
+from rlm_mcp.remote import RemoteExecutorPool, RemoteUnavailableError
+from rlm_mcp.snippets import CompiledSnippet
+from rlm_mcp.subinterpreter import SubinterpreterPool, SubinterpreterPoolExhaustedError, subinterpreters_supported
 
-    def _encode(value):
-        if isinstance(value, (str, int, float, bool)) or value is None:
-            return value
-        if isinstance(value, list):
-            return [_encode(v) for v in value]
-        if isinstance(value, tuple):
-            return {"__tuple__": [_encode(v) for v in value]}
-        if isinstance(value, set):
-            return {"__set__": [_encode(v) for v in value]}
-        if isinstance(value, dict):
-            return {"__dict__": [[str(k), _encode(v)] for k, v in value.items()]}
-        return {"__repr__": repr(value)}
-
-    def _decode(value):
-        if isinstance(value, list):
-            return [_decode(v) for v in value]
-        if isinstance(value, dict):
-            if "__tuple__" in value:
-                return tuple(_decode(v) for v in value["__tuple__"])
-            if "__set__" in value:
-                return set(_decode(v) for v in value["__set__"])
-            if "__dict__" in value:
-                return {k: _decode(v) for k, v in value["__dict__"]}
-            if "__repr__" in value:
-                return value["__repr__"]
-        return value
-
-    def _apply_limits(payload):
-        cpu_seconds = max(1, int(payload.get("cpu_seconds", 2)))
-        memory_limit_bytes = int(payload.get("memory_limit_bytes", 268435456))
-        max_open_files = max(16, int(payload.get("max_open_files", 32)))
-        max_file_size_bytes = int(payload.get("max_file_size_bytes", 0))
-
-        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
-        if hasattr(resource, "RLIMIT_AS"):
-            resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
-        if hasattr(resource, "RLIMIT_NOFILE"):
-            resource.setrlimit(resource.RLIMIT_NOFILE, (max_open_files, max_open_files))
-        if hasattr(resource, "RLIMIT_FSIZE"):
-            resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_size_bytes, max_file_size_bytes))
-
-    def _build_safe_builtins(allowed_import_roots):
-        safe = {
-            "abs": builtins.abs,
-            "all": builtins.all,
-            "any": builtins.any,
-            "bool": builtins.bool,
-            "dict": builtins.dict,
-            "enumerate": builtins.enumerate,
-            "Exception": builtins.Exception,
-            "float": builtins.float,
-            "int": builtins.int,
-            "isinstance": builtins.isinstance,
-            "len": builtins.len,
-            "list": builtins.list,
-            "max": builtins.max,
-            "min": builtins.min,
-            "print": builtins.print,
-            "range": builtins.range,
-            "set": builtins.set,
-            "sorted": builtins.sorted,
-            "str": builtins.str,
-            "sum": builtins.sum,
-            "tuple": builtins.tuple,
-            "zip": builtins.zip,
-        }
+_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_worker.py")
+_WORKER_FILENAME = "<rlm-worker>"
 
-        def guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
-            root = name.split(".")[0]
-            if root not in allowed_import_roots:
-                raise ImportError(f"import '{name}' is blocked by sandbox policy")
-            return builtins.__import__(name, globals, locals, fromlist, level)
 
-        safe["__import__"] = guarded_import
-        return safe
+def _load_worker_source() -> str:
+    # Workers cannot import rlm_mcp, so the `rlm_tools` module travels as source inside the worker.
+    with open(_WORKER_PATH, encoding="utf-8") as handle:
+        worker = handle.read()
+    with open(rlm_tools.__file__, encoding="utf-8") as handle:
+        tools = handle.read()
+    placeholder = "_RLM_TOOLS_SOURCE = None\n"
+    if placeholder not in worker:
+        raise RuntimeError(f"{_WORKER_PATH} lacks the rlm_tools placeholder")
+    return worker.replace(placeholder, f"_RLM_TOOLS_SOURCE = {tools!r}\n", 1)
 
-    def _trim_output(text, limit):
-        if len(text) <= limit:
-            return text
-        return text[:limit] + "\n...[truncated by sandbox output limit]...\n"
 
-    def main():
-        payload = json.loads(sys.stdin.read())
-        _apply_limits(payload)
+_WORKER_CODE = _load_worker_source()
 
-        allowed_import_roots = set(payload.get("allowed_import_roots", []))
-        safe_builtins = _build_safe_builtins(allowed_import_roots)
-        scope = {"__builtins__": safe_builtins}
-        for key, value in payload.get("env", {}).items():
-            scope[key] = _decode(value)
+# Runs the worker source passed as argv[1] under its own filename, as the subinterpreter pool does,
+# so watchdogs and profiles can tell worker frames from snippet frames.
+_WORKER_LAUNCHER = f"import sys; exec(compile(sys.argv[1], {_WORKER_FILENAME!r}, 'exec'))"
 
-        stdout_buffer = io.StringIO()
-        stderr_buffer = io.StringIO()
-        error = None
-        code = payload.get("code", "")
-        output_limit = int(payload.get("max_output_chars", 200000))
 
-        try:
-            with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
-                exec(code, scope, scope)
-        except Exception as exc:
-            error = f"{type(exc).__name__}: {exc}"
-            if stderr_buffer.getvalue() == "":
-                stderr_buffer.write(error + "\n")
-
-        out_env = {}
-        for key, value in scope.items():
-            if not key.startswith("__"):
-                out_env[key] = _encode(value)
-
-        result = {
-            "stdout": _trim_output(stdout_buffer.getvalue(), output_limit),
-            "stderr": _trim_output(stderr_buffer.getvalue(), output_limit),
-            "error": error,
-            "env": out_env,
-        }
-        sys.stdout.write(json.dumps(result))
+@functools.lru_cache(maxsize=1)
+def worker_bytecode_path() -> str | None:
+    """Write the compiled worker once as a ``.pyc`` that ``python -I -S <path>`` runs directly.
 
-    if __name__ == "__main__":
-        main()
+    The file name carries a digest of the assembled source and the interpreter's cache tag, so an
+    upgrade never runs stale bytecode; the files earlier sources left behind are removed.
+    It goes to ``RLM_WORKER_CACHE_DIR``, else the package's ``__pycache__``, else a private
+    temporary directory; ``None`` means no location was writable and workers fall back to
+    compiling the source passed with ``-c``.
     """
-)
+    source = _WORKER_CODE.encode("utf-8")
+    name = f"_worker.{hashlib.sha256(source).hexdigest()[:16]}.{sys.implementation.cache_tag}.pyc"
+    code = compile(_WORKER_CODE, _WORKER_FILENAME, "exec")
+    # PEP 552 header for unchecked hash-based bytecode: nothing on disk is compared at load time.
+    data = importlib.util.MAGIC_NUMBER + (1).to_bytes(4, "little") + importlib.util.source_hash(source)
+    data += marshal.dumps(code)
+    configured = os.getenv("RLM_WORKER_CACHE_DIR")
+    candidates = [configured] if configured else [os.path.join(os.path.dirname(_WORKER_PATH), "__pycache__")]
+    for directory in candidates:
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "rb") as handle:
+                if handle.read() == data:
+                    _prune_worker_bytecode(directory, name)
+                    return path
+        except OSError:
+            pass
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, partial = tempfile.mkstemp(prefix=name, suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(partial, path)
+        except OSError:
+            continue
+        _prune_worker_bytecode(directory, name)
+        return path
+    try:
+        path = os.path.join(tempfile.mkdtemp(prefix="rlm-worker-"), name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+    except OSError:
+        return None
+    return path
+
+
+def _prune_worker_bytecode(directory: str, keep: str) -> None:
+    # Only this interpreter's files: another Python sharing the directory keeps its own.
+    prefix, suffix = "_worker.", f".{sys.implementation.cache_tag}.pyc"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for entry in names:
+        if entry == keep or not (entry.startswith(prefix) and entry.endswith(suffix)):
+            continue
+        digest = entry[len(prefix) : -len(suffix)]
+        # ``_worker.<tag>.pyc`` without a digest is the import cache of _worker.py itself.
+        if len(digest) != 16 or digest.strip("0123456789abcdef"):
+            continue
+        try:
+            os.unlink(os.path.join(directory, entry))
+        except OSError:
+            pass
+
+
+def _worker_invocation() -> list[str]:
+    path = worker_bytecode_path()
+    if path and not os.path.exists(path):
+        # Pruned by a server with a different worker source sharing the cache directory.
+        worker_bytecode_path.cache_clear()
+        path = worker_bytecode_path()
+    return [path] if path else ["-c", _WORKER_LAUNCHER, _WORKER_CODE]
+
+
+@functools.lru_cache(maxsize=1)
+def namespaces_supported() -> bool:
+    """Probe once whether this kernel lets us create unprivileged user/mount/net/pid namespaces."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        probe = subprocess.run(
+            ["unshare", "--user", "--map-root-user", "--mount", "--net", "--pid", "--fork", "true"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return probe.returncode == 0
 
 
 @dataclass(slots=True)
@@ -146,6 +144,105 @@ class SandboxResult:
     stdout: str
     stderr: str
     error: str | None = None
+    stdout_dropped_chars: int = 0
+    stderr_dropped_chars: int = 0
+    cpu_ms: int = 0
+    peak_memory_bytes: int = 0
+    profile: dict[str, Any] | None = None
+
+
+def _communicate(proc: subprocess.Popen, data: bytes, timeout: float) -> tuple[bytes, bytes, Any, bool]:
+    """Feed ``data`` to the worker, collect its output and reap it with ``wait4()``.
+
+    ``Popen.communicate`` reaps the child itself and loses its resource usage, so the pipes are
+    driven here until the worker exits (reported by a pidfd, else polled with ``waitid`` and
+    ``WNOWAIT``), and ``os.wait4`` then collects the CPU time even when a limit killed the worker.
+    A worker still running at ``timeout`` is killed. Returns ``(stdout, stderr, rusage,
+    timed_out)``; ``rusage`` is ``None`` on platforms with neither.
+    """
+    try:
+        pidfd: int | None = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+        if not hasattr(os, "waitid"):
+            try:
+                stdout, stderr = proc.communicate(data, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                return stdout, stderr, None, True
+            return stdout, stderr, None, False
+
+    assert proc.stdin is not None and proc.stdout is not None and proc.stderr is not None
+    output: dict[int, list[bytes]] = {proc.stdout.fileno(): [], proc.stderr.fileno(): []}
+    view = memoryview(data)
+    written = 0
+    exited = timed_out = False
+    deadline = time.monotonic() + timeout
+    try:
+        with selectors.DefaultSelector() as selector:
+            if pidfd is not None:
+                selector.register(pidfd, selectors.EVENT_READ)
+            for fd in output:
+                selector.register(fd, selectors.EVENT_READ)
+            if data:
+                selector.register(proc.stdin, selectors.EVENT_WRITE)
+            else:
+                proc.stdin.close()
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Output still held open by an exited worker's descendants is not waited for.
+                    timed_out = not exited if pidfd is not None else not _has_exited(proc.pid)
+                    break
+                for key, _ in selector.select(remaining):
+                    if key.fileobj is proc.stdin:
+                        try:
+                            written += os.write(key.fd, view[written : written + select.PIPE_BUF])
+                        except BrokenPipeError:
+                            written = len(data)
+                        if written >= len(data):
+                            selector.unregister(proc.stdin)
+                            proc.stdin.close()
+                    elif key.fd == pidfd:
+                        exited = True
+                        selector.unregister(pidfd)
+                    else:
+                        chunk = os.read(key.fd, 65536)
+                        if chunk:
+                            output[key.fd].append(chunk)
+                        else:
+                            selector.unregister(key.fd)
+        # Without a pidfd the loop ends at EOF on the pipes, which may precede the exit.
+        while pidfd is None and not (timed_out or _has_exited(proc.pid)):
+            if time.monotonic() >= deadline:
+                timed_out = True
+            else:
+                time.sleep(0.002)
+        if timed_out:
+            proc.kill()
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+        for stream in (proc.stdin, proc.stdout, proc.stderr):
+            stream.close()
+    stdout, stderr = (b"".join(chunks) for chunks in output.values())
+    return stdout, stderr, rusage, timed_out
+
+
+def _has_exited(pid: int) -> bool:
+    # WNOWAIT leaves the child unreaped, so os.wait4 still gets its resource usage.
+    return os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+
+
+def _rusage_cpu_ms(rusage: Any) -> int:
+    # Only CPU time is taken from wait4(): its ru_maxrss includes the server's own RSS inherited
+    # across fork+exec, so peak memory comes from the worker's report instead.
+    if rusage is None:
+        return 0
+    return int((rusage.ru_utime + rusage.ru_stime) * 1000)
 
 
 class SandboxExecutor:
@@ -156,26 +253,51 @@ class SandboxExecutor:
         memory_limit_mb: int = 256,
         max_open_files: int = 32,
         max_output_chars: int = 200_000,
+        max_output_hard_chars: int = 0,
         allowed_import_roots: tuple[str, ...] | None = None,
         fallback_to_subprocess: bool = True,
         container_runtime: str | None = None,
         container_image: str | None = None,
         container_pids_limit: int = 128,
         container_tmpfs_size_mb: int = 32,
+        subinterpreter_pool_size: int = 4,
+        namespace_seccomp: bool = True,
+        remote_endpoints: tuple[str, ...] | None = None,
+        remote_token: str | None = None,
+        shm_directory: str | None = None,
     ) -> None:
         mode = (sandbox_mode or os.getenv("RLM_SANDBOX_MODE", "subprocess")).strip().lower()
-        if mode not in {"subprocess", "container"}:
-            raise ValueError("sandbox_mode must be 'subprocess' or 'container'")
+        if mode not in {"subprocess", "container", "subinterpreter", "namespace", "remote"}:
+            raise ValueError(
+                "sandbox_mode must be 'subprocess', 'container', 'subinterpreter', 'namespace' or 'remote'"
+            )
 
         self.sandbox_mode = mode
         self.memory_limit_mb = memory_limit_mb
         self.max_open_files = max_open_files
         self.max_output_chars = max_output_chars
+        self.max_output_hard_chars = max(0, max_output_hard_chars)
         self.fallback_to_subprocess = fallback_to_subprocess
         self.container_runtime = (container_runtime or os.getenv("RLM_SANDBOX_CONTAINER_RUNTIME", "docker")).strip()
         self.container_image = (container_image or os.getenv("RLM_SANDBOX_CONTAINER_IMAGE", "python:3.12-alpine")).strip()
         self.container_pids_limit = max(32, container_pids_limit)
         self.container_tmpfs_size_mb = max(8, container_tmpfs_size_mb)
+        self.subinterpreter_pool_size = max(1, subinterpreter_pool_size)
+        self._subinterpreters: SubinterpreterPool | None = None
+        self._subinterpreters_lock = threading.Lock()
+        self.namespace_seccomp = namespace_seccomp
+        # Directory for typed-buffer arenas; "" sends buffers inline. Containers and remote daemons
+        # cannot see this host's /dev/shm, so their buffers always go inline.
+        self.shm_directory = default_shm_directory() if shm_directory is None else shm_directory or None
+        if mode in {"container", "remote"}:
+            self.shm_directory = None
+        self.remote_endpoints = remote_endpoints or tuple(
+            spec.strip() for spec in os.getenv("RLM_SANDBOX_REMOTE_ENDPOINTS", "").split(",") if spec.strip()
+        )
+        self.remote_token = remote_token or os.getenv("RLM_SANDBOX_REMOTE_TOKEN") or None
+        self._remote: RemoteExecutorPool | None = None
+        if mode == "remote":
+            self._remote = RemoteExecutorPool(self.remote_endpoints, token=self.remote_token)
         self.allowed_import_roots = allowed_import_roots or (
             "math",
             "statistics",
@@ -185,20 +307,97 @@ class SandboxExecutor:
             "itertools",
             "functools",
             "collections",
+            "array",
+            "rlm_tools",
         )
 
-    def run(self, code: str, env: dict[str, Any], timeout_ms: int = 2000) -> SandboxResult:
+    def run(
+        self,
+        code: str,
+        env: dict[str, Any],
+        timeout_ms: int = 2000,
+        *,
+        compiled: CompiledSnippet | None = None,
+        affinity_key: str | None = None,
+        corpus: dict[str, Any] | None = None,
+        profile: list[str] | None = None,
+        dedup: dict[str, Any] | None = None,
+        outline: dict[str, Any] | None = None,
+    ) -> SandboxResult:
+        arena = BufferArena(self.shm_directory, self.memory_limit_mb * 1024 * 1024) if self.shm_directory else None
+        try:
+            return self._run(code, env, timeout_ms, compiled, affinity_key, corpus, profile, dedup, outline, arena)
+        finally:
+            if arena is not None:
+                arena.close()
+
+    def _run(
+        self,
+        code: str,
+        env: dict[str, Any],
+        timeout_ms: int,
+        compiled: CompiledSnippet | None,
+        affinity_key: str | None,
+        corpus: dict[str, Any] | None,
+        profile: list[str] | None,
+        dedup: dict[str, Any] | None,
+        outline: dict[str, Any] | None,
+        arena: BufferArena | None,
+    ) -> SandboxResult:
         payload = {
             "code": code,
-            "env": {key: self._encode_value(value) for key, value in env.items()},
+            "env": {key: self._encode_value(value, arena) for key, value in env.items()},
+            **self.policy_payload(timeout_ms),
+        }
+        if corpus is not None:
+            # Exposed to the snippet as the read-only `docs` sequence.
+            payload["corpus"] = corpus
+        if dedup is not None:
+            payload["dedup"] = dedup
+        if outline is not None:
+            payload["outline"] = outline
+        if arena is not None:
+            arena.flush()
+            payload["buffers"] = arena.spec()
+        if profile:
+            # "cpu" runs the snippet under cProfile, "memory" under tracemalloc.
+            payload["profile"] = list(profile)
+        if compiled is not None:
+            # Workers running the same interpreter version reuse the service-side code object.
+            payload["code_object"] = base64.b64encode(compiled.marshalled).decode("ascii")
+            payload["code_cache_tag"] = sys.implementation.cache_tag
+
+        if self.sandbox_mode == "remote":
+            result, updates = self._execute_remote(payload, timeout_ms=timeout_ms, affinity_key=affinity_key)
+        else:
+            result, updates = self._execute_local(payload, timeout_ms=timeout_ms)
+
+        self._apply_env_updates(env, updates, arena)
+        return result
+
+    def policy_payload(self, timeout_ms: int) -> dict[str, Any]:
+        """Resource limits and import policy of this executor, as worker payload fields."""
+        return {
             "cpu_seconds": max(1, int((timeout_ms / 1000.0) + 1)),
             "memory_limit_bytes": self.memory_limit_mb * 1024 * 1024,
             "max_open_files": self.max_open_files,
             "max_file_size_bytes": 0,
             "max_output_chars": self.max_output_chars,
+            "max_output_hard_chars": self.max_output_hard_chars,
+            "timeout_ms": timeout_ms,
             "allowed_import_roots": list(self.allowed_import_roots),
         }
 
+    def execute_payload(self, payload: dict[str, Any], *, timeout_ms: int) -> tuple[SandboxResult, dict[str, Any]]:
+        """Run a prepared worker payload on this host; env updates are returned still encoded.
+
+        Buffer arenas belong to ``run``; an external payload's ``buffers`` field is dropped so it
+        cannot point the worker at files of its choosing.
+        """
+        payload = {key: value for key, value in payload.items() if key != "buffers"}
+        return self._execute_local(payload, timeout_ms=timeout_ms)
+
+    def _execute_local(self, payload: dict[str, Any], *, timeout_ms: int) -> tuple[SandboxResult, dict[str, Any]]:
         if self.sandbox_mode == "container":
             container_cmd = self._build_container_command()
             result, updates = self._execute_worker(container_cmd, payload, timeout_ms=timeout_ms, timeout_label="container")
@@ -209,19 +408,45 @@ class SandboxExecutor:
                     timeout_ms=timeout_ms,
                     timeout_label="subprocess",
                 )
-        else:
-            result, updates = self._execute_worker(
-                self._build_subprocess_command(),
-                payload,
-                timeout_ms=timeout_ms,
-                timeout_label="subprocess",
-            )
+            return result, updates
+        if self.sandbox_mode == "subinterpreter":
+            return self._execute_subinterpreter(payload, timeout_ms=timeout_ms)
+        if self.sandbox_mode == "namespace":
+            return self._execute_namespace(payload, timeout_ms=timeout_ms)
+        return self._execute_worker(
+            self._build_subprocess_command(),
+            payload,
+            timeout_ms=timeout_ms,
+            timeout_label="subprocess",
+        )
 
-        self._apply_env_updates(env, updates)
-        return result
+    def _execute_remote(
+        self,
+        payload: dict[str, Any],
+        *,
+        timeout_ms: int,
+        affinity_key: str | None,
+    ) -> tuple[SandboxResult, dict[str, Any]]:
+        assert self._remote is not None
+        try:
+            result = self._remote.run(payload, timeout_ms=timeout_ms, affinity_key=affinity_key)
+        except RemoteUnavailableError as exc:
+            if self.fallback_to_subprocess:
+                return self._execute_worker(
+                    self._build_subprocess_command(),
+                    payload,
+                    timeout_ms=timeout_ms,
+                    timeout_label="subprocess",
+                )
+            error = f"RemoteUnavailableError: {exc}"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        except Exception as exc:  # noqa: BLE001
+            error = f"SandboxProcessError: remote: {exc}"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        return self._parse_worker_result(result)
 
     def _build_subprocess_command(self) -> list[str]:
-        return [sys.executable, "-I", "-S", "-c", _WORKER_CODE]
+        return [sys.executable, "-I", "-S", *_worker_invocation()]
 
     def _build_container_command(self) -> list[str]:
         return [
@@ -251,9 +476,53 @@ class SandboxExecutor:
             "-I",
             "-S",
             "-c",
+            _WORKER_LAUNCHER,
             _WORKER_CODE,
         ]
 
+    def _build_namespace_command(self) -> list[str]:
+        return [
+            "unshare",
+            "--user",
+            "--map-root-user",
+            "--mount",
+            "--net",
+            "--pid",
+            "--fork",
+            "--kill-child",
+            "--mount-proc",
+            sys.executable,
+            "-I",
+            "-S",
+            *_worker_invocation(),
+        ]
+
+    def _execute_namespace(
+        self,
+        payload: dict[str, Any],
+        *,
+        timeout_ms: int,
+    ) -> tuple[SandboxResult, dict[str, Any]]:
+        if not namespaces_supported():
+            if self.fallback_to_subprocess:
+                return self._execute_worker(
+                    self._build_subprocess_command(),
+                    payload,
+                    timeout_ms=timeout_ms,
+                    timeout_label="subprocess",
+                )
+            error = "NamespaceUnavailableError: unprivileged user namespaces are not available"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+
+        jailed = dict(payload)
+        jailed["jail"] = {"tmpfs_size_mb": self.container_tmpfs_size_mb, "seccomp": self.namespace_seccomp}
+        return self._execute_worker(
+            self._build_namespace_command(),
+            jailed,
+            timeout_ms=timeout_ms,
+            timeout_label="namespace",
+        )
+
     def _execute_worker(
         self,
         command: list[str],
@@ -268,30 +537,30 @@ class SandboxExecutor:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
             )
-            stdout, stderr = proc.communicate(
-                input=json.dumps(payload),
-                timeout=max(1.0, timeout_ms / 1000.0),
+            raw_stdout, raw_stderr, rusage, timed_out = _communicate(
+                proc,
+                json.dumps(payload).encode("utf-8"),
+                max(1.0, timeout_ms / 1000.0),
             )
-        except subprocess.TimeoutExpired:
-            proc.kill()
-            proc.communicate()
-            error = f"TimeoutError: sandbox {timeout_label} timed out"
-            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
         except Exception as exc:  # pragma: no cover
             error = f"SandboxProcessError: {type(exc).__name__}: {exc}"
             return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        if timed_out:
+            error = f"TimeoutError: sandbox {timeout_label} timed out"
+            return self._failed_run(error, rusage), {}
+        stdout = raw_stdout.decode("utf-8", "replace")
+        stderr = raw_stderr.decode("utf-8", "replace")
 
         if proc.returncode != 0:
             if proc.returncode < 0 and abs(proc.returncode) in {9, 24, 25}:
                 error = f"TimeoutError: sandbox {timeout_label} exceeded execution limits"
-                return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+                return self._failed_run(error, rusage), {}
             error = f"SandboxProcessError: {timeout_label} exited with code {proc.returncode}"
             detail = (stderr or "").strip()
             if detail:
                 error = f"{error}: {detail}"
-            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+            return self._failed_run(error, rusage), {}
 
         try:
             result = json.loads(stdout)
@@ -300,6 +569,65 @@ class SandboxExecutor:
             detail = (stderr or "").strip()
             if detail:
                 error = f"{error}: {detail}"
+            return self._failed_run(error, rusage), {}
+
+        parsed, updates = self._parse_worker_result(result)
+        # The worker's own report covers containers, where the reaped child is only the CLI;
+        # wait4() also counts interpreter startup and helper processes such as unshare.
+        parsed.cpu_ms = max(parsed.cpu_ms, _rusage_cpu_ms(rusage))
+        return parsed, updates
+
+    @staticmethod
+    def _failed_run(error: str, rusage: Any) -> SandboxResult:
+        # A killed worker reports nothing itself; its CPU time still counts against the session.
+        return SandboxResult(stdout="", stderr=error + "\n", error=error, cpu_ms=_rusage_cpu_ms(rusage))
+
+    def _execute_subinterpreter(
+        self,
+        payload: dict[str, Any],
+        *,
+        timeout_ms: int,
+    ) -> tuple[SandboxResult, dict[str, Any]]:
+        if not subinterpreters_supported():
+            if self.fallback_to_subprocess:
+                return self._execute_worker(
+                    self._build_subprocess_command(),
+                    payload,
+                    timeout_ms=timeout_ms,
+                    timeout_label="subprocess",
+                )
+            error = "SubinterpreterUnavailableError: isolated subinterpreters require CPython 3.12+"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+
+        try:
+            result = self._subinterpreter_pool().run(payload, timeout_ms=timeout_ms)
+        except SubinterpreterPoolExhaustedError as exc:
+            if self.fallback_to_subprocess:
+                return self._execute_worker(
+                    self._build_subprocess_command(),
+                    payload,
+                    timeout_ms=timeout_ms,
+                    timeout_label="subprocess",
+                )
+            error = f"SubinterpreterUnavailableError: {exc}"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        except TimeoutError:
+            error = "TimeoutError: sandbox subinterpreter timed out"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        except Exception as exc:  # noqa: BLE001
+            error = f"SandboxProcessError: subinterpreter failed: {type(exc).__name__}: {exc}"
+            return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
+        return self._parse_worker_result(result)
+
+    def _subinterpreter_pool(self) -> SubinterpreterPool:
+        with self._subinterpreters_lock:
+            if self._subinterpreters is None:
+                self._subinterpreters = SubinterpreterPool(_WORKER_CODE, size=self.subinterpreter_pool_size)
+            return self._subinterpreters
+
+    def _parse_worker_result(self, result: Any) -> tuple[SandboxResult, dict[str, Any]]:
+        if not isinstance(result, dict):
+            error = "SandboxProcessError: invalid worker response"
             return SandboxResult(stdout="", stderr=error + "\n", error=error), {}
 
         updates = result.get("env", {})
@@ -311,43 +639,55 @@ class SandboxExecutor:
                 stdout=result.get("stdout", ""),
                 stderr=result.get("stderr", ""),
                 error=result.get("error"),
+                stdout_dropped_chars=int(result.get("stdout_dropped_chars", 0)),
+                stderr_dropped_chars=int(result.get("stderr_dropped_chars", 0)),
+                cpu_ms=int(result.get("cpu_ms", 0)),
+                peak_memory_bytes=int(result.get("peak_memory_bytes", 0)),
+                profile=result.get("profile"),
             ),
             updates,
         )
 
-    def _apply_env_updates(self, env: dict[str, Any], updates: dict[str, Any]) -> None:
+    def _apply_env_updates(self, env: dict[str, Any], updates: dict[str, Any], arena: BufferArena | None = None) -> None:
         for key, value in updates.items():
-            env[key] = self._decode_value(value)
+            env[key] = self._decode_value(value, arena)
 
     @staticmethod
     def _is_runtime_missing_error(error: str) -> bool:
         return "FileNotFoundError" in error or "No such file or directory" in error
 
     @staticmethod
-    def _encode_value(value: Any) -> Any:
+    def _encode_value(value: Any, arena: BufferArena | None = None) -> Any:
         if isinstance(value, (str, int, float, bool)) or value is None:
             return value
         if isinstance(value, list):
-            return [SandboxExecutor._encode_value(v) for v in value]
+            return [SandboxExecutor._encode_value(v, arena) for v in value]
         if isinstance(value, tuple):
-            return {"__tuple__": [SandboxExecutor._encode_value(v) for v in value]}
+            return {"__tuple__": [SandboxExecutor._encode_value(v, arena) for v in value]}
         if isinstance(value, set):
-            return {"__set__": [SandboxExecutor._encode_value(v) for v in value]}
+            return {"__set__": [SandboxExecutor._encode_value(v, arena) for v in value]}
         if isinstance(value, dict):
-            return {"__dict__": [[str(k), SandboxExecutor._encode_value(v)] for k, v in value.items()]}
+            return {"__dict__": [[str(k), SandboxExecutor._encode_value(v, arena)] for k, v in value.items()]}
+        if isinstance(value, BUFFER_TYPES):
+            return {"__buffer__": arena.encode(value) if arena is not None else inline_buffer(value)}
         return {"__repr__": repr(value)}
 
     @staticmethod
-    def _decode_value(value: Any) -> Any:
+    def _decode_value(value: Any, arena: BufferArena | None = None) -> Any:
         if isinstance(value, list):
-            return [SandboxExecutor._decode_value(v) for v in value]
+            return [SandboxExecutor._decode_value(v, arena) for v in value]
         if isinstance(value, dict):
             if "__tuple__" in value:
-                return tuple(SandboxExecutor._decode_value(v) for v in value["__tuple__"])
+                return tuple(SandboxExecutor._decode_value(v, arena) for v in value["__tuple__"])
             if "__set__" in value:
-                return set(SandboxExecutor._decode_value(v) for v in value["__set__"])
+                return set(SandboxExecutor._decode_value(v, arena) for v in value["__set__"])
             if "__dict__" in value:
-                return {k: SandboxExecutor._decode_value(v) for k, v in value["__dict__"]}
+                return {k: SandboxExecutor._decode_value(v, arena) for k, v in value["__dict__"]}
+            if "__buffer__" in value:
+                descriptor = value["__buffer__"]
+                if arena is not None:
+                    return arena.decode(descriptor)
+                return make_buffer(descriptor, base64.b64decode(descriptor.get("b64", "")))
             if "__repr__" in value:
                 return value["__repr__"]
         return value
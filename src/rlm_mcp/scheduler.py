@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+
+# A session that has used all of its step/budget/runtime allowance jumps this many runs ahead of
+# its own client's other sessions; half-way sessions jump half as far.
+_PRIORITY_WEIGHT = 2.0
+_WAIT_SAMPLES = 1024
+
+
+@dataclass(slots=True)
+class _Ticket:
+    client_id: str
+    session_id: str
+    priority: float
+    memory_bytes: int
+    seq: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+
+
+class AdmissionScheduler:
+    """Admission control in front of the sandbox: caps concurrent runs and their reserved memory.
+
+    Waiting runs are ordered by start-time fair queueing over clients, then over the sessions of
+    the chosen client, with sessions close to finishing moved ahead. A full queue or a run that
+    waited longer than ``max_wait_seconds`` is rejected with ``SERVER_BUSY`` and a retry hint.
+
+    Limits are per process. With ``shard=(index, count)`` this process takes its share of the
+    configured concurrency, memory budget and queue, so ``count`` server processes on one host
+    stay within the host-wide settings (each still runs at least one sandbox).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrent: int | None = None,
+        max_memory_bytes: int | None = None,
+        max_queue: int | None = None,
+        max_queue_per_client: int | None = None,
+        max_wait_seconds: float | None = None,
+        shard: tuple[int, int] | None = None,
+    ) -> None:
+        index, count = shard or (0, 1)
+        self.max_concurrent = max(
+            1,
+            _share(max_concurrent or _env_int("RLM_MAX_CONCURRENT_SANDBOXES") or os.cpu_count() or 1, index, count),
+        )
+        memory_mb = _env_int("RLM_SANDBOX_MEMORY_BUDGET_MB")
+        self.max_memory_bytes = _share(
+            max_memory_bytes or (memory_mb * 1024 * 1024 if memory_mb else _default_memory_budget()), index, count
+        )
+        self.max_queue = max(
+            0, _share(max_queue if max_queue is not None else _env_int("RLM_SCHEDULER_MAX_QUEUE") or 64, index, count)
+        )
+        self.max_queue_per_client = max_queue_per_client if max_queue_per_client is not None else self.max_queue
+        self.max_wait_seconds = (
+            max_wait_seconds if max_wait_seconds is not None else float(os.getenv("RLM_SCHEDULER_MAX_WAIT_SECONDS", "30"))
+        )
+
+        self._cond = threading.Condition()
+        self._waiting: list[_Ticket] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._client_tags: dict[str, float] = {}
+        self._session_tags: dict[str, float] = {}
+        self.active = 0
+        self.reserved_memory_bytes = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._wait_ms: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._run_seconds: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    @contextmanager
+    def admit(
+        self,
+        *,
+        client_id: str,
+        session_id: str,
+        priority: float = 0.0,
+        memory_bytes: int = 0,
+    ) -> Iterator[None]:
+        """Block until the run may start; raises ``RlmMcpError(SERVER_BUSY)`` instead of queueing forever."""
+        ticket = self._enqueue(client_id, session_id, priority, min(max(0, memory_bytes), self.max_memory_bytes))
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(ticket, time.monotonic() - started)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            waits = sorted(self._wait_ms)
+            per_client: dict[str, int] = {}
+            for ticket in self._waiting:
+                per_client[ticket.client_id] = per_client.get(ticket.client_id, 0) + 1
+            return {
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "reserved_memory_bytes": self.reserved_memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "queue_depth": len(self._waiting),
+                "max_queue": self.max_queue,
+                "queue_depth_by_client": per_client,
+                "oldest_wait_ms": int(max((now - t.enqueued_at for t in self._waiting), default=0.0) * 1000),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms": {
+                    "samples": len(waits),
+                    "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    "p50": round(_percentile(waits, 0.50), 3),
+                    "p95": round(_percentile(waits, 0.95), 3),
+                    "max": round(waits[-1], 3) if waits else 0.0,
+                },
+            }
+
+    def _enqueue(self, client_id: str, session_id: str, priority: float, memory_bytes: int) -> _Ticket:
+        with self._cond:
+            ticket = _Ticket(
+                client_id=client_id,
+                session_id=session_id,
+                priority=min(max(priority, 0.0), 1.0),
+                memory_bytes=memory_bytes,
+                seq=next(self._seq),
+            )
+            self._client_tags[client_id] = max(self._client_tags.get(client_id, 0.0), self._virtual_time)
+            self._session_tags[session_id] = max(self._session_tags.get(session_id, 0.0), self._virtual_time)
+            if not self._waiting and self._fits(ticket):
+                self._grant(ticket)
+                return ticket
+
+            client_depth = sum(1 for t in self._waiting if t.client_id == client_id)
+            if len(self._waiting) >= self.max_queue or client_depth >= self.max_queue_per_client:
+                self.rejected += 1
+                raise self._busy("sandbox queue is full")
+
+            self._waiting.append(ticket)
+            self._dispatch()
+            deadline = ticket.enqueued_at + self.max_wait_seconds
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self.timed_out += 1
+                    self._dispatch()
+                    raise self._busy(f"sandbox run waited more than {self.max_wait_seconds:g}s for a slot")
+                self._cond.wait(remaining)
+            return ticket
+
+    def _release(self, ticket: _Ticket, run_seconds: float) -> None:
+        with self._cond:
+            self.active -= 1
+            self.reserved_memory_bytes -= ticket.memory_bytes
+            self._run_seconds.append(run_seconds)
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        granted = False
+        while self._waiting:
+            ticket = self._next_ticket()
+            # The chosen run waits for memory rather than being overtaken, so large runs cannot starve.
+            if not self._fits(ticket):
+                break
+            self._waiting.remove(ticket)
+            self._grant(ticket)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+        self._forget_idle_tags()
+
+    def _next_ticket(self) -> _Ticket:
+        client_id = min(
+            self._waiting,
+            key=lambda t: (self._client_tags.get(t.client_id, 0.0), t.seq),
+        ).client_id
+        return min(
+            (t for t in self._waiting if t.client_id == client_id),
+            key=lambda t: (self._session_tags.get(t.session_id, 0.0) - t.priority * _PRIORITY_WEIGHT, t.seq),
+        )
+
+    def _fits(self, ticket: _Ticket) -> bool:
+        return (
+            self.active < self.max_concurrent
+            and self.reserved_memory_bytes + ticket.memory_bytes <= self.max_memory_bytes
+        )
+
+    def _grant(self, ticket: _Ticket) -> None:
+        self._virtual_time = max(self._virtual_time, self._client_tags[ticket.client_id])
+        self._client_tags[ticket.client_id] += 1.0
+        self._session_tags[ticket.session_id] += 1.0
+        ticket.granted = True
+        self.active += 1
+        self.reserved_memory_bytes += ticket.memory_bytes
+        self.admitted += 1
+        self._wait_ms.append((time.monotonic() - ticket.enqueued_at) * 1000)
+
+    def _forget_idle_tags(self) -> None:
+        # Tags only matter relative to the virtual clock; idle clients restart from it anyway.
+        if len(self._client_tags) + len(self._session_tags) < 4096:
+            return
+        waiting_clients = {t.client_id for t in self._waiting}
+        waiting_sessions = {t.session_id for t in self._waiting}
+        self._client_tags = {k: v for k, v in self._client_tags.items() if k in waiting_clients}
+        self._session_tags = {k: v for k, v in self._session_tags.items() if k in waiting_sessions}
+
+    def _busy(self, reason: str) -> RlmMcpError:
+        return RlmMcpError(
+            ErrorCode.SERVER_BUSY,
+            f"{reason} ({len(self._waiting)} queued, {self.active} running)",
+            retry_after_seconds=self._retry_after(),
+        )
+
+    def _retry_after(self) -> float:
+        average_run = sum(self._run_seconds) / len(self._run_seconds) if self._run_seconds else 1.0
+        backlog_rounds = (len(self._waiting) + self.active) / self.max_concurrent
+        return round(min(max(1.0, average_run * backlog_rounds), 60.0), 1)
+
+
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def _share(total: int, index: int, count: int) -> int:
+    # Process ``index`` of ``count``: an even split with the remainder going to the first ones.
+    count = max(1, count)
+    return total // count + (1 if index < total % count else 0)
+
+
+def _default_memory_budget() -> int:
+    # Half of physical memory leaves room for the server processes and the page cache.
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (ValueError, OSError, AttributeError):
+        return 4 * 1024 * 1024 * 1024
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
@@ -1,37 +1,195 @@
 from __future__ import annotations
 
+import argparse
 import json
+import os
+import threading
 from enum import Enum
-from typing import Any, Callable
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Literal, Mapping
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from rlm_mcp.errors import RlmMcpError
 from rlm_mcp.models import SessionConfig
-from rlm_mcp.service import RlmMcpService
+from rlm_mcp.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from rlm_mcp.replay import TrajectoryRecorder
+    from rlm_mcp.service import RlmMcpService
+
+_RECORDED_METHODS = (
+    "init_context",
+    "append_context",
+    "seal_context",
+    "spawn_child",
+    "run_repl",
+    "run_pipeline",
+    "read_output",
+    "find_duplicates",
+    "outline",
+    "get_var",
+    "finalize",
+    "get_trace",
+    "scheduler_stats",
+)
 
 
 class RlmMcpServer:
-    """Thin wrapper exposing service methods as MCP-like primitive handlers."""
+    """Thin wrapper exposing service methods as MCP-like primitive handlers.
+
+    Without a ``service`` one is built by ``service_factory`` (default ``RlmMcpService()``) on the
+    first tool call, so a freshly spawned stdio server answers ``tools/list`` before the service
+    and sandbox modules are imported.
+    """
+
+    def __init__(
+        self,
+        service: RlmMcpService | None = None,
+        recorder: TrajectoryRecorder | None = None,
+        responses: ResponseCache | None = None,
+        *,
+        service_factory: Callable[[], RlmMcpService] | None = None,
+    ) -> None:
+        self._service = service
+        self._service_factory = service_factory
+        self._service_lock = threading.Lock()
+        if recorder is None and os.getenv("RLM_RECORD_TRAJECTORIES", "").strip():
+            from rlm_mcp.replay import TrajectoryRecorder
 
-    def __init__(self, service: RlmMcpService | None = None) -> None:
-        self.service = service or RlmMcpService()
+            recorder = TrajectoryRecorder.shared()
+        self.recorder = recorder
+        self.responses = responses if responses is not None else ResponseCache()
+        if self.recorder is not None:
+            for name in _RECORDED_METHODS:
+                setattr(self, name, self.recorder.wrap(f"rlm_{name}", getattr(self, name)))
 
-    def init_context(self, context_text: str, session_config: dict[str, Any] | None = None) -> dict[str, Any]:
+    @property
+    def service(self) -> RlmMcpService:
+        if self._service is None:
+            with self._service_lock:
+                if self._service is None:
+                    self._service = self._service_factory() if self._service_factory else _default_service()
+        return self._service
+
+    def init_context(
+        self,
+        context_text: str | None = None,
+        session_config: dict[str, Any] | None = None,
+        client_id: str | None = None,
+        documents: list[dict[str, Any]] | None = None,
+        streaming: bool = False,
+        outline: bool = False,
+    ) -> dict[str, Any]:
         cfg = SessionConfig(**session_config) if session_config else SessionConfig()
-        session_id = self.service.init_context(context_text, cfg)
+        session_id = self.service.init_context(
+            context_text or "",
+            cfg,
+            client_id=client_id,
+            documents=documents,
+            streaming=streaming,
+            outline=outline,
+        )
         return {
             "session_id": session_id,
+            "streaming": streaming,
+            "documents": len(documents) if documents is not None else None,
             "config": {
                 "max_steps": cfg.max_steps,
                 "max_runtime_ms": cfg.max_runtime_ms,
                 "budget_limit": cfg.budget_limit,
+                "max_cpu_ms": cfg.max_cpu_ms,
+                "max_peak_memory_mb": cfg.max_peak_memory_mb,
             },
             "counters": {"step_index": 0, "budget_used": 0},
         }
 
-    def run_repl(self, session_id: str, code: str) -> dict[str, Any]:
-        return self.service.run_repl(session_id, code)
+    def append_context(
+        self,
+        session_id: str,
+        seq: int,
+        chunk: str,
+        doc_id: str | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        return self.service.append_context(session_id, seq, chunk, doc_id=doc_id, metadata=metadata)
+
+    def seal_context(self, session_id: str) -> dict[str, Any]:
+        return self.service.seal_context(session_id)
+
+    def spawn_child(
+        self,
+        session_id: str,
+        budget: int,
+        start: int = 0,
+        end: int | None = None,
+        label: str | None = None,
+        result_var: str = "child_results",
+    ) -> dict[str, Any]:
+        return self.service.spawn_child(session_id, start, end, budget, label=label, result_var=result_var)
+
+    def run_repl(
+        self,
+        session_id: str,
+        code: str,
+        max_inline_output_chars: int | None = None,
+        profile: str | None = None,
+    ) -> dict[str, Any]:
+        return self.service.run_repl(
+            session_id,
+            code,
+            max_inline_output_chars=max_inline_output_chars,
+            profile=profile,
+        )
+
+    def run_pipeline(
+        self,
+        session_id: str,
+        nodes: list[dict[str, Any]],
+        max_parallel: int | None = None,
+        max_inline_output_chars: int | None = None,
+    ) -> dict[str, Any]:
+        return self.service.run_pipeline(
+            session_id,
+            nodes,
+            max_parallel=max_parallel,
+            max_inline_output_chars=max_inline_output_chars,
+        )
+
+    def read_output(
+        self,
+        session_id: str,
+        handle: str,
+        offset: int = 0,
+        length: int = 65_536,
+        start_line: int | None = None,
+        line_count: int | None = None,
+    ) -> dict[str, Any]:
+        return self.service.read_output(
+            session_id,
+            handle,
+            offset=offset,
+            length=length,
+            start_line=start_line,
+            line_count=line_count,
+        )
+
+    def find_duplicates(
+        self,
+        session_id: str,
+        chunk_chars: int | None = None,
+        threshold: float | None = None,
+        max_clusters: int = 100,
+    ) -> dict[str, Any]:
+        return self.service.find_duplicates(
+            session_id,
+            chunk_chars=chunk_chars,
+            threshold=threshold,
+            max_clusters=max_clusters,
+        )
+
+    def outline(self, session_id: str, max_depth: int | None = None, max_nodes: int = 500) -> dict[str, Any]:
+        return self.service.outline(session_id, max_depth=max_depth, max_nodes=max_nodes)
 
     def get_var(self, session_id: str, var_name: str) -> dict[str, Any]:
         return self.service.get_var(session_id, var_name)
@@ -47,16 +205,81 @@ class RlmMcpServer:
     def get_trace(self, session_id: str, from_step: int | None = None, to_step: int | None = None) -> list[dict[str, Any]]:
         return self.service.get_trace(session_id, from_step=from_step, to_step=to_step)
 
+    def scheduler_stats(self) -> dict[str, Any]:
+        return self.service.scheduler_stats()
+
+    def cached_read(
+        self,
+        tool: str,
+        session_id: str,
+        args: Mapping[str, Any],
+        read: Callable[[], Any],
+        *,
+        response_format: ResponseFormat,
+        if_version: int | None = None,
+    ) -> dict[str, Any]:
+        """Rendered response of a read-only tool, reused while the session's version is unchanged.
+
+        A caller passing the version it already holds gets a ``not_modified`` response instead.
+        """
+        if self.recorder is not None:
+            # Recorded here rather than by the wrapped read, so cache hits and not_modified
+            # replies show up in the trajectory too.
+            return self.recorder.call(
+                tool,
+                {"session_id": session_id, **args},
+                lambda: self._cached_read(
+                    tool, session_id, args, read, response_format=response_format, if_version=if_version
+                ),
+            )
+        return self._cached_read(tool, session_id, args, read, response_format=response_format, if_version=if_version)
+
+    def _cached_read(
+        self,
+        tool: str,
+        session_id: str,
+        args: Mapping[str, Any],
+        read: Callable[[], Any],
+        *,
+        response_format: ResponseFormat,
+        if_version: int | None,
+    ) -> dict[str, Any]:
+        version = self.service.session_version(session_id)
+        if if_version == version:
+            return _tool_not_modified(version, response_format=response_format)
+        key = (tool, session_id, version, response_format.value, json.dumps(args, sort_keys=True, default=str))
+        response = self.responses.get(key)
+        if response is None:
+            response = _tool_success(read(), response_format=response_format, version=version)
+            # Keep it only if nothing mutated the session while it was being read.
+            if self.service.session_version(session_id) == version:
+                self.responses.put(key, response)
+        return response
+
+
+def _default_service() -> RlmMcpService:
+    from rlm_mcp.service import RlmMcpService
+
+    return RlmMcpService()
+
 
 def create_tool_handlers(service: RlmMcpService | None = None) -> dict[str, Callable[..., Any]]:
     server = RlmMcpServer(service)
     return {
         # Preferred names with service prefix.
         "rlm_init_context": server.init_context,
+        "rlm_append_context": server.append_context,
+        "rlm_seal_context": server.seal_context,
+        "rlm_spawn_child": server.spawn_child,
         "rlm_run_repl": server.run_repl,
+        "rlm_run_pipeline": server.run_pipeline,
+        "rlm_read_output": server.read_output,
+        "rlm_find_duplicates": server.find_duplicates,
+        "rlm_outline": server.outline,
         "rlm_get_var": server.get_var,
         "rlm_finalize": server.finalize,
         "rlm_get_trace": server.get_trace,
+        "rlm_scheduler_stats": server.scheduler_stats,
         # Backward-compat aliases.
         "init_context": server.init_context,
         "run_repl": server.run_repl,
@@ -71,13 +294,97 @@ class ResponseFormat(str, Enum):
     MARKDOWN = "markdown"
 
 
+class DocumentInput(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: str = Field(..., min_length=1, max_length=512)
+    text: str = Field(...)
+    metadata: dict[str, Any] = Field(default_factory=dict)
+
+
 class InitContextInput(BaseModel):
     model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
 
-    context_text: str = Field(..., min_length=1, description="Long context to load into in-memory session state.")
+    context_text: str | None = Field(
+        default=None,
+        min_length=1,
+        description="Long context to load into in-memory session state.",
+    )
+    documents: list[DocumentInput] | None = Field(
+        default=None,
+        min_length=1,
+        description="Documents to load instead of context_text; snippets see them as `docs`.",
+    )
     max_steps: int = Field(default=64, ge=1, le=10_000)
     max_runtime_ms: int = Field(default=120_000, ge=1_000, le=3_600_000)
     budget_limit: int = Field(default=100_000, ge=1_000, le=10_000_000)
+    max_cpu_ms: int | None = Field(default=None, ge=100, description="Cumulative sandbox CPU time allowed.")
+    max_peak_memory_mb: int | None = Field(default=None, ge=1, description="Peak sandbox RSS allowed in any step.")
+    client_id: str | None = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        description="Caller identity used for fair sandbox scheduling across clients.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+    streaming: bool = Field(
+        default=False,
+        description="Open an empty session and upload the context with rlm_append_context + rlm_seal_context.",
+    )
+    outline: bool = Field(
+        default=False,
+        description="Detect the context format and build its section outline now instead of on first rlm_outline.",
+    )
+
+    @model_validator(mode="after")
+    def validate_context_source(self) -> "InitContextInput":
+        if self.streaming:
+            if self.context_text is not None or self.documents is not None:
+                raise ValueError("a streaming session starts empty; send text with rlm_append_context")
+        elif (self.context_text is None) == (self.documents is None):
+            raise ValueError("provide exactly one of context_text or documents")
+        return self
+
+
+class AppendContextInput(BaseModel):
+    # No whitespace stripping: chunk boundaries may fall anywhere in the text.
+    model_config = ConfigDict(extra="forbid")
+
+    session_id: str = Field(..., min_length=1, description="Session id from rlm_init_context(streaming=true).")
+    seq: int = Field(..., ge=0, description="0-based chunk number; resending an acknowledged seq is a no-op.")
+    chunk: str = Field(..., min_length=1)
+    doc_id: str | None = Field(
+        default=None,
+        min_length=1,
+        max_length=512,
+        description="Document this chunk belongs to; a new id starts the next document.",
+    )
+    metadata: dict[str, Any] | None = Field(default=None, description="Metadata of the document started by this chunk.")
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class SealContextInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1)
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class SpawnChildInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1, description="Parent session id.")
+    start: int = Field(default=0, ge=0, description="First context character of the child.")
+    end: int | None = Field(default=None, ge=1, description="End of the child's slice (exclusive); default end of context.")
+    budget: int = Field(..., ge=1, description="Budget moved from the parent's remaining budget to the child.")
+    label: str | None = Field(default=None, min_length=1, max_length=128, description="Key of the child's answer.")
+    result_var: str = Field(
+        default="child_results",
+        min_length=1,
+        max_length=64,
+        description="Parent dict variable that collects child answers on finalize.",
+    )
     response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
 
 
@@ -86,6 +393,99 @@ class RunReplInput(BaseModel):
 
     session_id: str = Field(..., min_length=1, description="Session id from rlm_init_context.")
     code: str = Field(..., min_length=1, max_length=50_000, description="Python code snippet to execute.")
+    max_inline_output_chars: int | None = Field(
+        default=None,
+        ge=0,
+        description="Longer stdout/stderr is stored behind a handle for rlm_read_output; 0 keeps it inline.",
+    )
+    profile: Literal["cpu", "memory", "all"] | None = Field(
+        default=None,
+        description="Run under cProfile (cpu), tracemalloc (memory) or both; the full profile is kept behind a handle.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class PipelineNodeInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    name: str = Field(..., min_length=1, max_length=64, description="Unique node name.")
+    code: str = Field(..., min_length=1, max_length=50_000, description="Python snippet for this node.")
+    inputs: list[str] = Field(
+        default_factory=list,
+        max_length=64,
+        description="Variables the node reads: outputs of other nodes, else session variables.",
+    )
+    outputs: list[str] = Field(default_factory=list, max_length=64, description="Variables the node must define.")
+
+
+class RunPipelineInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1, description="Session id from rlm_init_context.")
+    nodes: list[PipelineNodeInput] = Field(..., min_length=1, max_length=64, description="DAG nodes; edges follow inputs.")
+    max_parallel: int | None = Field(default=None, ge=1, le=32, description="Nodes run at once; default scheduler capacity.")
+    max_inline_output_chars: int | None = Field(
+        default=None,
+        ge=0,
+        description="Longer node stdout/stderr is stored behind a handle for rlm_read_output; 0 keeps it inline.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class ReadOutputInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1)
+    handle: str = Field(..., min_length=1, max_length=128, description="stdout_handle/stderr_handle from rlm_run_repl.")
+    offset: int = Field(default=0, ge=0, description="First byte to read; use next_offset to page.")
+    length: int = Field(default=65_536, ge=16, le=1_000_000, description="Bytes to read from offset.")
+    start_line: int | None = Field(default=None, ge=0, description="Read whole lines from this 0-based line instead.")
+    line_count: int | None = Field(default=None, ge=1, le=100_000)
+    if_version: int | None = Field(
+        default=None,
+        ge=0,
+        description="Version from an earlier response; if the session is unchanged only not_modified is returned.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+    @model_validator(mode="after")
+    def validate_range(self) -> "ReadOutputInput":
+        if self.line_count is not None and self.start_line is None:
+            raise ValueError("line_count requires start_line")
+        return self
+
+
+class FindDuplicatesInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1)
+    chunk_chars: int | None = Field(
+        default=None,
+        ge=64,
+        le=1_000_000,
+        description="Chunk size for contexts without documents (default 4000); documents are used as chunks otherwise.",
+    )
+    threshold: float | None = Field(default=None, gt=0.0, le=1.0, description="Minimum estimated Jaccard similarity.")
+    max_clusters: int = Field(default=100, ge=1, le=10_000, description="Maximum clusters listed in the response.")
+    if_version: int | None = Field(
+        default=None,
+        ge=0,
+        description="Version from an earlier response; if the session is unchanged only not_modified is returned.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class OutlineInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
+    session_id: str = Field(..., min_length=1)
+    max_depth: int | None = Field(default=None, ge=1, le=16, description="Deepest section level listed.")
+    max_nodes: int = Field(default=500, ge=1, le=20_000, description="Maximum sections listed in the response.")
+    if_version: int | None = Field(
+        default=None,
+        ge=0,
+        description="Version from an earlier response; if the session is unchanged only not_modified is returned.",
+    )
     response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
 
 
@@ -94,6 +494,11 @@ class GetVarInput(BaseModel):
 
     session_id: str = Field(..., min_length=1)
     var_name: str = Field(..., min_length=1, max_length=256)
+    if_version: int | None = Field(
+        default=None,
+        ge=0,
+        description="Version from an earlier response; if the session is unchanged only not_modified is returned.",
+    )
     response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
 
 
@@ -118,6 +523,17 @@ class GetTraceInput(BaseModel):
     session_id: str = Field(..., min_length=1)
     from_step: int | None = Field(default=None, ge=0)
     to_step: int | None = Field(default=None, ge=0)
+    if_version: int | None = Field(
+        default=None,
+        ge=0,
+        description="Version from an earlier response; if the session is unchanged only not_modified is returned.",
+    )
+    response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
+
+
+class SchedulerStatsInput(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, extra="forbid")
+
     response_format: ResponseFormat = Field(default=ResponseFormat.JSON)
 
 
@@ -127,20 +543,37 @@ def _as_markdown(data: Any) -> str:
     return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2, default=str) + "\n```"
 
 
-def _tool_success(data: Any, response_format: ResponseFormat = ResponseFormat.JSON) -> dict[str, Any]:
+def _tool_success(
+    data: Any,
+    response_format: ResponseFormat = ResponseFormat.JSON,
+    version: int | None = None,
+) -> dict[str, Any]:
+    response: dict[str, Any] = {"ok": True, "format": response_format.value}
+    if version is not None:
+        response["version"] = version
     if response_format == ResponseFormat.MARKDOWN:
-        return {
-            "ok": True,
-            "format": response_format.value,
-            "markdown": _as_markdown(data),
-            "data": data,
-        }
-    return {"ok": True, "format": response_format.value, "data": data}
+        response["markdown"] = _as_markdown(data)
+    response["data"] = data
+    return response
+
+
+def _tool_not_modified(version: int, response_format: ResponseFormat = ResponseFormat.JSON) -> dict[str, Any]:
+    response: dict[str, Any] = {"ok": True, "format": response_format.value, "version": version, "not_modified": True}
+    if response_format == ResponseFormat.MARKDOWN:
+        response["markdown"] = f"Not modified since version {version}."
+    return response
 
 
 def _tool_error(exc: Exception, response_format: ResponseFormat = ResponseFormat.JSON) -> dict[str, Any]:
     error_payload: dict[str, Any]
-    if isinstance(exc, RlmMcpError):
+    if isinstance(exc, RlmMcpError) and exc.retry_after_seconds is not None:
+        error_payload = {
+            "code": exc.code.value,
+            "message": exc.message,
+            "retry_after_seconds": exc.retry_after_seconds,
+            "next_step": f"Server is at capacity; retry the same call after {exc.retry_after_seconds:g} seconds.",
+        }
+    elif isinstance(exc, RlmMcpError):
         error_payload = {
             "code": exc.code.value,
             "message": exc.message,
@@ -169,8 +602,28 @@ def _tool_error(exc: Exception, response_format: ResponseFormat = ResponseFormat
     return {"ok": False, "format": response_format.value, "error": error_payload}
 
 
-def build_mcp_app(service: RlmMcpService | None = None) -> Any:
-    """Build FastMCP app lazily so non-MCP tests can run without SDK installed."""
+async def _in_thread(call: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking service call on a worker thread so the event loop keeps serving requests.
+
+    FastMCP calls sync tools directly on the loop; a snippet waiting on the sandbox would then
+    stall every other request of the process, including admission backpressure and drain.
+    """
+    import anyio.to_thread
+
+    return await anyio.to_thread.run_sync(partial(call, *args, **kwargs))
+
+
+def build_mcp_app(
+    service: RlmMcpService | None = None,
+    *,
+    service_factory: Callable[[], RlmMcpService] | None = None,
+    **settings: Any,
+) -> Any:
+    """Build FastMCP app lazily so non-MCP tests can run without SDK installed.
+
+    ``settings`` are passed to ``FastMCP`` (host, port, stateless_http, ...) for HTTP transports.
+    ``service_factory`` defers building the service to the first tool call; see ``RlmMcpServer``.
+    """
     try:
         from mcp.server.fastmcp import FastMCP
     except ModuleNotFoundError as exc:
@@ -178,8 +631,8 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "MCP SDK is not installed. Install dependencies first: `python -m pip install -e .`."
         ) from exc
 
-    server = RlmMcpServer(service)
-    mcp = FastMCP("rlm_mcp")
+    server = RlmMcpServer(service, service_factory=service_factory)
+    mcp = FastMCP("rlm_mcp", **settings)
 
     @mcp.tool(
         name="rlm_init_context",
@@ -191,21 +644,97 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "openWorldHint": False,
         },
     )
-    def rlm_init_context(params: InitContextInput) -> dict[str, Any]:
+    async def rlm_init_context(params: InitContextInput) -> dict[str, Any]:
         """Create a new in-memory RLM session and load long context."""
         try:
-            payload = server.init_context(
+            payload = await _in_thread(
+                server.init_context,
                 context_text=params.context_text,
                 session_config={
                     "max_steps": params.max_steps,
                     "max_runtime_ms": params.max_runtime_ms,
                     "budget_limit": params.budget_limit,
+                    "max_cpu_ms": params.max_cpu_ms,
+                    "max_peak_memory_mb": params.max_peak_memory_mb,
                 },
+                client_id=params.client_id,
+                documents=[document.model_dump() for document in params.documents] if params.documents else None,
+                streaming=params.streaming,
+                outline=params.outline,
             )
             return _tool_success(payload, response_format=params.response_format)
         except Exception as exc:  # noqa: BLE001
             return _tool_error(exc, response_format=params.response_format)
 
+    @mcp.tool(
+        name="rlm_append_context",
+        annotations={
+            "title": "Append Context Chunk",
+            "readOnlyHint": False,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_append_context(params: AppendContextInput) -> dict[str, Any]:
+        """Append one numbered chunk to a streaming session's context."""
+        try:
+            data = await _in_thread(
+                server.append_context,
+                session_id=params.session_id,
+                seq=params.seq,
+                chunk=params.chunk,
+                doc_id=params.doc_id,
+                metadata=params.metadata,
+            )
+            return _tool_success(data, response_format=params.response_format)
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_seal_context",
+        annotations={
+            "title": "Seal Streamed Context",
+            "readOnlyHint": False,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_seal_context(params: SealContextInput) -> dict[str, Any]:
+        """Finish a chunked upload so the session can run REPL steps."""
+        try:
+            data = await _in_thread(server.seal_context, session_id=params.session_id)
+            return _tool_success(data, response_format=params.response_format)
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_spawn_child",
+        annotations={
+            "title": "Spawn Child Session",
+            "readOnlyHint": False,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_spawn_child(params: SpawnChildInput) -> dict[str, Any]:
+        """Create a child session over a slice of the parent's context with part of its budget."""
+        try:
+            data = await _in_thread(
+                server.spawn_child,
+                session_id=params.session_id,
+                budget=params.budget,
+                start=params.start,
+                end=params.end,
+                label=params.label,
+                result_var=params.result_var,
+            )
+            return _tool_success(data, response_format=params.response_format)
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
     @mcp.tool(
         name="rlm_run_repl",
         annotations={
@@ -216,14 +745,135 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "openWorldHint": False,
         },
     )
-    def rlm_run_repl(params: RunReplInput) -> dict[str, Any]:
+    async def rlm_run_repl(params: RunReplInput) -> dict[str, Any]:
         """Execute Python snippet against session environment with guardrails."""
         try:
-            data = server.run_repl(session_id=params.session_id, code=params.code)
+            data = await _in_thread(
+                server.run_repl,
+                session_id=params.session_id,
+                code=params.code,
+                max_inline_output_chars=params.max_inline_output_chars,
+                profile=params.profile,
+            )
+            return _tool_success(data, response_format=params.response_format)
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_run_pipeline",
+        annotations={
+            "title": "Run Snippet Pipeline",
+            "readOnlyHint": False,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_run_pipeline(params: RunPipelineInput) -> dict[str, Any]:
+        """Run a DAG of snippets server-side, in parallel where independent, with per-node results."""
+        try:
+            data = await _in_thread(
+                server.run_pipeline,
+                session_id=params.session_id,
+                nodes=[node.model_dump() for node in params.nodes],
+                max_parallel=params.max_parallel,
+                max_inline_output_chars=params.max_inline_output_chars,
+            )
             return _tool_success(data, response_format=params.response_format)
         except Exception as exc:  # noqa: BLE001
             return _tool_error(exc, response_format=params.response_format)
 
+    @mcp.tool(
+        name="rlm_read_output",
+        annotations={
+            "title": "Read Stored Step Output",
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_read_output(params: ReadOutputInput) -> dict[str, Any]:
+        """Read a byte or line range of a large stdout/stderr stored by rlm_run_repl."""
+        try:
+            return await _in_thread(
+                server.cached_read,
+                "rlm_read_output",
+                params.session_id,
+                params.model_dump(include={"handle", "offset", "length", "start_line", "line_count"}),
+                lambda: server.read_output(
+                    session_id=params.session_id,
+                    handle=params.handle,
+                    offset=params.offset,
+                    length=params.length,
+                    start_line=params.start_line,
+                    line_count=params.line_count,
+                ),
+                response_format=params.response_format,
+                if_version=params.if_version,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_find_duplicates",
+        annotations={
+            "title": "Find Near-Duplicate Chunks",
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_find_duplicates(params: FindDuplicatesInput) -> dict[str, Any]:
+        """Cluster near-duplicate context chunks (MinHash/LSH) and name one representative per cluster."""
+        try:
+            return await _in_thread(
+                server.cached_read,
+                "rlm_find_duplicates",
+                params.session_id,
+                params.model_dump(include={"chunk_chars", "threshold", "max_clusters"}),
+                lambda: server.find_duplicates(
+                    session_id=params.session_id,
+                    chunk_chars=params.chunk_chars,
+                    threshold=params.threshold,
+                    max_clusters=params.max_clusters,
+                ),
+                response_format=params.response_format,
+                if_version=params.if_version,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_outline",
+        annotations={
+            "title": "Context Outline",
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_outline(params: OutlineInput) -> dict[str, Any]:
+        """Section tree of the context (Markdown headings, source files and symbols, JSONL records) with offsets."""
+        try:
+            return await _in_thread(
+                server.cached_read,
+                "rlm_outline",
+                params.session_id,
+                params.model_dump(include={"max_depth", "max_nodes"}),
+                lambda: server.outline(
+                    session_id=params.session_id,
+                    max_depth=params.max_depth,
+                    max_nodes=params.max_nodes,
+                ),
+                response_format=params.response_format,
+                if_version=params.if_version,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
     @mcp.tool(
         name="rlm_get_var",
         annotations={
@@ -234,11 +884,18 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "openWorldHint": False,
         },
     )
-    def rlm_get_var(params: GetVarInput) -> dict[str, Any]:
+    async def rlm_get_var(params: GetVarInput) -> dict[str, Any]:
         """Read one variable from session state."""
         try:
-            data = server.get_var(session_id=params.session_id, var_name=params.var_name)
-            return _tool_success(data, response_format=params.response_format)
+            return await _in_thread(
+                server.cached_read,
+                "rlm_get_var",
+                params.session_id,
+                {"var_name": params.var_name},
+                lambda: server.get_var(session_id=params.session_id, var_name=params.var_name),
+                response_format=params.response_format,
+                if_version=params.if_version,
+            )
         except Exception as exc:  # noqa: BLE001
             return _tool_error(exc, response_format=params.response_format)
 
@@ -252,10 +909,11 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "openWorldHint": False,
         },
     )
-    def rlm_finalize(params: FinalizeInput) -> dict[str, Any]:
+    async def rlm_finalize(params: FinalizeInput) -> dict[str, Any]:
         """Finalize a session using direct text or a variable name."""
         try:
-            data = server.finalize(
+            data = await _in_thread(
+                server.finalize,
                 session_id=params.session_id,
                 final_text=params.final_text,
                 final_var_name=params.final_var_name,
@@ -274,24 +932,101 @@ def build_mcp_app(service: RlmMcpService | None = None) -> Any:
             "openWorldHint": False,
         },
     )
-    def rlm_get_trace(params: GetTraceInput) -> dict[str, Any]:
+    async def rlm_get_trace(params: GetTraceInput) -> dict[str, Any]:
         """Return trace events for debugging recursive trajectories."""
         try:
-            data = server.get_trace(
-                session_id=params.session_id,
-                from_step=params.from_step,
-                to_step=params.to_step,
+            return await _in_thread(
+                server.cached_read,
+                "rlm_get_trace",
+                params.session_id,
+                {"from_step": params.from_step, "to_step": params.to_step},
+                lambda: server.get_trace(
+                    session_id=params.session_id,
+                    from_step=params.from_step,
+                    to_step=params.to_step,
+                ),
+                response_format=params.response_format,
+                if_version=params.if_version,
             )
-            return _tool_success(data, response_format=params.response_format)
+        except Exception as exc:  # noqa: BLE001
+            return _tool_error(exc, response_format=params.response_format)
+
+    @mcp.tool(
+        name="rlm_scheduler_stats",
+        annotations={
+            "title": "Get Sandbox Scheduler Stats",
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": False,
+        },
+    )
+    async def rlm_scheduler_stats(params: SchedulerStatsInput) -> dict[str, Any]:
+        """Return sandbox admission stats: running runs, queue depth and wait times."""
+        try:
+            return _tool_success(await _in_thread(server.scheduler_stats), response_format=params.response_format)
         except Exception as exc:  # noqa: BLE001
             return _tool_error(exc, response_format=params.response_format)
 
     return mcp
 
 
-def main() -> None:
-    app = build_mcp_app()
-    app.run()
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="rlm-mcp", description="RLM MCP server.")
+    parser.add_argument(
+        "--transport",
+        choices=("stdio", "streamable-http", "sse"),
+        default=os.getenv("RLM_MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP port")
+    parser.add_argument("--workers", type=int, default=1, help="HTTP server processes (streamable-http only)")
+    parser.add_argument(
+        "--session-store",
+        default=os.getenv("RLM_MCP_SESSION_STORE"),
+        help="SQLite file shared by HTTP workers (default: in-memory, or a temporary file when --workers > 1)",
+    )
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="seconds to finish in-flight requests on shutdown")
+    parser.add_argument(
+        "--record",
+        default=os.getenv("RLM_RECORD_TRAJECTORIES"),
+        help="append every tool call to this JSON-lines file for rlm-mcp-replay",
+    )
+    args = parser.parse_args(argv)
+    if args.record:
+        # Exported so HTTP worker processes record to the same file.
+        os.environ["RLM_RECORD_TRAJECTORIES"] = args.record
+
+    if args.transport == "stdio":
+
+        def stdio_service() -> RlmMcpService:
+            from rlm_mcp.service import RlmMcpService
+            from rlm_mcp.session_store import SqliteSessionStore
+
+            return RlmMcpService(store=SqliteSessionStore(args.session_store) if args.session_store else None)
+
+        # Clients spawn this on demand under a startup timeout: answer tools/list first and build
+        # the service (and its SQLite store) on the first tool call.
+        app = build_mcp_app(service_factory=stdio_service)
+        try:
+            app.run()
+        finally:
+            if args.record:
+                from rlm_mcp.replay import close_shared_recorders
+
+                close_shared_recorders()
+        return
+
+    from rlm_mcp.http_server import serve_http
+
+    serve_http(
+        transport=args.transport,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        session_store=args.session_store,
+        drain_timeout=args.drain_timeout,
+    )
 
 
 if __name__ == "__main__":
@@ -1,50 +1,299 @@
 from __future__ import annotations
 
+import os
+import threading
 import time
-from typing import Any
+from typing import Any, Collection, Iterable, Mapping
 
+from rlm_mcp.context_store import CompressedText, ContextView
+from rlm_mcp.corpus import ContextIngest, build_corpus
+from rlm_mcp.dedup import DEFAULT_CHUNK_CHARS, DEFAULT_THRESHOLD, NearDuplicateIndex, build_dedup_index, segment_text
 from rlm_mcp.errors import ErrorCode, RlmMcpError
 from rlm_mcp.guardrails import GuardrailController
 from rlm_mcp.models import SessionConfig
-from rlm_mcp.sandbox import SandboxExecutor
-from rlm_mcp.session_store import InMemorySessionStore
+from rlm_mcp.outline import Outline, build_outline
+from rlm_mcp.pipeline import PipelineNode, build_pipeline, execute_pipeline
+from rlm_mcp.profiling import format_profile_summary, profile_artifact, profile_modes
+from rlm_mcp.results import OUTPUT_STREAMS, decode_output, encode_output, output_handle, utf8_trim
+from rlm_mcp.sandbox import SandboxExecutor, SandboxResult
+from rlm_mcp.scheduler import AdmissionScheduler
+from rlm_mcp.session_store import ChildLink, InMemorySessionStore, SqliteSessionStore
+from rlm_mcp.snippets import SnippetCompiler, SnippetRejectedError
+from rlm_mcp.spill import BlobStore, SpilledVar, SpillManager
 from rlm_mcp.trace import TraceLogger
 
 
 class RlmMcpService:
-    def __init__(self) -> None:
-        self.store = InMemorySessionStore()
+    def __init__(
+        self,
+        store: InMemorySessionStore | None = None,
+        scheduler: AdmissionScheduler | None = None,
+        *,
+        context_compression: str | None = None,
+        inline_output_chars: int | None = None,
+        spill: SpillManager | None = None,
+        ingest_idle_seconds: float | None = None,
+    ) -> None:
+        self.store = store or InMemorySessionStore()
+        if spill is None:
+            # Blobs of a SQLite-backed store sit next to it so every server process can load them.
+            spill_dir = os.getenv("RLM_SPILL_DIR") or (
+                f"{self.store.path}.blobs" if isinstance(self.store, SqliteSessionStore) else None
+            )
+            spill = SpillManager(BlobStore(spill_dir))
+        self.spill = spill
+        # "zlib" or "lzma" keeps contexts as compressed blocks; empty keeps the plain string.
+        self.context_compression = (
+            context_compression if context_compression is not None else os.getenv("RLM_CONTEXT_COMPRESSION", "")
+        ).strip().lower()
+        if self.context_compression not in ("", "zlib", "lzma"):
+            raise RlmMcpError(
+                ErrorCode.INVALID_INPUT,
+                f"unsupported context compression: {self.context_compression!r} (use zlib or lzma)",
+            )
+        # Outputs longer than this are stored behind a handle and only a head preview is returned;
+        # 0 keeps every output inline.
+        self.inline_output_chars = max(
+            0,
+            inline_output_chars if inline_output_chars is not None else int(os.getenv("RLM_INLINE_OUTPUT_CHARS", "0")),
+        )
         self.guardrails = GuardrailController()
         self.sandbox = SandboxExecutor()
+        self.scheduler = scheduler or AdmissionScheduler()
+        self.snippets = SnippetCompiler(self.sandbox.allowed_import_roots)
         self.trace = TraceLogger()
+        self._ingest_lock = threading.Lock()
+        # Streaming uploads with no chunk for this long are discarded and their session stopped.
+        self.ingest_idle_seconds = (
+            ingest_idle_seconds
+            if ingest_idle_seconds is not None
+            else float(os.getenv("RLM_INGEST_IDLE_SECONDS", "3600"))
+        )
+        # Sessions with an upload opened by this process, checked for idleness on every upload.
+        self._open_ingests: set[str] = set()
+        # Serializes budget carving and roll-up on a parent while its children run concurrently.
+        self._children_lock = threading.Lock()
 
-    def init_context(self, context_text: str, config: SessionConfig | None = None) -> str:
-        if not context_text:
+    def init_context(
+        self,
+        context_text: str,
+        config: SessionConfig | None = None,
+        *,
+        client_id: str | None = None,
+        documents: Iterable[Mapping[str, Any]] | None = None,
+        streaming: bool = False,
+        outline: bool = False,
+    ) -> str:
+        index = None
+        if streaming:
+            if context_text or documents is not None:
+                raise RlmMcpError(ErrorCode.INVALID_INPUT, "a streaming session starts empty; send text with append_context")
+        elif documents is not None:
+            if context_text:
+                raise RlmMcpError(ErrorCode.INVALID_INPUT, "pass either context_text or documents, not both")
+            context_text, index = build_corpus(documents)
+        if not context_text and not streaming:
             raise RlmMcpError(ErrorCode.INVALID_INPUT, "context_text must not be empty")
 
         cfg = config or SessionConfig()
-        session_id = self.store.create_session(context_text, cfg)
+        blocks = self._compress_context(context_text) if context_text else None
+        session_id = self.store.create_session("" if blocks else context_text, cfg, context_blocks=blocks)
         session = self.store.get_session(session_id)
-        session.vars["context"] = context_text
+        if streaming:
+            session.status = "ingesting"
+            session.ingest = ContextIngest.create()
+            session.ingest.outline = outline
+            with self._ingest_lock:
+                self._discard_idle_ingests()
+                self._open_ingests.add(session_id)
+        else:
+            if blocks is None:
+                session.vars["context"] = context_text
+            session.documents = index
+            if outline:
+                self._outline(session)
+        if client_id:
+            session.client_id = client_id
 
         self.trace.log(
             session.trace,
             step_index=session.step_index,
             action="init_context",
             result_status="ok",
-            summary="context initialized",
+            summary="streaming context opened" if streaming else "context initialized",
             guardrail_snapshot=self._guardrail_snapshot(session),
         )
+        self.store.save_session(session)
         return session_id
 
-    def run_repl(self, session_id: str, code: str) -> dict[str, Any]:
+    def append_context(
+        self,
+        session_id: str,
+        seq: int,
+        chunk: str,
+        *,
+        doc_id: str | None = None,
+        metadata: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        with self._ingest_lock:
+            self._discard_idle_ingests()
+            session = self.store.get_session(session_id)
+            ingest = self._open_ingest(session)
+            duplicate = seq < ingest.next_seq
+            if seq > ingest.next_seq:
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"chunk seq {seq} arrived out of order; expected {ingest.next_seq}",
+                )
+            if not duplicate:
+                ingest.append(chunk, doc_id=doc_id, metadata=metadata)
+                self.store.save_session(session)
+            return {
+                "seq": seq,
+                "duplicate": duplicate,
+                "next_seq": ingest.next_seq,
+                "chars": ingest.length,
+                "documents": len(ingest.index) if ingest.index is not None else None,
+            }
+
+    def seal_context(self, session_id: str) -> dict[str, Any]:
         session = self.store.get_session(session_id)
+        with self._ingest_lock:
+            ingest = self._open_ingest(session)
+            context_text, index = ingest.seal()
+            blocks = self._compress_context(context_text)
+            self.store.replace_context(session, "" if blocks else context_text, context_blocks=blocks)
+            if blocks is None:
+                session.vars["context"] = context_text
+            session.documents = index
+            session.ingest = None
+            self._open_ingests.discard(session_id)
+            session.status = "active"
+            if ingest.outline:
+                self._outline(session)
+            # Guardrail runtime counts from the first step that can run, not from the upload.
+            session.started_at = time.monotonic()
+
+            self.trace.log(
+                session.trace,
+                step_index=session.step_index,
+                action="seal_context",
+                result_status="ok",
+                summary=f"context sealed after {ingest.next_seq} chunks",
+                guardrail_snapshot=self._guardrail_snapshot(session),
+            )
+            self.store.save_session(session)
+        return {
+            "chars": len(context_text),
+            "chunks": ingest.next_seq,
+            "documents": len(index) if index is not None else None,
+        }
+
+    def spawn_child(
+        self,
+        session_id: str,
+        start: int,
+        end: int | None,
+        budget: int,
+        *,
+        label: str | None = None,
+        result_var: str = "child_results",
+    ) -> dict[str, Any]:
+        """Create a child session over ``context[start:end]`` with ``budget`` carved from the parent.
+
+        The child's context is a view into the parent's, not a copy. Its budget is charged to the
+        parent at once; when the child finalizes the unused part is refunded, its CPU and memory
+        usage roll up, and its answer is stored in the parent's ``result_var`` dict under ``label``.
+        """
+        if not result_var.isidentifier():
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, f"result_var {result_var!r} is not a valid variable name")
+        with self._children_lock:
+            parent = self.store.get_session(session_id)
+            if parent.status != "active":
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"session {session_id} is {parent.status}; only active sessions can spawn children",
+                )
+            source = parent.context_blocks if parent.context_blocks is not None else parent.context_text
+            end = len(source) if end is None else end
+            if not 0 <= start < end <= len(source):
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"child range [{start}:{end}] must be non-empty and within the context ({len(source)} chars)",
+                )
+            remaining = parent.config.budget_limit - parent.budget_used
+            if not 0 < budget <= remaining:
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"child budget {budget} must be positive and at most the parent's remaining {remaining}",
+                )
+
+            parent_cfg = parent.config
+            elapsed_ms = int((time.monotonic() - parent.started_at) * 1000)
+            cfg = SessionConfig(
+                max_steps=parent_cfg.max_steps,
+                max_runtime_ms=max(1, parent_cfg.max_runtime_ms - elapsed_ms),
+                budget_limit=budget,
+                max_cpu_ms=max(1, parent_cfg.max_cpu_ms - parent.cpu_ms_used) if parent_cfg.max_cpu_ms else None,
+                max_peak_memory_mb=parent_cfg.max_peak_memory_mb,
+            )
+            child_id = self.store.create_session(
+                "", cfg, context_blocks=ContextView.of(source, start, end, owner=parent.session_id)
+            )
+            child = self.store.get_session(child_id)
+            child.client_id = parent.client_id
+            child.parent = ChildLink(parent_id=parent.session_id, label=label or child_id, result_var=result_var)
+            self.trace.log(
+                child.trace,
+                step_index=child.step_index,
+                action="init_context",
+                result_status="ok",
+                summary=f"child of {parent.session_id} over [{start}:{end}]",
+                guardrail_snapshot=self._guardrail_snapshot(child),
+            )
+            self.store.save_session(child)
+
+            parent.budget_used += budget
+            parent.children[child_id] = budget
+            self.trace.log(
+                parent.trace,
+                step_index=parent.step_index,
+                action="spawn_child",
+                result_status="ok",
+                summary=f"child {child_id} over [{start}:{end}] with budget {budget}",
+                guardrail_snapshot=self._guardrail_snapshot(parent),
+            )
+            self.store.save_session(parent)
+        return {
+            "session_id": child_id,
+            "parent_session_id": parent.session_id,
+            "start": start,
+            "end": end,
+            "budget": budget,
+            "parent_budget_remaining": parent.config.budget_limit - parent.budget_used,
+        }
+
+    def run_repl(
+        self,
+        session_id: str,
+        code: str,
+        *,
+        max_inline_output_chars: int | None = None,
+        profile: str | None = None,
+    ) -> dict[str, Any]:
+        try:
+            modes = profile_modes(profile)
+        except ValueError as exc:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, str(exc)) from None
+        session = self.store.get_session(session_id)
+        if session.status == "ingesting":
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "context is still being uploaded; call seal_context first")
 
         if session.status != "active":
             return {
                 "stdout": "",
                 "stderr": "",
-                "updated_vars_summary": sorted(session.vars.keys()),
+                "updated_vars_summary": self._var_names(session),
                 "step_index": session.step_index,
                 "guardrail_stop": session.finish_reason,
             }
@@ -52,17 +301,45 @@ class RlmMcpService:
         stop, reason = self.guardrails.should_stop(session)
         if stop:
             self._stop_session(session, reason)
+            self.store.save_session(session)
             return {
                 "stdout": "",
                 "stderr": "",
-                "updated_vars_summary": sorted(session.vars.keys()),
+                "updated_vars_summary": self._var_names(session),
                 "step_index": session.step_index,
                 "guardrail_stop": reason,
             }
 
-        result = self.sandbox.run(code, session.vars)
+        try:
+            snippet = self.snippets.compile(code)
+        except SnippetRejectedError as exc:
+            result = SandboxResult(stdout="", stderr=exc.error + "\n", error=exc.error)
+        else:
+            # SERVER_BUSY propagates before the step is counted, so a retried snippet is not charged twice.
+            with self.scheduler.admit(
+                client_id=session.client_id,
+                session_id=session.session_id,
+                priority=self._progress(session),
+                memory_bytes=self._sandbox_memory_bytes(),
+            ):
+                env = self._run_env(session, snippet.names)
+                before = dict(env)
+                result = self.sandbox.run(
+                    code,
+                    env,
+                    compiled=snippet,
+                    affinity_key=session.session_id,
+                    corpus=self._corpus_payload(session),
+                    profile=modes,
+                    dedup=self._dedup_payload(session, snippet),
+                    outline=self._outline_payload(session, snippet),
+                )
+                self._store_run_env(session, env, before)
         session.step_index += 1
-        session.budget_used += len(code) + len(result.stdout) + len(result.stderr)
+        profile_summary = format_profile_summary(result.profile) if result.profile else None
+        session.budget_used += len(code) + len(result.stdout) + len(result.stderr) + len(profile_summary or "")
+        session.cpu_ms_used += result.cpu_ms
+        session.peak_memory_bytes = max(session.peak_memory_bytes, result.peak_memory_bytes)
 
         status = "error" if result.error else "ok"
         self.trace.log(
@@ -77,25 +354,313 @@ class RlmMcpService:
         stop, reason = self.guardrails.should_stop(session)
         if stop:
             self._stop_session(session, reason)
+        outputs = self._store_large_outputs(
+            session,
+            result,
+            self.inline_output_chars if max_inline_output_chars is None else max_inline_output_chars,
+        )
+        profile_payload = None
+        if profile_summary is not None:
+            handle = output_handle(session.step_index, "profile")
+            profile_payload = {
+                "summary": profile_summary,
+                "artifact": self._store_result(session, handle, profile_artifact(result.profile)),
+            }
+        self.store.save_session(session)
 
         return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "updated_vars_summary": sorted(session.vars.keys()),
+            **outputs,
+            "profile": profile_payload,
+            "stdout_dropped_chars": result.stdout_dropped_chars,
+            "stderr_dropped_chars": result.stderr_dropped_chars,
+            "cpu_ms": result.cpu_ms,
+            "peak_memory_bytes": result.peak_memory_bytes,
+            "updated_vars_summary": self._var_names(session),
             "step_index": session.step_index,
             "guardrail_stop": reason if stop else None,
         }
 
+    def run_pipeline(
+        self,
+        session_id: str,
+        nodes: Iterable[Mapping[str, Any]],
+        *,
+        max_parallel: int | None = None,
+        max_inline_output_chars: int | None = None,
+    ) -> dict[str, Any]:
+        """Run a DAG of snippets in one call, passing declared outputs between nodes server-side.
+
+        Each node sees ``context`` plus its declared inputs, taken from the node producing them or
+        else from the session, and counts as one step. Independent nodes run in parallel through
+        the admission scheduler; a failed node or a tripped guardrail stops scheduling new nodes.
+        Outputs of successful nodes are stored as session variables.
+        """
+        try:
+            pipeline = build_pipeline(nodes)
+        except ValueError as exc:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, str(exc)) from None
+        session = self.store.get_session(session_id)
+        if session.status == "ingesting":
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "context is still being uploaded; call seal_context first")
+
+        available = set(self._var_names(session))
+        produced = {var for node in pipeline for var in node.outputs}
+        for node in pipeline:
+            missing = [var for var in node.inputs if var not in produced and var not in available]
+            if missing:
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"node {node.name!r} reads {', '.join(missing)}, which no node produces and the session lacks",
+                )
+
+        reason = session.finish_reason
+        if session.status == "active":
+            stop, reason = self.guardrails.should_stop(session)
+            if stop:
+                self._stop_session(session, reason)
+                self.store.save_session(session)
+        if session.status != "active":
+            return {
+                "nodes": [{"name": node.name, "status": "skipped"} for node in pipeline],
+                "wall_ms": 0,
+                "updated_vars_summary": self._var_names(session),
+                "step_index": session.step_index,
+                "guardrail_stop": reason,
+            }
+
+        context = self._run_env(session, ("context",)).get("context")
+        corpus = self._corpus_payload(session)
+        helper_payloads: dict[str, tuple[dict[str, Any] | None, dict[str, Any] | None]] = {}
+        for node in pipeline:
+            try:
+                snippet = self.snippets.compile(node.code)
+            except SnippetRejectedError:
+                helper_payloads[node.name] = (None, None)
+            else:
+                helper_payloads[node.name] = (
+                    self._dedup_payload(session, snippet),
+                    self._outline_payload(session, snippet),
+                )
+        limit = self.inline_output_chars if max_inline_output_chars is None else max_inline_output_chars
+        values: dict[str, Any] = {}
+        reports: dict[str, dict[str, Any]] = {}
+        guardrail_stop: str | None = None
+        started = time.monotonic()
+
+        def run_node(node: PipelineNode) -> tuple[SandboxResult, dict[str, Any], float, float, bool]:
+            env = {"context": context} if context is not None else {}
+            begin = time.monotonic()
+            charged = True
+            try:
+                for var in node.inputs:
+                    if var in values:
+                        env[var] = values[var]
+                    elif var not in env:
+                        env[var] = self._load_var(session, var)
+                snippet = self.snippets.compile(node.code)
+                with self.scheduler.admit(
+                    client_id=session.client_id,
+                    session_id=session.session_id,
+                    priority=self._progress(session),
+                    memory_bytes=self._sandbox_memory_bytes(),
+                ):
+                    result = self.sandbox.run(
+                        node.code,
+                        env,
+                        compiled=snippet,
+                        affinity_key=session.session_id,
+                        corpus=corpus,
+                        dedup=helper_payloads[node.name][0],
+                        outline=helper_payloads[node.name][1],
+                    )
+            except SnippetRejectedError as exc:
+                result = SandboxResult(stdout="", stderr=exc.error + "\n", error=exc.error)
+            except Exception as exc:  # noqa: BLE001
+                # Any other failure ends this node as an error, so the pipeline stops cleanly and
+                # the steps and outputs of nodes that already finished are still saved.
+                error = str(exc) if isinstance(exc, RlmMcpError) else f"{type(exc).__name__}: {exc}"
+                result = SandboxResult(stdout="", stderr=error + "\n", error=error)
+                # As in run_repl, a run that never got a sandbox slot is not charged as a step.
+                charged = not (isinstance(exc, RlmMcpError) and exc.code == ErrorCode.SERVER_BUSY)
+            return result, env, begin, time.monotonic(), charged
+
+        def on_finished(node: PipelineNode, outcome: tuple[SandboxResult, dict[str, Any], float, float, bool]) -> bool:
+            nonlocal guardrail_stop
+            result, env, begin, end, charged = outcome
+            if charged:
+                session.step_index += 1
+                session.budget_used += len(node.code) + len(result.stdout) + len(result.stderr)
+                session.cpu_ms_used += result.cpu_ms
+                session.peak_memory_bytes = max(session.peak_memory_bytes, result.peak_memory_bytes)
+            error = result.error
+            missing = [var for var in node.outputs if var not in env]
+            if error is None and missing:
+                error = f"NameError: pipeline node {node.name!r} did not define {', '.join(missing)}"
+            if error is None:
+                values.update({var: env[var] for var in node.outputs})
+
+            summary = f"{node.name}: {node.code}"
+            self.trace.log(
+                session.trace,
+                step_index=session.step_index,
+                action="run_pipeline",
+                result_status="error" if error else "ok",
+                summary=(summary[:120] + "...") if len(summary) > 120 else summary,
+                guardrail_snapshot=self._guardrail_snapshot(session),
+            )
+            reports[node.name] = {
+                "name": node.name,
+                "status": "error" if error else "ok",
+                "error": error,
+                **self._store_large_outputs(session, result, limit),
+                "cpu_ms": result.cpu_ms,
+                "peak_memory_bytes": result.peak_memory_bytes,
+                "started_ms": int((begin - started) * 1000),
+                "wall_ms": int((end - begin) * 1000),
+                "step_index": session.step_index,
+            }
+            stop, reason = self.guardrails.should_stop(session)
+            if stop:
+                self._stop_session(session, reason)
+                guardrail_stop = reason
+            return error is None and not stop
+
+        execute_pipeline(
+            pipeline,
+            run_node,
+            on_finished,
+            max_parallel=max_parallel or min(len(pipeline), self.scheduler.max_concurrent),
+        )
+        self._assign_vars(session, values)
+        self.store.save_session(session)
+        return {
+            "nodes": [reports.get(node.name, {"name": node.name, "status": "skipped"}) for node in pipeline],
+            "wall_ms": int((time.monotonic() - started) * 1000),
+            "updated_vars_summary": self._var_names(session),
+            "step_index": session.step_index,
+            "guardrail_stop": guardrail_stop,
+        }
+
+    def find_duplicates(
+        self,
+        session_id: str,
+        *,
+        chunk_chars: int | None = None,
+        threshold: float | None = None,
+        max_clusters: int = 100,
+    ) -> dict[str, Any]:
+        """Near-duplicate clusters over the session's chunks: its documents, else fixed-size chunks.
+
+        The index is built once per session and rebuilt only when ``chunk_chars`` or
+        ``threshold`` change; snippets read the same index through the ``dedup`` helper.
+        """
+        session = self.store.get_session(session_id)
+        if session.status == "ingesting":
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "context is still being uploaded; call seal_context first")
+        if threshold is not None and not 0.0 < threshold <= 1.0:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "threshold must be in (0, 1]")
+        index = self._dedup_index(session, chunk_chars=chunk_chars, threshold=threshold)
+        clusters = index.clusters()
+        ids = session.documents.ids if session.documents is not None else None
+        return {
+            "segmentation": "documents" if ids is not None else "chunks",
+            "chunk_chars": index.chunk_chars,
+            "threshold": index.threshold,
+            "chunks": len(index),
+            "distinct": index.distinct,
+            "duplicate_chunks": len(index) - index.distinct,
+            "clusters": [
+                {
+                    "representative": members[0],
+                    "members": members,
+                    "ids": [ids[member] for member in members] if ids is not None else None,
+                    "span": [index.starts[members[0]], index.ends[members[0]]],
+                }
+                for members in clusters[:max_clusters]
+            ],
+            "clusters_truncated": len(clusters) > max_clusters,
+        }
+
+    def outline(
+        self,
+        session_id: str,
+        *,
+        max_depth: int | None = None,
+        max_nodes: int = 500,
+    ) -> dict[str, Any]:
+        """Structural outline of the context: headings, files and their symbols, or JSONL records.
+
+        Built in one pass on first use (or at ``init_context(outline=True)``) and kept with the
+        session; snippets read the same sections through the ``outline`` helper.
+        """
+        session = self.store.get_session(session_id)
+        if session.status == "ingesting":
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, "context is still being uploaded; call seal_context first")
+        outline = self._outline(session)
+        sections, truncated = outline.to_tree(max_depth=max_depth, max_nodes=max_nodes)
+        return {
+            "format": outline.format,
+            "chars": len(self._context_text(session)),
+            "total_sections": len(outline),
+            "sections": sections,
+            "truncated": truncated,
+        }
+
+    def read_output(
+        self,
+        session_id: str,
+        handle: str,
+        *,
+        offset: int = 0,
+        length: int = 65_536,
+        start_line: int | None = None,
+        line_count: int | None = None,
+    ) -> dict[str, Any]:
+        """Read a byte range, or with ``start_line`` a range of lines, of a stored step output."""
+        session = self.store.get_session(session_id)
+        total_bytes, starts = self.store.result_info(session.session_id, handle)
+        if start_line is not None:
+            last_line = min(len(starts), start_line + (line_count or 1))
+            start = starts[start_line] if start_line < len(starts) else total_bytes
+            end = starts[last_line] if last_line < len(starts) else total_bytes
+            data = self.store.read_result(session.session_id, handle, start, end)
+        else:
+            start = min(offset, total_bytes)
+            end = min(start + length, total_bytes)
+            data = self.store.read_result(session.session_id, handle, start, end)
+            # Move both edges inward to whole characters; next_offset then resumes exactly here.
+            head, tail = utf8_trim(data)
+            data = data[head : len(data) - tail]
+            start, end = start + head, end - tail
+        return {
+            "handle": handle,
+            "text": decode_output(data),
+            "offset": start,
+            "next_offset": end if end < total_bytes else None,
+            "total_bytes": total_bytes,
+            "total_lines": len(starts),
+        }
+
     def get_var(self, session_id: str, var_name: str) -> dict[str, Any]:
         session = self.store.get_session(session_id)
-        value = session.vars.get(var_name)
+        if var_name == "context" and self._context_is_compressed(session):
+            # Only the blocks behind the preview are decompressed.
+            blocks = session.context_blocks
+            return {"value": blocks[:4000], "type": "str", "truncated": len(blocks) > 4000}
+        stored = session.vars.get(var_name)
+        value = self._load_var(session, var_name)
         serialized, truncated = self._serialize_value(value)
         return {
             "value": serialized,
             "type": type(value).__name__ if value is not None else "NoneType",
             "truncated": truncated,
+            "spilled_bytes": stored.size_bytes if isinstance(stored, SpilledVar) else None,
         }
 
+    def session_version(self, session_id: str) -> int:
+        """State version of a session; it changes whenever the session is saved after a mutation."""
+        return self.store.get_session(session_id).version
+
     def finalize(
         self,
         session_id: str,
@@ -113,9 +678,15 @@ class RlmMcpService:
 
         if final_text is not None:
             answer = final_text
+        elif final_var_name == "context" and self._context_is_compressed(session):
+            answer = session.context_blocks.text()
         else:
-            answer = str(session.vars.get(final_var_name, ""))
+            answer = str(self._load_var(session, final_var_name, ""))
 
+        if session.ingest is not None:
+            session.ingest.discard()
+            session.ingest = None
+        was_finalized = session.status == "finalized"
         session.status = "finalized"
         if session.finish_reason is None:
             session.finish_reason = "completed"
@@ -128,6 +699,12 @@ class RlmMcpService:
             summary="session finalized",
             guardrail_snapshot=self._guardrail_snapshot(session),
         )
+        self.store.save_session(session)
+        # Output handles, profile artifacts and spilled variables are only useful while the session runs.
+        self.store.delete_results(session_id)
+        self.spill.forget(session_id)
+        if session.parent is not None and not was_finalized:
+            self._roll_up_child(session, answer)
 
         return {
             "final_answer": answer,
@@ -136,9 +713,14 @@ class RlmMcpService:
                 "steps": session.step_index,
                 "runtime_ms": int((time.monotonic() - session.started_at) * 1000),
                 "budget_used": session.budget_used,
+                "cpu_ms": session.cpu_ms_used,
+                "peak_memory_bytes": session.peak_memory_bytes,
             },
         }
 
+    def scheduler_stats(self) -> dict[str, Any]:
+        return self.scheduler.stats()
+
     def get_trace(
         self,
         session_id: str,
@@ -166,9 +748,256 @@ class RlmMcpService:
             return rendered[:max_chars], True
         return data, False
 
+    def _store_large_outputs(self, session: Any, result: SandboxResult, limit: int) -> dict[str, Any]:
+        outputs: dict[str, Any] = {}
+        for stream in OUTPUT_STREAMS:
+            text = getattr(result, stream)
+            outputs[stream] = text
+            outputs[f"{stream}_handle"] = None
+            if limit and len(text) > limit:
+                outputs[stream] = text[:limit]
+                outputs[f"{stream}_handle"] = self._store_result(session, output_handle(session.step_index, stream), text)
+        return outputs
+
+    def _store_result(self, session: Any, handle: str, text: str) -> dict[str, Any]:
+        data = encode_output(text)
+        self.store.put_result(session.session_id, handle, data)
+        return {
+            "handle": handle,
+            "total_chars": len(text),
+            "total_bytes": len(data),
+            "total_lines": text.count("\n") + (0 if text.endswith("\n") else 1),
+        }
+
+    def _roll_up_child(self, child: Any, answer: str) -> None:
+        link = child.parent
+        with self._children_lock:
+            try:
+                parent = self.store.get_session(link.parent_id)
+            except RlmMcpError:
+                return
+            reserved = parent.children.pop(child.session_id, None)
+            if reserved is None:
+                return
+            # The whole reservation was charged at spawn; settle it to what the child actually used.
+            parent.budget_used += child.budget_used - reserved
+            parent.cpu_ms_used += child.cpu_ms_used
+            parent.peak_memory_bytes = max(parent.peak_memory_bytes, child.peak_memory_bytes)
+            results = self._load_var(parent, link.result_var)
+            if not isinstance(results, dict):
+                results = {}
+            results[link.label] = answer
+            self._assign_vars(parent, {link.result_var: results})
+            self.trace.log(
+                parent.trace,
+                step_index=parent.step_index,
+                action="child_finalized",
+                result_status="ok",
+                summary=f"child {child.session_id} used {child.budget_used} of {reserved} budget",
+                guardrail_snapshot=self._guardrail_snapshot(parent),
+            )
+            self.store.save_session(parent)
+
+    @staticmethod
+    def _open_ingest(session: Any) -> ContextIngest:
+        if session.status != "ingesting" or session.ingest is None:
+            raise RlmMcpError(ErrorCode.INVALID_INPUT, f"session {session.session_id} is not accepting context chunks")
+        return session.ingest
+
+    def _compress_context(self, context_text: str) -> CompressedText | None:
+        if not self.context_compression:
+            return None
+        return CompressedText.from_text(context_text, codec=self.context_compression)
+
+    @staticmethod
+    def _context_is_compressed(session: Any) -> bool:
+        # A compressed context is only materialized in `vars` once a snippet rebinds it.
+        return session.context_blocks is not None and "context" not in session.vars
+
+    @staticmethod
+    def _context_text(session: Any) -> str:
+        if session.context_blocks is not None:
+            return session.context_blocks.text()
+        return session.context_text
+
+    def _var_names(self, session: Any) -> list[str]:
+        names = set(session.vars)
+        if self._context_is_compressed(session):
+            names.add("context")
+        return sorted(names)
+
+    def _run_env(self, session: Any, names: Collection[str]) -> dict[str, Any]:
+        """The session variables a snippet referring to ``names`` can see, spilled ones loaded.
+
+        Variables the snippet never names are not shipped to the sandbox at all; ``context`` also
+        goes along when the snippet uses a helper that reads it.
+        """
+        wanted = set(names)
+        if wanted & {"docs", "dedup", "outline"}:
+            wanted.add("context")
+        env = {name: self._load_var(session, name) for name in session.vars if name in wanted}
+        if "context" in wanted and self._context_is_compressed(session):
+            env["context"] = session.context_blocks.text()
+        return env
+
+    def _store_run_env(self, session: Any, env: dict[str, Any], before: dict[str, Any]) -> None:
+        updates = {}
+        for name, value in env.items():
+            out_of_band = isinstance(session.vars.get(name), SpilledVar) or (
+                name == "context" and self._context_is_compressed(session)
+            )
+            # A decompressed context or a loaded spilled value the snippet left alone stays where it was.
+            if out_of_band and name in before and value == before[name]:
+                continue
+            updates[name] = value
+        self._assign_vars(session, updates)
+
+    def _load_var(self, session: Any, name: str, default: Any = None) -> Any:
+        value = session.vars.get(name, default)
+        if isinstance(value, SpilledVar):
+            try:
+                return self.spill.blobs.load(value)
+            except FileNotFoundError:
+                raise RlmMcpError(
+                    ErrorCode.INVALID_INPUT,
+                    f"variable {name!r} was spilled to disk and released when the session was finalized",
+                ) from None
+        return value
+
+    def _assign_vars(self, session: Any, updates: Mapping[str, Any]) -> None:
+        for name, value in updates.items():
+            previous = session.vars.get(name)
+            if isinstance(previous, SpilledVar):
+                self.spill.blobs.discard(previous)
+            session.vars[name] = value
+            if name != "context":
+                # `context` shares the session's context string and is never spilled.
+                self.spill.record(session.session_id, name, value)
+        for name in self.spill.victims(session.session_id):
+            session.vars[name] = self.spill.spill(session.session_id, name, session.vars[name])
+
+    def _corpus_payload(self, session: Any) -> dict[str, Any] | None:
+        if session.documents is None:
+            return None
+        payload = session.documents.to_payload()
+        if self._context_rebound(session):
+            # A snippet rebound `context`, so the worker cannot slice documents out of it.
+            payload["text"] = self._context_text(session)
+        return payload
+
+    def _dedup_payload(self, session: Any, snippet: Any) -> dict[str, Any] | None:
+        # Only snippets that mention `dedup` pay for building and shipping the index.
+        if "dedup" not in snippet.names:
+            return None
+        payload = self._dedup_index(session).to_payload()
+        if self._context_rebound(session):
+            payload["text"] = self._context_text(session)
+        return payload
+
+    def _dedup_index(
+        self,
+        session: Any,
+        *,
+        chunk_chars: int | None = None,
+        threshold: float | None = None,
+    ) -> NearDuplicateIndex:
+        index = session.dedup
+        if (
+            index is not None
+            and (chunk_chars is None or session.documents is not None or chunk_chars == index.chunk_chars)
+            and (threshold is None or threshold == index.threshold)
+        ):
+            return index
+        text = self._context_text(session)
+        if session.documents is not None:
+            starts, ends, chunk_chars = session.documents.starts, session.documents.ends, 0
+        else:
+            chunk_chars = chunk_chars or DEFAULT_CHUNK_CHARS
+            starts, ends = segment_text(text, chunk_chars)
+        session.dedup = build_dedup_index(
+            text,
+            starts,
+            ends,
+            chunk_chars=chunk_chars,
+            threshold=threshold if threshold is not None else DEFAULT_THRESHOLD,
+        )
+        # Built on a read path: keeping it must not invalidate responses cached at this version.
+        self.store.save_derived(session)
+        return session.dedup
+
+    def _outline_payload(self, session: Any, snippet: Any) -> dict[str, Any] | None:
+        if "outline" not in snippet.names:
+            return None
+        payload = self._outline(session).to_payload()
+        if self._context_rebound(session):
+            payload["text"] = self._context_text(session)
+        return payload
+
+    def _outline(self, session: Any) -> Outline:
+        if session.outline is None:
+            documents = None
+            if session.documents is not None:
+                documents = zip(session.documents.ids, session.documents.starts, session.documents.ends)
+            session.outline = build_outline(self._context_text(session), documents=documents)
+            self.store.save_derived(session)
+        return session.outline
+
+    @staticmethod
+    def _context_rebound(session: Any) -> bool:
+        if session.context_blocks is not None:
+            return "context" in session.vars
+        return session.vars.get("context") != session.context_text
+
+    @staticmethod
+    def _progress(session: Any) -> float:
+        # Fraction of the tightest guardrail already used; the scheduler favours nearly finished sessions.
+        runtime_ms = (time.monotonic() - session.started_at) * 1000
+        return max(
+            session.step_index / session.config.max_steps,
+            session.budget_used / session.config.budget_limit,
+            runtime_ms / session.config.max_runtime_ms,
+            session.cpu_ms_used / session.config.max_cpu_ms if session.config.max_cpu_ms else 0.0,
+        )
+
+    def _sandbox_memory_bytes(self) -> int:
+        # Remote runs use the daemon host's memory, which the daemon bounds itself.
+        if self.sandbox.sandbox_mode == "remote":
+            return 0
+        return self.sandbox.memory_limit_mb * 1024 * 1024
+
     def _stop_session(self, session: Any, reason: str | None) -> None:
         session.status = "stopped"
         session.finish_reason = reason
+        # A stopped session runs no more snippets, so its variables no longer compete for the
+        # spill budget; its blobs stay until finalize, which may still read one.
+        self.spill.forget(session.session_id, discard_blobs=False)
+        if session.ingest is not None:
+            session.ingest.discard()
+            session.ingest = None
+
+    def _discard_idle_ingests(self) -> None:
+        # Caller holds _ingest_lock.
+        deadline = time.time() - self.ingest_idle_seconds
+        for session_id in list(self._open_ingests):
+            try:
+                session = self.store.get_session(session_id)
+            except RlmMcpError:
+                self._open_ingests.discard(session_id)
+                continue
+            if session.ingest is None:
+                self._open_ingests.discard(session_id)
+            elif session.ingest.touched_at < deadline:
+                self._open_ingests.discard(session_id)
+                self._stop_session(session, "ingest_idle_timeout")
+                self.trace.log(
+                    session.trace,
+                    step_index=session.step_index,
+                    action="seal_context",
+                    result_status="error",
+                    summary=f"upload discarded after {self.ingest_idle_seconds:g}s without a chunk",
+                    guardrail_snapshot=self._guardrail_snapshot(session),
+                )
+                self.store.save_session(session)
 
     def _guardrail_snapshot(self, session: Any) -> dict[str, Any]:
         return {
@@ -176,4 +1005,8 @@ class RlmMcpService:
             "max_steps": session.config.max_steps,
             "budget_used": session.budget_used,
             "budget_limit": session.config.budget_limit,
+            "cpu_ms_used": session.cpu_ms_used,
+            "max_cpu_ms": session.config.max_cpu_ms,
+            "peak_memory_bytes": session.peak_memory_bytes,
+            "max_peak_memory_mb": session.config.max_peak_memory_mb,
         }
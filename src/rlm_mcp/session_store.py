@@ -1,12 +1,33 @@
 from __future__ import annotations
 
+import os
+import pickle
+import sqlite3
+import threading
 import time
-from dataclasses import dataclass, field
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
 from typing import Any
 from uuid import uuid4
 
+from rlm_mcp.context_store import CompressedText, ContextView
+from rlm_mcp.corpus import ContextIngest, DocumentIndex
+from rlm_mcp.dedup import NearDuplicateIndex
 from rlm_mcp.errors import ErrorCode, RlmMcpError
 from rlm_mcp.models import SessionConfig
+from rlm_mcp.outline import Outline
+from rlm_mcp.results import line_starts
+
+
+@dataclass(slots=True)
+class ChildLink:
+    """Where a child session reports back: its parent and the parent dict variable for its answer."""
+
+    parent_id: str
+    label: str
+    result_var: str
 
 
 @dataclass
@@ -20,20 +41,61 @@ class SessionState:
     started_at: float = field(default_factory=time.monotonic)
     step_index: int = 0
     budget_used: int = 0
+    cpu_ms_used: int = 0
+    peak_memory_bytes: int = 0
     finish_reason: str | None = None
     status: str = "active"
+    client_id: str = "default"
+    documents: DocumentIndex | None = None
+    ingest: ContextIngest | None = None
+    # When set, the context lives here and context_text stays empty: compressed blocks, or a view
+    # into the parent's context for child sessions.
+    context_blocks: CompressedText | ContextView | None = None
+    parent: ChildLink | None = None
+    # Budget reserved for each child that has not finalized yet, by child session id.
+    children: dict[str, int] = field(default_factory=dict)
+    # Built on first use and kept, since the context it indexes never changes.
+    dedup: NearDuplicateIndex | None = None
+    outline: Outline | None = None
+    # Advances on every save, so read-only responses rendered at one version can be reused.
+    version: int = 0
+
+
+def shard_for(session_id: str, shards: int) -> int:
+    """Stable shard index of a session id; shared by the HTTP router and shard-aware stores."""
+    return zlib.crc32(session_id.encode("utf-8")) % max(1, shards)
 
 
 class InMemorySessionStore:
-    def __init__(self) -> None:
+    """Sessions and stored step outputs held in this process.
+
+    Each session keeps its ``max_results_per_session`` most recent outputs (env
+    ``RLM_MAX_RESULTS_PER_SESSION``, default 32); older handles stop resolving.
+    """
+
+    def __init__(self, *, max_results_per_session: int | None = None) -> None:
         self._sessions: dict[str, SessionState] = {}
+        self._results: dict[str, OrderedDict[str, tuple[bytes, array]]] = {}
+        self.max_results_per_session = max(
+            1,
+            max_results_per_session
+            if max_results_per_session is not None
+            else int(os.getenv("RLM_MAX_RESULTS_PER_SESSION", "32")),
+        )
 
-    def create_session(self, context_text: str, config: SessionConfig) -> str:
+    def create_session(
+        self,
+        context_text: str,
+        config: SessionConfig,
+        *,
+        context_blocks: CompressedText | ContextView | None = None,
+    ) -> str:
         session_id = str(uuid4())
         self._sessions[session_id] = SessionState(
             session_id=session_id,
             context_text=context_text,
             config=config,
+            context_blocks=context_blocks,
         )
         return session_id
 
@@ -42,3 +104,302 @@ class InMemorySessionStore:
         if session is None:
             raise RlmMcpError(ErrorCode.SESSION_NOT_FOUND, f"session not found: {session_id}")
         return session
+
+    def save_session(self, session: SessionState) -> None:
+        """Persist changes made to ``session``; sessions live in this process, so only its version moves."""
+        session.version += 1
+
+    def save_derived(self, session: SessionState) -> None:
+        """Persist an index built lazily from the session's context without moving its version.
+
+        Such indexes are a pure function of the context, so responses rendered at the current
+        version stay valid.
+        """
+
+    def replace_context(
+        self,
+        session: SessionState,
+        context_text: str,
+        *,
+        context_blocks: CompressedText | ContextView | None = None,
+    ) -> None:
+        """Install the context of a session whose text arrived after creation (chunked ingestion)."""
+        session.context_text = context_text
+        session.context_blocks = context_blocks
+
+    def put_result(self, session_id: str, handle: str, data: bytes) -> None:
+        """Keep a large step output server-side so responses can carry a handle instead."""
+        results = self._results.setdefault(session_id, OrderedDict())
+        results[handle] = (data, line_starts(data))
+        results.move_to_end(handle)
+        while len(results) > self.max_results_per_session:
+            results.popitem(last=False)
+
+    def delete_results(self, session_id: str) -> None:
+        """Drop every stored output of a session."""
+        self._results.pop(session_id, None)
+
+    def result_info(self, session_id: str, handle: str) -> tuple[int, array]:
+        """Size in bytes and line start offsets of a stored result."""
+        data, starts = self._result(session_id, handle)
+        return len(data), starts
+
+    def read_result(self, session_id: str, handle: str, start: int, end: int) -> bytes:
+        return self._result(session_id, handle)[0][start:end]
+
+    def _result(self, session_id: str, handle: str) -> tuple[bytes, array]:
+        try:
+            return self._results[session_id][handle]
+        except KeyError:
+            raise _unknown_handle(handle) from None
+
+
+def _unknown_handle(handle: str) -> RlmMcpError:
+    return RlmMcpError(ErrorCode.INVALID_INPUT, f"unknown output handle: {handle}")
+
+
+_CONTEXT_FIELDS = ("session_id", "context_text", "context_blocks")
+_STATE_FIELDS = tuple(f.name for f in fields(SessionState) if f.name not in _CONTEXT_FIELDS)
+
+
+class SqliteSessionStore(InMemorySessionStore):
+    """Session store shared by several server processes on one host through a SQLite file.
+
+    Each process keeps recently used sessions in memory and only reloads one when another
+    process saved a newer revision. With ``shard=(index, count)`` new session ids are minted so
+    that ``shard_for(session_id, count) == index``, letting a router keep every request of a
+    session on the process that created it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        shard: tuple[int, int] | None = None,
+        cache_size: int = 64,
+        max_results_per_session: int | None = None,
+    ) -> None:
+        super().__init__(max_results_per_session=max_results_per_session)
+        self.path = path
+        self.shard = shard
+        self.cache_size = max(1, cache_size)
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._revisions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        os.close(fd)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, revision INTEGER NOT NULL, "
+            "context_text TEXT NOT NULL, state BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "session_id TEXT NOT NULL, handle TEXT NOT NULL, data BLOB NOT NULL, "
+            "line_starts BLOB NOT NULL, PRIMARY KEY (session_id, handle))"
+        )
+
+    def create_session(
+        self,
+        context_text: str,
+        config: SessionConfig,
+        *,
+        context_blocks: CompressedText | ContextView | None = None,
+    ) -> str:
+        session_id = self._new_session_id()
+        session = SessionState(
+            session_id=session_id,
+            context_text=context_text,
+            config=config,
+            context_blocks=context_blocks,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, revision, context_text, state) VALUES (?, 1, ?, ?)",
+                (session_id, self._context_column(session), self._pack(session)),
+            )
+            self._remember(session, 1)
+        return session_id
+
+    def get_session(self, session_id: str) -> SessionState:
+        with self._lock:
+            return self._load(session_id)
+
+    def _load(self, session_id: str) -> SessionState:
+        row = self._conn.execute("SELECT revision FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            self._forget(session_id)
+            raise RlmMcpError(ErrorCode.SESSION_NOT_FOUND, f"session not found: {session_id}")
+        revision = row[0]
+        cached = self._sessions.get(session_id)
+        if cached is not None and self._revisions.get(session_id) == revision:
+            self._sessions.move_to_end(session_id)
+            return cached
+
+        if cached is not None:
+            row = self._conn.execute(
+                "SELECT revision, state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            context_text, context_blocks = cached.context_text, cached.context_blocks
+        else:
+            row = self._conn.execute(
+                "SELECT revision, state, context_text FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if isinstance(row[2], bytes):
+                context_text, context_blocks = "", pickle.loads(row[2])
+                if isinstance(context_blocks, ContextView) and context_blocks.source is None:
+                    # Child views are stored as (owner, start, end); sessions are never deleted,
+                    # so the owner is still there, and loading it shares its context object.
+                    owner = self._load(context_blocks.owner)
+                    context_blocks.source = (
+                        owner.context_blocks if owner.context_blocks is not None else owner.context_text
+                    )
+            else:
+                context_text, context_blocks = row[2], None
+        session = self._unpack(session_id, context_text, row[1])
+        session.context_blocks = context_blocks
+        self._remember(session, row[0])
+        return session
+
+    def save_session(self, session: SessionState) -> None:
+        state = self._pack(session)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE sessions SET revision = revision + 1, state = ? WHERE session_id = ?",
+                    (state, session.session_id),
+                )
+                row = self._conn.execute(
+                    "SELECT revision FROM sessions WHERE session_id = ?", (session.session_id,)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if row is None:
+                raise RlmMcpError(ErrorCode.SESSION_NOT_FOUND, f"session not found: {session.session_id}")
+            self._remember(session, row[0])
+
+    def save_derived(self, session: SessionState) -> None:
+        state = self._pack(session)
+        with self._lock:
+            # Only onto the revision it was built from; a newer save lacks the index, which is then
+            # rebuilt on the next read.
+            self._conn.execute(
+                "UPDATE sessions SET state = ? WHERE session_id = ? AND revision = ?",
+                (state, session.session_id, session.version),
+            )
+
+    def replace_context(
+        self,
+        session: SessionState,
+        context_text: str,
+        *,
+        context_blocks: CompressedText | ContextView | None = None,
+    ) -> None:
+        session.context_text = context_text
+        session.context_blocks = context_blocks
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET context_text = ? WHERE session_id = ?",
+                (self._context_column(session), session.session_id),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _new_session_id(self) -> str:
+        while True:
+            session_id = str(uuid4())
+            if self.shard is None or shard_for(session_id, self.shard[1]) == self.shard[0]:
+                return session_id
+
+    def _remember(self, session: SessionState, revision: int) -> None:
+        # The row revision is shared by every process using the file, so it doubles as the version.
+        session.version = revision
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._revisions[session.session_id] = revision
+        while len(self._sessions) > self.cache_size:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._revisions.pop(evicted, None)
+
+    def _forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._revisions.pop(session_id, None)
+
+    def put_result(self, session_id: str, handle: str, data: bytes) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # REPLACE gives the row a new rowid, so rowid order is insertion order.
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (session_id, handle, data, line_starts) VALUES (?, ?, ?, ?)",
+                    (session_id, handle, data, line_starts(data).tobytes()),
+                )
+                self._conn.execute(
+                    "DELETE FROM results WHERE session_id = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM results WHERE session_id = ? ORDER BY rowid DESC LIMIT ?)",
+                    (session_id, session_id, self.max_results_per_session),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_results(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE session_id = ?", (session_id,))
+
+    def result_info(self, session_id: str, handle: str) -> tuple[int, array]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT length(data), line_starts FROM results WHERE session_id = ? AND handle = ?",
+                (session_id, handle),
+            ).fetchone()
+        if row is None:
+            raise _unknown_handle(handle)
+        starts = array("q")
+        starts.frombytes(row[1])
+        return row[0], starts
+
+    def read_result(self, session_id: str, handle: str, start: int, end: int) -> bytes:
+        # substr() on a BLOB counts bytes, so only the requested range leaves SQLite.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT substr(data, ?, ?) FROM results WHERE session_id = ? AND handle = ?",
+                (start + 1, max(0, end - start), session_id, handle),
+            ).fetchone()
+        if row is None:
+            raise _unknown_handle(handle)
+        return bytes(row[0])
+
+    @staticmethod
+    def _context_column(session: SessionState) -> str | bytes:
+        # Compressed contexts are stored once as a BLOB in the same column as plain text.
+        if session.context_blocks is not None:
+            return pickle.dumps(session.context_blocks, protocol=pickle.HIGHEST_PROTOCOL)
+        return session.context_text
+
+    @staticmethod
+    def _pack(session: SessionState) -> bytes:
+        state = {name: getattr(session, name) for name in _STATE_FIELDS}
+        # vars["context"] normally repeats the (large, immutable) context text, which is stored
+        # once per session. The worker hands back an equal copy each step; comparing is a memcmp,
+        # far cheaper than pickling and rewriting the context on every save.
+        context_is_shared = session.vars.get("context") == session.context_text
+        if context_is_shared:
+            state["vars"] = {key: value for key, value in session.vars.items() if key != "context"}
+        return pickle.dumps((context_is_shared, state), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _unpack(session_id: str, context_text: str, blob: bytes) -> SessionState:
+        context_is_shared, state = pickle.loads(blob)
+        if context_is_shared:
+            state["vars"]["context"] = context_text
+        return SessionState(session_id=session_id, context_text=context_text, **state)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import marshal
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Iterable
+
+SNIPPET_FILENAME = "<string>"
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledSnippet:
+    digest: str
+    code: CodeType
+    marshalled: bytes
+    # Every global or attribute name the snippet (including its nested functions) refers to.
+    names: frozenset[str] = frozenset()
+
+
+@dataclass
+class SnippetRejectedError(Exception):
+    """Raised when a snippet can be refused without spawning a sandbox."""
+
+    error: str
+
+    def __str__(self) -> str:
+        return self.error
+
+
+class SnippetCompiler:
+    """Parse snippets once, reject statically invalid ones and cache code objects by hash."""
+
+    def __init__(self, allowed_import_roots: Iterable[str], *, max_entries: int = 256) -> None:
+        self.allowed_import_roots = frozenset(allowed_import_roots)
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, CompiledSnippet | str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, source: str) -> CompiledSnippet:
+        digest = hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+        if cached is None:
+            cached = self._build(digest, source)
+            with self._lock:
+                self.misses += 1
+                self._cache[digest] = cached
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        if isinstance(cached, str):
+            raise SnippetRejectedError(cached)
+        return cached
+
+    def _build(self, digest: str, source: str) -> CompiledSnippet | str:
+        try:
+            tree = ast.parse(source, filename=SNIPPET_FILENAME, mode="exec")
+        except SyntaxError as exc:
+            return f"{type(exc).__name__}: {exc}"
+
+        blocked = self._first_blocked_import(tree)
+        if blocked is not None:
+            return f"ImportError: import '{blocked}' is blocked by sandbox policy"
+
+        try:
+            code = compile(tree, SNIPPET_FILENAME, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as exc:
+            return f"{type(exc).__name__}: {exc}"
+        return CompiledSnippet(digest=digest, code=code, marshalled=marshal.dumps(code), names=referenced_names(code))
+
+    def _first_blocked_import(self, tree: ast.Module) -> str | None:
+        # Only imports that run unconditionally are refused up front; those inside functions,
+        # branches, loops or ``try`` blocks that handle ImportError are left to the sandbox's
+        # runtime import guard, because the snippet may never reach them or may recover.
+        pending = list(tree.body)
+        while pending:
+            node = pending.pop(0)
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                names = ["." * node.level + (node.module or "")]
+            else:
+                if isinstance(node, (ast.With, ast.AsyncWith, ast.ClassDef)):
+                    pending.extend(node.body)
+                elif isinstance(node, (ast.Try, ast.TryStar)):
+                    if not any(_handles_import_error(handler) for handler in node.handlers):
+                        pending.extend(node.body)
+                    pending.extend(node.finalbody)
+                continue
+            for name in names:
+                if name.split(".")[0] not in self.allowed_import_roots:
+                    return name
+        return None
+
+
+def _handles_import_error(handler: ast.ExceptHandler) -> bool:
+    if handler.type is None:
+        return True
+    caught = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(
+        isinstance(kind, ast.Name) and kind.id in {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+        for kind in caught
+    )
+
+
+def referenced_names(code: CodeType) -> frozenset[str]:
+    names: set[str] = set()
+    pending = [code]
+    while pending:
+        current = pending.pop()
+        names.update(current.co_names)
+        pending.extend(const for const in current.co_consts if isinstance(const, CodeType))
+    return frozenset(names)
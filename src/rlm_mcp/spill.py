@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+# Containers longer than this are sized from a sample of their items.
+_SAMPLE_ITEMS = 256
+
+
+@dataclass(frozen=True, slots=True)
+class SpilledVar:
+    """Stands in for a session variable whose value was moved to the blob store."""
+
+    path: str
+    size_bytes: int
+    estimated_bytes: int
+    type_name: str
+
+
+def estimate_size(value: Any, depth: int = 3) -> int:
+    """Approximate in-memory footprint of ``value`` in bytes, cheap enough to run after every step."""
+    size = sys.getsizeof(value)
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray)):
+        return size
+    if isinstance(value, dict):
+        items: Any = value.items()
+        count = len(value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+        count = len(value)
+    else:
+        return size
+    sampled = 0
+    total = 0
+    for item in items:
+        if sampled == _SAMPLE_ITEMS:
+            break
+        if isinstance(item, tuple) and isinstance(value, dict):
+            total += estimate_size(item[0], depth - 1) + estimate_size(item[1], depth - 1)
+        else:
+            total += estimate_size(item, depth - 1)
+        sampled += 1
+    if sampled:
+        size += total * count // sampled
+    return size
+
+
+class BlobStore:
+    """Per-session directories of pickled, zlib-compressed variable values.
+
+    Without a ``directory`` a private temporary one is created and removed when the store is
+    garbage collected or the process exits.
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        if directory is None:
+            self.directory = tempfile.mkdtemp(prefix="rlm-spill-")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, True)
+        else:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            self.directory = directory
+
+    def put(self, session_id: str, value: Any, *, estimated_bytes: int = 0) -> SpilledVar:
+        session_dir = os.path.join(self.directory, session_id)
+        os.makedirs(session_dir, mode=0o700, exist_ok=True)
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        path = os.path.join(session_dir, f"{uuid.uuid4().hex}.blob")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(fd, "wb") as handle:
+            handle.write(data)
+        return SpilledVar(
+            path=path,
+            size_bytes=len(data),
+            estimated_bytes=estimated_bytes,
+            type_name=type(value).__name__,
+        )
+
+    def load(self, ref: SpilledVar) -> Any:
+        with open(ref.path, "rb") as handle:
+            return pickle.loads(zlib.decompress(handle.read()))
+
+    def discard(self, ref: SpilledVar) -> None:
+        try:
+            os.unlink(ref.path)
+        except FileNotFoundError:
+            pass
+
+    def discard_session(self, session_id: str) -> None:
+        shutil.rmtree(os.path.join(self.directory, session_id), ignore_errors=True)
+
+
+class SpillManager:
+    """Decides which session variables leave memory under a per-server budget.
+
+    Variables of at least ``threshold_bytes`` are tracked as resident. When the tracked total
+    exceeds ``memory_budget_bytes``, the session that just stored variables gives up its largest
+    ones until the total fits again; smaller variables always stay in memory.
+    """
+
+    def __init__(
+        self,
+        blobs: BlobStore,
+        *,
+        threshold_bytes: int | None = None,
+        memory_budget_bytes: int | None = None,
+    ) -> None:
+        self.blobs = blobs
+        self.threshold_bytes = max(
+            1,
+            threshold_bytes if threshold_bytes is not None else int(os.getenv("RLM_SPILL_THRESHOLD_BYTES", "1048576")),
+        )
+        budget_mb = os.getenv("RLM_SPILL_MEMORY_BUDGET_MB", "512")
+        self.memory_budget_bytes = max(
+            0, memory_budget_bytes if memory_budget_bytes is not None else int(budget_mb) * 1024 * 1024
+        )
+        self._resident: dict[str, dict[str, int]] = {}
+        self.resident_bytes = 0
+        self.spilled = 0
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, name: str, value: Any) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            sizes = self._resident.setdefault(session_id, {})
+            self.resident_bytes -= sizes.pop(name, 0)
+            if size >= self.threshold_bytes:
+                sizes[name] = size
+                self.resident_bytes += size
+
+    def release(self, session_id: str, name: str) -> int:
+        with self._lock:
+            size = self._resident.get(session_id, {}).pop(name, 0)
+            self.resident_bytes -= size
+            return size
+
+    def forget(self, session_id: str, *, discard_blobs: bool = True) -> None:
+        """Stop counting ``session_id``'s variables against the budget and, by default, delete its blobs."""
+        with self._lock:
+            self.resident_bytes -= sum(self._resident.pop(session_id, {}).values())
+        if discard_blobs:
+            self.blobs.discard_session(session_id)
+
+    def victims(self, session_id: str) -> list[str]:
+        """Largest tracked variables of ``session_id`` whose removal brings the total within budget."""
+        with self._lock:
+            excess = self.resident_bytes - self.memory_budget_bytes
+            chosen: list[str] = []
+            for name, size in sorted(self._resident.get(session_id, {}).items(), key=lambda item: -item[1]):
+                if excess <= 0:
+                    break
+                chosen.append(name)
+                excess -= size
+            return chosen
+
+    def spill(self, session_id: str, name: str, value: Any) -> SpilledVar:
+        ref = self.blobs.put(session_id, value, estimated_bytes=self.release(session_id, name))
+        with self._lock:
+            self.spilled += 1
+        return ref
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import atexit
+import importlib
+import json
+import sys
+import tempfile
+import threading
+from types import ModuleType
+from typing import Any
+
+_BOOTSTRAP_SCRIPT = (
+    "_rlm_worker = {'__name__': 'rlm_worker'}\n"
+    "exec(compile(_rlm_worker_source, '<rlm-worker>', 'exec'), _rlm_worker)\n"
+    "del _rlm_worker_source\n"
+)
+_RUN_SCRIPT = (
+    "try:\n"
+    "    _rlm_worker['run_embedded'](_rlm_payload, _rlm_fd)\n"
+    "finally:\n"
+    "    del _rlm_payload, _rlm_fd\n"
+)
+# CPython 3.12 corrupts memory at shutdown when marshal-loaded code objects live in an isolated
+# subinterpreter, so there the worker compiles the snippet source itself.
+_ACCEPTS_CODE_OBJECTS = sys.version_info >= (3, 13)
+# Extra wall time granted to the in-interpreter watchdog before the host abandons the run.
+_JOIN_GRACE_SECONDS = 1.0
+
+
+def _load_interpreters_module() -> ModuleType | None:
+    if sys.version_info < (3, 12):
+        return None
+    for name in ("_interpreters", "_xxsubinterpreters"):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return None
+
+
+_interpreters = _load_interpreters_module()
+
+
+def subinterpreters_supported() -> bool:
+    return _interpreters is not None
+
+
+class SubinterpreterPoolExhaustedError(RuntimeError):
+    """Too many timed-out interpreters are still stuck; callers should use another sandbox."""
+
+
+class SubinterpreterPool:
+    """Pool of isolated (own-GIL) subinterpreters preloaded with the sandbox worker code.
+
+    Each interpreter runs a single snippet and is then destroyed: modules live on in an
+    interpreter, so a patched ``json.dumps`` or an attribute set on ``re`` would otherwise reach
+    later runs of any session. Bootstrapping costs tens of milliseconds, so after every run a
+    replacement is prepared on a background thread and up to ``size`` of them wait ready.
+
+    A run stuck in C code the watchdog cannot interrupt cannot be killed either: its interpreter
+    is set aside and replaced by a fresh one, and destroyed once its thread finishes. While
+    ``max_abandoned`` of them are still stuck the pool refuses runs with
+    ``SubinterpreterPoolExhaustedError`` instead of leaking more threads.
+    """
+
+    def __init__(self, worker_code: str, *, size: int = 4, max_abandoned: int | None = None) -> None:
+        if _interpreters is None:
+            raise RuntimeError("isolated subinterpreters require CPython 3.12+")
+        self.worker_code = worker_code
+        self.size = max(1, size)
+        self.max_abandoned = max(1, max_abandoned if max_abandoned is not None else self.size)
+        self._idle: list[Any] = []
+        self._warming = 0
+        self._abandoned: list[tuple[Any, threading.Thread]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    @property
+    def abandoned(self) -> int:
+        self._reap_abandoned()
+        return len(self._abandoned)
+
+    def run(self, payload: dict[str, Any], *, timeout_ms: int) -> dict[str, Any]:
+        if self.abandoned >= self.max_abandoned:
+            raise SubinterpreterPoolExhaustedError(
+                f"{self.max_abandoned} timed-out subinterpreters are still running"
+            )
+        if not _ACCEPTS_CODE_OBJECTS:
+            payload = {key: value for key, value in payload.items() if key != "code_object"}
+        interp_id = self._acquire()
+        output = tempfile.TemporaryFile()
+        failure: list[BaseException] = []
+
+        def target() -> None:
+            try:
+                self._exec(interp_id, _RUN_SCRIPT, {"_rlm_payload": json.dumps(payload), "_rlm_fd": output.fileno()})
+            except BaseException as exc:  # noqa: BLE001
+                failure.append(exc)
+
+        thread = threading.Thread(target=target, name="rlm-subinterpreter", daemon=True)
+        thread.start()
+        thread.join(max(1.0, timeout_ms / 1000.0) + _JOIN_GRACE_SECONDS)
+        if thread.is_alive():
+            # Stuck inside C code the watchdog cannot interrupt. The interpreter cannot be
+            # destroyed while it runs, so it is set aside until its thread finishes; the thread
+            # keeps the output file alive until then.
+            with self._lock:
+                self._abandoned.append((interp_id, thread))
+            raise TimeoutError("sandbox subinterpreter timed out")
+
+        self._release(interp_id)
+        with output:
+            if failure:
+                raise RuntimeError(str(failure[0]))
+            output.seek(0)
+            raw = output.read()
+        return json.loads(raw)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for interp_id in idle:
+            self._destroy(interp_id)
+        self._reap_abandoned()
+
+    def _acquire(self) -> Any:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._bootstrap()
+
+    def _bootstrap(self) -> Any:
+        interp_id = self._create()
+        try:
+            self._exec(interp_id, _BOOTSTRAP_SCRIPT, {"_rlm_worker_source": self.worker_code})
+        except BaseException:
+            self._destroy(interp_id)
+            raise
+        return interp_id
+
+    def _warm(self) -> None:
+        try:
+            interp_id = self._bootstrap()
+        except Exception:  # noqa: BLE001
+            # The next run bootstraps its own interpreter and reports the failure.
+            interp_id = None
+        with self._lock:
+            self._warming -= 1
+            if interp_id is not None and not self._closed and len(self._idle) < self.size:
+                self._idle.append(interp_id)
+                return
+        if interp_id is not None:
+            self._destroy(interp_id)
+
+    def _reap_abandoned(self) -> None:
+        with self._lock:
+            finished = [interp_id for interp_id, thread in self._abandoned if not thread.is_alive()]
+            self._abandoned = [(interp_id, thread) for interp_id, thread in self._abandoned if thread.is_alive()]
+        for interp_id in finished:
+            self._destroy(interp_id)
+
+    def _release(self, interp_id: Any) -> None:
+        # Never reused: the snippet may have changed module state. A fresh one takes its place.
+        self._destroy(interp_id)
+        with self._lock:
+            if self._closed or len(self._idle) + self._warming >= self.size:
+                return
+            self._warming += 1
+        threading.Thread(target=self._warm, name="rlm-subinterpreter-warm", daemon=True).start()
+
+    @staticmethod
+    def _create() -> Any:
+        if hasattr(_interpreters, "exec"):
+            return _interpreters.create("isolated")
+        return _interpreters.create(isolated=True)
+
+    @staticmethod
+    def _exec(interp_id: Any, script: str, shared: dict[str, Any]) -> None:
+        if hasattr(_interpreters, "exec"):
+            excinfo = _interpreters.exec(interp_id, script, shared)
+            if excinfo is not None:
+                raise RuntimeError(f"{excinfo.type.__name__}: {excinfo.msg}")
+            return
+        _interpreters.run_string(interp_id, script, shared)
+
+    @staticmethod
+    def _destroy(interp_id: Any) -> None:
+        try:
+            _interpreters.destroy(interp_id)
+        except Exception:  # noqa: BLE001
+            pass
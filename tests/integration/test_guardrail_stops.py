@@ -8,3 +8,12 @@ def test_stops_on_max_steps():
     svc.run_repl(sid, "a = 1")
     out = svc.run_repl(sid, "b = 2")
     assert out["guardrail_stop"] == "max_steps"
+
+
+def test_stops_on_cumulative_cpu_time():
+    svc = RlmMcpService()
+    sid = svc.init_context("x", SessionConfig(max_steps=10, max_runtime_ms=60000, budget_limit=99999, max_cpu_ms=100))
+    out = svc.run_repl(sid, "t = 0\nfor i in range(2_000_000):\n    t += i")
+    assert out["cpu_ms"] >= 100
+    assert out["guardrail_stop"] == "cpu_exceeded"
+    assert svc.get_trace(sid)[-1]["guardrail_snapshot"]["cpu_ms_used"] == out["cpu_ms"]
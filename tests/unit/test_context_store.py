@@ -0,0 +1,36 @@
+import pickle
+
+import pytest
+
+from rlm_mcp.context_store import CompressedText
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_compressed_text_slices_match_plain_string(codec):
+    text = "".join(f"line {i} héllo\n" for i in range(500))
+    blocks = CompressedText.from_text(text, codec=codec, block_chars=97)
+    assert len(blocks) == len(text)
+    assert blocks.text() == text
+    for key in (slice(0, 10), slice(90, 300), slice(-50, None), slice(5, 900, 7), slice(None, None, -3)):
+        assert blocks[key] == text[key]
+    assert blocks[-1] == text[-1]
+    assert "".join(blocks.iter_chunks(64, start=3)) == text[3:]
+    assert pickle.loads(pickle.dumps(blocks))[100:200] == text[100:200]
+
+
+def test_compressed_text_find_crosses_block_boundaries():
+    text = "a" * 95 + "needle" + "b" * 200 + "needle"
+    blocks = CompressedText.from_text(text, block_chars=97)
+    assert blocks.find("needle") == text.find("needle")
+    assert blocks.find("needle", 100) == text.find("needle", 100)
+    assert blocks.find("needle", 0, 100) == -1
+    assert blocks.find("missing") == -1
+
+
+def test_compressed_text_reads_only_touched_blocks():
+    blocks = CompressedText.from_text("x" * 1000, block_chars=100, cache_blocks=2)
+    assert blocks.block_count == 10
+    blocks[150:250]
+    assert blocks.cache_misses == 2
+    blocks[160:170]
+    assert (blocks.cache_hits, blocks.cache_misses) == (1, 2)
@@ -0,0 +1,36 @@
+import pickle
+
+import pytest
+
+from rlm_mcp.corpus import ContextIngest, build_corpus
+from rlm_mcp.errors import RlmMcpError
+
+
+def test_build_corpus_indexes_each_document():
+    text, index = build_corpus(
+        [
+            {"id": "a", "text": "alpha", "metadata": {"lang": "en"}},
+            {"id": "b", "text": "beta"},
+        ]
+    )
+    assert text == "alpha\n\nbeta"
+    assert index.document_text(text, index.position("b")) == "beta"
+    assert index.metadata == [{"lang": "en"}, {}]
+    assert pickle.loads(pickle.dumps(index)).position("b") == 1
+
+
+def test_build_corpus_rejects_duplicate_ids():
+    with pytest.raises(RlmMcpError):
+        build_corpus([{"id": "a", "text": "x"}, {"id": "a", "text": "y"}])
+
+
+def test_context_ingest_tracks_document_offsets_across_chunks(tmp_path):
+    ingest = ContextIngest.create(str(tmp_path))
+    ingest.append("héllo ", doc_id="a", metadata={"n": 1})
+    ingest.append("wörld", doc_id="a")
+    ingest.append("second", doc_id="b")
+    text, index = ingest.seal()
+    assert text == "héllo wörld\n\nsecond"
+    assert [index.document_text(text, i) for i in range(len(index))] == ["héllo wörld", "second"]
+    assert index.metadata == [{"n": 1}, {}]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,47 @@
+from rlm_mcp.dedup import build_dedup_index, minhash_signature, segment_text
+from rlm_mcp.service import RlmMcpService
+
+
+def _paragraph(seed: int, words: int = 200) -> str:
+    return " ".join(f"w{(seed * 7919 + i * 104729) % 5000}" for i in range(words))
+
+
+def test_segment_text_ends_chunks_at_newlines():
+    text = "aaaa\nbbbb\ncccccccccc"
+    starts, ends = segment_text(text, 7)
+    assert [text[s:e] for s, e in zip(starts, ends)] == ["aaaa\n", "bbbb\n", "ccccccc", "ccc"]
+
+
+def test_minhash_signature_is_dense_and_tracks_similarity():
+    signature = minhash_signature("only four words here", 64)
+    assert len(set(signature)) > 1 and max(signature) < 2**64 - 1
+    base = _paragraph(1).split()
+    edited = base[:]
+    edited[10] = "changed"
+    same = sum(a == b for a, b in zip(minhash_signature(" ".join(base), 64), minhash_signature(" ".join(edited), 64)))
+    other = sum(a == b for a, b in zip(minhash_signature(" ".join(base), 64), minhash_signature(_paragraph(2), 64)))
+    assert same > 48 and other < 8
+
+
+def test_build_dedup_index_clusters_near_duplicates():
+    chunks = [_paragraph(1), _paragraph(2), _paragraph(1).replace("w", "W", 1), _paragraph(3), _paragraph(2)]
+    text = "\n".join(chunks)
+    starts = [sum(len(chunk) + 1 for chunk in chunks[:i]) for i in range(len(chunks))]
+    ends = [start + len(chunk) for start, chunk in zip(starts, chunks)]
+    index = build_dedup_index(text, starts, ends, chunk_chars=0)
+    assert list(index.representative) == [0, 1, 0, 3, 1]
+    assert index.clusters() == [[0, 2], [1, 4]] and index.distinct == 3
+
+
+def test_find_duplicates_and_sandbox_helper_share_the_index():
+    svc = RlmMcpService()
+    documents = [{"id": f"d{i}", "text": _paragraph(i % 2)} for i in range(4)]
+    sid = svc.init_context("", documents=documents)
+    found = svc.find_duplicates(sid)
+    assert found["segmentation"] == "documents" and found["distinct"] == 2
+    assert [cluster["ids"] for cluster in found["clusters"]] == [["d0", "d2"], ["d1", "d3"]]
+
+    code = "sizes = {i: len(text.split()) for i, text in dedup.distinct()}\nper_chunk = dedup.expand(sizes)"
+    out = svc.run_repl(sid, code)
+    assert out["stderr"] == ""
+    assert svc.get_var(sid, "per_chunk")["value"] == [200, 200, 200, 200]
@@ -31,3 +31,19 @@ def test_stops_when_budget_exceeded():
     stop, reason = controller.should_stop(session)
     assert stop is True
     assert reason == "budget_exceeded"
+
+
+def test_stops_when_cpu_exceeded():
+    cfg = SessionConfig(max_steps=10, max_runtime_ms=60000, budget_limit=1000, max_cpu_ms=500)
+    session = SessionState(session_id="s", context_text="c", config=cfg, cpu_ms_used=501)
+    stop, reason = GuardrailController().should_stop(session)
+    assert stop is True
+    assert reason == "cpu_exceeded"
+
+
+def test_stops_when_peak_memory_exceeded():
+    cfg = SessionConfig(max_steps=10, max_runtime_ms=60000, budget_limit=1000, max_peak_memory_mb=64)
+    session = SessionState(session_id="s", context_text="c", config=cfg, peak_memory_bytes=65 * 1024 * 1024)
+    stop, reason = GuardrailController().should_stop(session)
+    assert stop is True
+    assert reason == "memory_exceeded"
@@ -0,0 +1,22 @@
+import json
+
+from rlm_mcp.http_server import route_request
+from rlm_mcp.session_store import shard_for
+
+
+def _tool_call(name, arguments):
+    return json.dumps(
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+    ).encode()
+
+
+def test_route_request_uses_session_shard():
+    sid = "4f6c2a8e-1d3b-4c55-9a0e-2b7d9f1e3c42"
+    body = _tool_call("rlm_run_repl", {"params": {"session_id": sid, "code": "x = 1"}})
+    assert route_request(body, 4, fallback=0) == shard_for(sid, 4)
+    assert route_request(body, 4, fallback=3) == shard_for(sid, 4)
+
+
+def test_route_request_without_session_uses_fallback():
+    body = _tool_call("rlm_init_context", {"params": {"context_text": 'say "session_id": "nope"'}})
+    assert route_request(body, 4, fallback=6) == 2
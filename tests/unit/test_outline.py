@@ -0,0 +1,58 @@
+from rlm_mcp.outline import build_outline, detect_format
+from rlm_mcp.service import RlmMcpService
+
+MARKDOWN = "# Intro\nhello\n## Setup\n```\n# not a heading\n```\nsteps\n## Usage\nrun it\n# API\ncalls\n"
+
+
+def test_detect_format_recognizes_common_layouts():
+    assert detect_format(MARKDOWN) == "markdown"
+    assert detect_format("==> a.py <==\nx = 1\n==> b.py <==\ny = 2\n") == "source_files"
+    assert detect_format('{"id": 1}\n{"id": 2}\n{"id": 3}\n') == "jsonl"
+    assert detect_format("just some prose\nwithout structure\n") == "text"
+
+
+def test_build_outline_nests_headings_and_skips_fenced_code():
+    sections, truncated = build_outline(MARKDOWN).to_tree()
+    assert [(s["title"], [c["title"] for c in s["children"]]) for s in sections] == [
+        ("Intro", ["Setup", "Usage"]),
+        ("API", []),
+    ]
+    assert sections[0]["end"] == sections[1]["start"] == MARKDOWN.index("# API")
+    assert not truncated
+    assert build_outline(MARKDOWN).to_tree(max_depth=1) == ([{**s, "children": []} for s in sections], True)
+
+
+def test_build_outline_lists_files_with_symbols_and_groups_records():
+    source = "==> a.py <==\nimport os\ndef load():\n    pass\nclass Store:\n    pass\n==> b.js <==\nfunction run() {}\n"
+    files, _ = build_outline(source).to_tree()
+    assert [(f["title"], [c["title"] for c in f["children"]]) for f in files] == [("a.py", ["load", "Store"]), ("b.js", ["run"])]
+    assert files[1]["end"] == len(source)
+
+    records = "".join('{"id": "r%d"}\n' % i for i in range(5000))
+    outline = build_outline(records)
+    assert outline.format == "jsonl" and len(outline) == 1000
+    assert outline.titles[0] == "records 1-5" and outline.ends[-1] == len(records)
+    assert build_outline('{"id": "x"}\n{"v": 2}\n{"v": 3}\n').titles == ["record 1: x", "record 2", "record 3"]
+
+
+def test_outline_tool_and_sandbox_helper_chunk_on_sections():
+    svc = RlmMcpService()
+    documents = [{"id": "guide", "text": MARKDOWN}, {"id": "notes", "text": "plain notes\n"}]
+    sid = svc.init_context("", documents=documents, outline=True)
+    out = svc.outline(sid, max_depth=2)
+    assert out["format"] == "documents" and out["total_sections"] == 6
+    assert [(s["title"], [c["title"] for c in s["children"]]) for s in out["sections"]] == [
+        ("guide", ["Intro", "API"]),
+        ("notes", []),
+    ]
+
+    code = (
+        "spans = outline.chunk_spans(40)\n"
+        "covered = ''.join(context[s:e] for s, e in spans) == context\n"
+        "titles = [s.title for s in outline.sections(kind='heading', level=2)]"
+    )
+    result = svc.run_repl(sid, code)
+    assert result["stderr"] == ""
+    assert svc.get_var(sid, "covered")["value"] is True
+    assert svc.get_var(sid, "titles")["value"] == ["Setup", "Usage"]
+    assert all(e - s <= 40 for s, e in svc.get_var(sid, "spans")["value"])
@@ -0,0 +1,116 @@
+import pytest
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+from rlm_mcp.models import SessionConfig
+from rlm_mcp.pipeline import build_pipeline
+from rlm_mcp.service import RlmMcpService
+
+
+def test_build_pipeline_wires_dependencies_and_rejects_cycles():
+    nodes = build_pipeline(
+        [
+            {"name": "split", "code": "parts = 1", "outputs": ["parts"]},
+            {"name": "count", "code": "n = parts", "inputs": ["parts", "seed"], "outputs": ["n"]},
+        ]
+    )
+    assert [node.depends_on for node in nodes] == [(), ("split",)]
+    with pytest.raises(ValueError, match="cycle"):
+        build_pipeline(
+            [
+                {"name": "a", "code": "x = y", "inputs": ["y"], "outputs": ["x"]},
+                {"name": "b", "code": "y = x", "inputs": ["x"], "outputs": ["y"]},
+            ]
+        )
+    with pytest.raises(ValueError, match="output of both"):
+        build_pipeline([{"name": "a", "code": "x = 1", "outputs": ["x"]}, {"name": "b", "code": "x = 2", "outputs": ["x"]}])
+
+
+def test_run_pipeline_passes_values_between_parallel_nodes():
+    svc = RlmMcpService()
+    sid = svc.init_context("alpha beta\ngamma\ndelta epsilon zeta")
+    out = svc.run_pipeline(
+        sid,
+        [
+            {"name": "split", "code": "lines = context.splitlines()", "outputs": ["lines"]},
+            {"name": "words", "code": "words = sum(len(l.split()) for l in lines)", "inputs": ["lines"], "outputs": ["words"]},
+            {"name": "chars", "code": "chars = sum(len(l) for l in lines)", "inputs": ["lines"], "outputs": ["chars"]},
+            {
+                "name": "merge",
+                "code": "summary = f'{words} words, {chars} chars'\nprint(summary)",
+                "inputs": ["words", "chars"],
+                "outputs": ["summary"],
+            },
+        ],
+    )
+    assert [node["status"] for node in out["nodes"]] == ["ok"] * 4
+    assert out["nodes"][-1]["stdout"] == "6 words, 33 chars\n"
+    assert out["step_index"] == 4
+    assert svc.get_var(sid, "summary")["value"] == "6 words, 33 chars"
+    trace = svc.get_trace(sid)
+    assert [event["action"] for event in trace[1:]] == ["run_pipeline"] * 4
+    assert trace[-1]["summary"].startswith("merge: ")
+
+
+def test_run_pipeline_stops_after_failed_node():
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx")
+    out = svc.run_pipeline(
+        sid,
+        [
+            {"name": "bad", "code": "x = 1 / 0", "outputs": ["x"]},
+            {"name": "after", "code": "y = x + 1", "inputs": ["x"], "outputs": ["y"]},
+            {"name": "quiet", "code": "z = 1"},
+        ],
+        max_parallel=1,
+    )
+    statuses = {node["name"]: node["status"] for node in out["nodes"]}
+    assert statuses == {"bad": "error", "after": "skipped", "quiet": "skipped"}
+    assert "ZeroDivisionError" in out["nodes"][0]["error"]
+    assert out["step_index"] == 1
+
+
+def test_run_pipeline_reports_missing_outputs_and_guardrail_stop():
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx", SessionConfig(max_steps=1))
+    out = svc.run_pipeline(
+        sid,
+        [{"name": "one", "code": "a = 1", "outputs": ["a"]}, {"name": "two", "code": "b = 2", "outputs": ["b"]}],
+        max_parallel=1,
+    )
+    assert out["guardrail_stop"] == "max_steps"
+    assert [node["status"] for node in out["nodes"]] == ["ok", "skipped"]
+
+    sid = svc.init_context("ctx")
+    out = svc.run_pipeline(sid, [{"name": "lazy", "code": "pass", "outputs": ["answer"]}])
+    assert out["nodes"][0]["error"] == "NameError: pipeline node 'lazy' did not define answer"
+    with pytest.raises(RlmMcpError) as excinfo:
+        svc.run_pipeline(sid, [{"name": "reader", "code": "pass", "inputs": ["nowhere"]}])
+    assert excinfo.value.code == ErrorCode.INVALID_INPUT
+
+
+def test_run_pipeline_turns_node_exceptions_into_errors_and_saves_progress():
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx")
+    real_run = svc.sandbox.run
+
+    def flaky_run(code, env, **kwargs):
+        if code.startswith("boom"):
+            raise OSError("worker pipe broke")
+        return real_run(code, env, **kwargs)
+
+    svc.sandbox.run = flaky_run
+    out = svc.run_pipeline(
+        sid,
+        [
+            {"name": "first", "code": "a = 1", "outputs": ["a"]},
+            {"name": "crash", "code": "boom = a", "inputs": ["a"], "outputs": ["boom"]},
+            {"name": "after", "code": "c = boom", "inputs": ["boom"], "outputs": ["c"]},
+        ],
+        max_parallel=1,
+    )
+    statuses = {node["name"]: node["status"] for node in out["nodes"]}
+    assert statuses == {"first": "ok", "crash": "error", "after": "skipped"}
+    assert out["nodes"][1]["error"] == "OSError: worker pipe broke"
+    assert out["step_index"] == 2
+    assert svc.get_var(sid, "a")["value"] == 1
+    assert [event["result_status"] for event in svc.get_trace(sid)[1:]] == ["ok", "error"]
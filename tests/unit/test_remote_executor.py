@@ -0,0 +1,135 @@
+import struct
+
+import pytest
+
+from rlm_mcp.daemon import SandboxDaemon
+from rlm_mcp.remote import RemoteExecutorPool, connect, parse_endpoint, recv_message, send_message
+from rlm_mcp.sandbox import SandboxExecutor
+
+
+@pytest.fixture
+def daemons(tmp_path):
+    started = [
+        SandboxDaemon(["tcp:127.0.0.1:0"], max_workers=2, token="secret"),
+        SandboxDaemon([f"unix:{tmp_path / 'sandbox.sock'}"], max_workers=2, token="secret"),
+    ]
+    for daemon in started:
+        daemon.start()
+    yield started
+    for daemon in started:
+        daemon.shutdown()
+
+
+def test_parse_endpoint_accepts_unix_and_tcp():
+    assert parse_endpoint("unix:/tmp/x.sock")[1] == "/tmp/x.sock"
+    assert parse_endpoint("tcp:127.0.0.1:9000")[1] == ("127.0.0.1", 9000)
+    with pytest.raises(ValueError):
+        parse_endpoint("tcp:nohost")
+
+
+def test_remote_mode_runs_on_daemon_and_updates_env(daemons):
+    endpoints = tuple(endpoint for daemon in daemons for endpoint in daemon.endpoints)
+    executor = SandboxExecutor(sandbox_mode="remote", remote_endpoints=endpoints, remote_token="secret")
+    env = {"x": 2}
+    out = executor.run("print(x)\ny = x + 3", env, affinity_key="s1")
+    assert out.error is None
+    assert out.stdout == "2\n"
+    assert env["y"] == 5
+    assert sum(daemon.completed for daemon in daemons) == 1
+
+
+def test_session_affinity_keeps_session_on_one_daemon(daemons):
+    endpoints = [endpoint for daemon in daemons for endpoint in daemon.endpoints]
+    pool = RemoteExecutorPool(endpoints, token="secret")
+    executor = SandboxExecutor(sandbox_mode="remote", remote_endpoints=tuple(endpoints), remote_token="secret")
+    executor._remote = pool
+    for _ in range(3):
+        executor.run("a = 1", {}, affinity_key="sticky")
+    assert sorted(daemon.completed for daemon in daemons) == [0, 3]
+    stats = pool.stats()
+    assert sum(entry["completed"] for entry in stats) == 3
+    assert any(entry["idle_connections"] == 1 for entry in stats)
+
+
+def test_unreachable_endpoint_is_skipped(daemons, tmp_path):
+    endpoints = (f"unix:{tmp_path / 'missing.sock'}", daemons[0].endpoints[0])
+    executor = SandboxExecutor(
+        sandbox_mode="remote",
+        remote_endpoints=endpoints,
+        remote_token="secret",
+        fallback_to_subprocess=False,
+    )
+    env = {}
+    assert executor.run("z = 7", env).error is None
+    assert env["z"] == 7
+
+
+def test_no_reachable_daemon_without_fallback_reports_error(tmp_path):
+    executor = SandboxExecutor(
+        sandbox_mode="remote",
+        remote_endpoints=(f"unix:{tmp_path / 'missing.sock'}",),
+        fallback_to_subprocess=False,
+    )
+    out = executor.run("z = 7", {})
+    assert out.error is not None
+    assert "RemoteUnavailableError" in out.error
+
+
+def test_daemon_rejects_wrong_token(tmp_path):
+    daemon = SandboxDaemon([f"unix:{tmp_path / 'auth.sock'}"], token="secret")
+    daemon.start()
+    try:
+        executor = SandboxExecutor(sandbox_mode="remote", remote_endpoints=tuple(daemon.endpoints), remote_token="nope")
+        out = executor.run("z = 7", {})
+        assert out.error is not None
+        assert "unauthorized" in out.error
+    finally:
+        daemon.shutdown()
+
+
+def test_tcp_listener_requires_token():
+    with pytest.raises(ValueError, match="token"):
+        SandboxDaemon(["tcp:127.0.0.1:0"])
+
+
+def test_daemon_applies_its_own_limits_and_ignores_client_policy(tmp_path):
+    daemon = SandboxDaemon([f"unix:{tmp_path / 'policy.sock'}"], max_timeout_ms=1500)
+    daemon.start()
+    try:
+        response = daemon.handle(
+            {
+                "op": "run",
+                "timeout_ms": 10**9,
+                "payload": {
+                    "code": "import os\nx = 1",
+                    "env": {},
+                    "allowed_import_roots": ["os"],
+                    "memory_limit_bytes": 1 << 40,
+                    "buffers": {"in": "/etc/passwd"},
+                    "jail": {"seccomp": False},
+                },
+            }
+        )
+        assert response["ok"]
+        assert "blocked by sandbox policy" in response["result"]["stderr"]
+        timed_out = daemon.handle({"op": "run", "timeout_ms": 10**9, "payload": {"code": "while True:\n    pass"}})
+        assert "TimeoutError" in timed_out["result"]["error"]
+        assert not daemon.handle({"op": "run", "payload": {"env": {}}})["ok"]
+    finally:
+        daemon.shutdown()
+
+
+def test_daemon_reads_only_a_small_hello_before_authentication(tmp_path):
+    daemon = SandboxDaemon([f"unix:{tmp_path / 'hello.sock'}"], token="secret")
+    daemon.start()
+    try:
+        with connect(daemon.endpoints[0], timeout=5) as sock:
+            # Claims a 256 MiB frame: dropped before any body is read or buffer allocated.
+            sock.sendall(struct.pack(">I", 256 * 1024 * 1024))
+            assert sock.recv(1) == b""
+        with connect(daemon.endpoints[0], timeout=5) as sock:
+            send_message(sock, {"op": "run", "token": "secret", "payload": {"code": "x = 1"}})
+            assert recv_message(sock) == {"ok": False, "error": "expected hello"}
+            assert sock.recv(1) == b""
+    finally:
+        daemon.shutdown()
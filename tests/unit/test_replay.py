@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from rlm_mcp.replay import HandlerDriver, StdioDriver, load_trajectories, replay
+from rlm_mcp.server import create_tool_handlers
+
+SRC = str(Path(__file__).resolve().parents[2] / "src")
+
+
+def _record_session(recording, monkeypatch):
+    monkeypatch.setenv("RLM_RECORD_TRAJECTORIES", str(recording))
+    handlers = create_tool_handlers()
+    sid = handlers["rlm_init_context"](context_text="secret " * 100, session_config={"max_steps": 2})["session_id"]
+    child = handlers["rlm_spawn_child"](sid, 500, end=70)["session_id"]
+    handlers["rlm_run_repl"](child, "c = len(context)")
+    handlers["rlm_finalize"](child, final_var_name="c")
+    handlers["rlm_run_repl"](sid, "n = len(context)")
+    handlers["rlm_run_repl"](session_id=sid, code="m = n * 2")
+    handlers["rlm_run_repl"](session_id=sid, code="k = 1")
+    handlers["rlm_finalize"](sid, final_var_name="m")
+    monkeypatch.delenv("RLM_RECORD_TRAJECTORIES")
+    return child
+
+
+def test_recorded_trajectories_replay_against_handlers(tmp_path, monkeypatch):
+    recording = tmp_path / "trajectories.jsonl"
+    child = _record_session(recording, monkeypatch)
+    events = [json.loads(line) for line in recording.read_text().splitlines()]
+    assert [e["tool"] for e in events] == (
+        ["rlm_init_context", "rlm_spawn_child", "rlm_run_repl", "rlm_finalize"] + ["rlm_run_repl"] * 3 + ["rlm_finalize"]
+    )
+    assert events[0]["args"]["context_text"] == {"__size__": 700}
+    assert events[1]["child_session"] == child and events[2]["session"] == child
+    assert "secret" not in recording.read_text()
+
+    trajectories = load_trajectories(str(recording))
+    assert len(trajectories) == 1 and len(trajectories[0].events) == 8
+    driver = HandlerDriver(create_tool_handlers())
+    report = asyncio.run(replay(trajectories, driver, concurrency=3, speedup=0)).to_dict()
+    assert report["trajectories"] == 3 and report["calls"] == 24
+    assert report["error_rate"] == 0.0
+    assert report["guardrail_stop_rate"] == 1.0
+    assert report["latency_by_tool"]["rlm_run_repl"]["calls"] == 12
+    assert report["rss_bytes"]["max"] > 0
+
+
+def test_recorded_trajectories_replay_against_a_stdio_server(tmp_path, monkeypatch):
+    recording = tmp_path / "trajectories.jsonl"
+    _record_session(recording, monkeypatch)
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [SRC, os.getenv("PYTHONPATH")])))
+
+    async def run():
+        driver = StdioDriver([sys.executable, "-m", "rlm_mcp.server"])
+        await driver.start()
+        try:
+            # A call the input model rejects is counted as an error instead of aborting the replay.
+            rejected = await driver.call("rlm_run_repl", {"session_id": "s", "code": "x = 1", "bogus": 1})
+            report = await replay(load_trajectories(str(recording)), driver, concurrency=2, speedup=0)
+        finally:
+            await driver.close()
+        return rejected, report.to_dict()
+
+    rejected, report = asyncio.run(run())
+    assert not rejected.ok and rejected.error_code == "TOOL_ERROR"
+    assert report["trajectories"] == 2 and report["calls"] == 16
+    assert report["error_rate"] == 0.0
+    assert report["guardrail_stop_rate"] == 1.0
+
+
+def test_servers_in_one_process_share_a_single_recorder(tmp_path, monkeypatch):
+    from rlm_mcp.replay import TrajectoryRecorder, close_shared_recorders
+    from rlm_mcp.server import RlmMcpServer
+
+    monkeypatch.setenv("RLM_RECORD_TRAJECTORIES", str(tmp_path / "shared.jsonl"))
+    try:
+        first, second = RlmMcpServer(), RlmMcpServer()
+        assert first.recorder is second.recorder is TrajectoryRecorder.shared()
+    finally:
+        close_shared_recorders()
+    # Closing is idempotent and later events are dropped instead of raising.
+    first.recorder.close()
+    first.recorder.record("rlm_get_trace", {}, 0.0, None)
+
+    captured = {}
+
+    class Params:
+        def __init__(self, **kwargs):
+            captured.update(kwargs)
+            raise RuntimeError("stop")
+
+    import mcp.client.stdio
+
+    monkeypatch.setattr(mcp.client.stdio, "StdioServerParameters", Params)
+    try:
+        asyncio.run(StdioDriver(["rlm-mcp"]).start())
+    except RuntimeError:
+        pass
+    assert "RLM_RECORD_TRAJECTORIES" not in captured["env"]
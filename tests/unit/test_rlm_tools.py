@@ -0,0 +1,45 @@
+from rlm_mcp import rlm_tools
+from rlm_mcp.sandbox import SandboxExecutor
+
+LOG = "2024-01-01 INFO start\n2024-01-01 ERROR disk full\nretrying\n2024-01-02 ERROR disk full again\n2024-01-02 WARN slow\n"
+
+
+def test_grep_reports_each_matching_line_once_with_its_number():
+    assert rlm_tools.grep(LOG, "ERROR|disk") == [(2, "2024-01-01 ERROR disk full"), (4, "2024-01-02 ERROR disk full again")]
+    assert rlm_tools.grep(LOG, "^retry") == [(3, "retrying")]
+    assert rlm_tools.grep(LOG, "warn", ignore_case=True) == [(5, "2024-01-02 WARN slow")]
+    assert rlm_tools.grep(LOG, "2024", max_matches=1) == [(1, "2024-01-01 INFO start")]
+
+
+def test_count_patterns_and_top_tokens_scan_once():
+    assert rlm_tools.count_patterns(LOG, ["ERROR", r"(WARN|INFO)", "missing"]) == {
+        "ERROR": 2,
+        "(WARN|INFO)": 2,
+        "missing": 0,
+    }
+    assert rlm_tools.top_tokens(LOG, 3, pattern=r"[a-z]+") == [("error", 2), ("disk", 2), ("full", 2)]
+    assert rlm_tools.top_tokens("a a b", 5, stopwords=["a"]) == [("b", 1)]
+
+
+def test_around_merges_overlapping_windows():
+    text = "x" * 50 + "hit" + "x" * 5 + "hit" + "x" * 50
+    windows = rlm_tools.around(text, "hit", width=10)
+    assert windows == [(40, 71, text[40:71])]
+    assert len(rlm_tools.around(text, "hit", width=2)) == 2
+
+
+def test_chunking_by_size_and_regex_covers_the_text():
+    chunks = rlm_tools.chunk_by_size(LOG, 40)
+    assert "".join(chunks) == LOG and all(len(chunk) <= 40 for chunk in chunks)
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    days = rlm_tools.chunk_by_regex(LOG, r"^2024-01-02")
+    assert [len(day.splitlines()) for day in days] == [3, 1, 1] and days[1].startswith("2024-01-02 ERROR")
+    packed = rlm_tools.chunk_by_regex(LOG, r"^\d{4}", max_chars=60)
+    assert "".join(packed) == LOG and all(len(chunk) <= 60 for chunk in packed)
+
+
+def test_sandbox_snippets_can_import_rlm_tools():
+    env = {"context": LOG}
+    result = SandboxExecutor().run("from rlm_tools import grep\nerrors = [n for n, _ in grep(context, 'ERROR')]", env)
+    assert result.error is None
+    assert env["errors"] == [2, 4]
@@ -1,3 +1,8 @@
+import array
+import os
+
+import pytest
+
 from rlm_mcp.sandbox import SandboxExecutor
 
 
@@ -70,3 +75,119 @@ def test_container_mode_without_fallback_returns_runtime_error():
     out = executor.run("x = 1", env)
     assert out.error is not None
     assert "FileNotFoundError" in out.error
+
+
+def test_truncation_keeps_head_and_tail_and_counts_dropped_chars():
+    executor = SandboxExecutor(max_output_chars=20)
+    env = {}
+    out = executor.run("print('HEAD' + 'x' * 5000 + 'TAIL')", env)
+    assert out.stdout.startswith("HEAD")
+    assert out.stdout.endswith("TAIL\n")
+    assert out.stdout_dropped_chars == len("HEAD" + "x" * 5000 + "TAIL\n") - 20
+
+
+def test_large_print_loop_stays_within_memory_limit():
+    executor = SandboxExecutor(memory_limit_mb=128, max_output_chars=1000)
+    env = {}
+    out = executor.run("for _ in range(200000):\n    print('y' * 1000)\ndone = True", env, timeout_ms=10000)
+    assert out.error is None
+    assert env["done"] is True
+    assert out.stdout_dropped_chars > 0
+    assert len(out.stdout) < 1100
+
+
+def test_hard_output_cap_stops_snippet_early():
+    executor = SandboxExecutor(max_output_chars=100, max_output_hard_chars=1000)
+    env = {}
+    out = executor.run("try:\n    for _ in range(10000):\n        print('z' * 100)\nexcept Exception:\n    pass\nafter = 1", env)
+    assert out.error is not None
+    assert out.error.startswith("OutputLimitError")
+    assert "after" not in env
+
+
+def test_reports_cpu_time_and_peak_memory():
+    executor = SandboxExecutor()
+    out = executor.run("blob = len('a' * (32 * 1024 * 1024))", {})
+    assert out.error is None
+    assert out.cpu_ms > 0
+    assert out.peak_memory_bytes >= 32 * 1024 * 1024
+
+
+@pytest.mark.parametrize("pidfd", [True, False])
+def test_killed_worker_still_reports_cpu_time(pidfd, monkeypatch):
+    if not pidfd:
+        # Kernels and builds without pidfds poll the exit with waitid(WNOWAIT) instead.
+        monkeypatch.delattr(os, "pidfd_open", raising=False)
+    executor = SandboxExecutor()
+    out = executor.run("while True:\n    pass", {}, timeout_ms=300)
+    assert "TimeoutError" in out.error
+    assert out.cpu_ms > 0
+    out = executor.run("x = sum(range(10))", {})
+    assert out.error is None and out.cpu_ms > 0
+
+
+def test_docs_helpers_do_not_expose_worker_globals():
+    executor = SandboxExecutor()
+    corpus = {"ids": ["a"], "starts": [0], "ends": [3], "metadata": [{}]}
+    out = executor.run("print(sorted(docs.get.__globals__))", {"context": "abc"}, corpus=corpus)
+    assert out.stdout == "['Document', 'Documents', '__builtins__', '__name__']\n"
+
+
+def test_profile_reports_snippet_functions_and_allocation_sites():
+    executor = SandboxExecutor()
+    env = {}
+    out = executor.run(
+        "def square_all(n):\n    return [i * i for i in range(n)]\nxs = square_all(20000)",
+        env,
+        profile=["cpu", "memory"],
+    )
+    assert out.error is None and len(env["xs"]) == 20000
+    functions = [row[0] for row in out.profile["cpu"]["top"]]
+    assert any(name.startswith("square_all (<string>:1)") for name in functions)
+    assert not any("rlm-worker" in name for name in functions)
+    assert out.profile["memory"]["peak_bytes"] > 0
+    assert out.profile["memory"]["top"][0][0].startswith("<string>:")
+    assert executor.run("x = 1", {}).profile is None
+
+
+def test_typed_buffers_round_trip_through_shared_memory(tmp_path):
+    executor = SandboxExecutor(shm_directory=str(tmp_path))
+    env = {"col": array.array("d", range(50_000)), "tag": b"ab", "raw": bytearray(8192)}
+    out = executor.run(
+        "import array\ntotal = sum(col)\ndoubled = array.array('q', [int(v) * 2 for v in col])\nraw[0] = 7",
+        env,
+    )
+    assert out.error is None
+    assert env["total"] == sum(range(50_000))
+    assert env["doubled"].typecode == "q" and env["doubled"][-1] == 99_998
+    assert env["tag"] == b"ab" and isinstance(env["raw"], bytearray) and env["raw"][0] == 7
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_typed_buffers_go_inline_without_shared_memory():
+    executor = SandboxExecutor(shm_directory="")
+    env = {"col": array.array("i", range(10_000))}
+    out = executor.run("col.append(-1)\nblob = bytes(col)", env)
+    assert out.error is None
+    assert env["col"][-1] == -1 and len(env["blob"]) == 10_001 * env["col"].itemsize
+
+
+def test_worker_maps_only_arena_files_of_the_executor(tmp_path):
+    executor = SandboxExecutor(shm_directory=str(tmp_path))
+    victim = tmp_path / "victim.out"
+    victim.write_bytes(b"\0" * 65536)
+    secret = tmp_path / "secret.in"
+    secret.write_bytes(b"s" * 8192)
+    descriptor = {"__buffer__": {"kind": "bytes", "offset": 0, "size": 8192}}
+
+    payload = {"code": "x = 1", "env": {"blob": descriptor}, **executor.policy_payload(2000)}
+    # External payloads cannot name arena files at all.
+    external = dict(payload, buffers={"dir": str(tmp_path), "in": str(secret)})
+    result, _ = executor.execute_payload(external, timeout_ms=2000)
+    assert "without a usable arena" in result.error
+
+    # Even inside the shm directory, files without the arena prefix are neither read nor written.
+    payload = dict(payload, env={}, code="blob = bytes([1]) * 8192", buffers={"dir": str(tmp_path), "out": str(victim)})
+    result, updates = executor._execute_local(payload, timeout_ms=2000)
+    assert result.error is None and "b64" in updates["blob"]["__buffer__"]
+    assert victim.read_bytes() == b"\0" * 65536
@@ -0,0 +1,38 @@
+import pytest
+
+from rlm_mcp import sandbox
+from rlm_mcp.sandbox import SandboxExecutor, namespaces_supported
+
+
+def test_namespace_command_unshares_user_mount_net_and_pid():
+    cmd = SandboxExecutor(sandbox_mode="namespace")._build_namespace_command()
+    assert cmd[0] == "unshare"
+    for flag in ("--user", "--map-root-user", "--mount", "--net", "--pid", "--fork", "--mount-proc"):
+        assert flag in cmd
+
+
+@pytest.mark.skipif(not namespaces_supported(), reason="unprivileged user namespaces are not available")
+def test_namespace_mode_runs_worker_in_jail():
+    executor = SandboxExecutor(sandbox_mode="namespace", fallback_to_subprocess=False)
+    env = {"x": 2}
+    out = executor.run("print(x)\ny = x + 3", env)
+    assert out.error is None
+    assert out.stdout == "2\n"
+    assert env["y"] == 5
+
+
+def test_namespace_mode_falls_back_when_unsupported(monkeypatch):
+    monkeypatch.setattr(sandbox, "namespaces_supported", lambda: False)
+    executor = SandboxExecutor(sandbox_mode="namespace", fallback_to_subprocess=True)
+    env = {"x": 2}
+    out = executor.run("y = x + 3", env)
+    assert out.error is None
+    assert env["y"] == 5
+
+
+def test_namespace_mode_without_fallback_reports_unavailable(monkeypatch):
+    monkeypatch.setattr(sandbox, "namespaces_supported", lambda: False)
+    executor = SandboxExecutor(sandbox_mode="namespace", fallback_to_subprocess=False)
+    out = executor.run("x = 1", {})
+    assert out.error is not None
+    assert "NamespaceUnavailableError" in out.error
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+
+import pytest
+
+from rlm_mcp import subinterpreter
+from rlm_mcp.sandbox import SandboxExecutor
+from rlm_mcp.subinterpreter import SubinterpreterPool, SubinterpreterPoolExhaustedError, subinterpreters_supported
+
+requires_subinterpreters = pytest.mark.skipif(
+    not subinterpreters_supported(),
+    reason="isolated subinterpreters require CPython 3.12+",
+)
+
+
+def test_rejects_unknown_sandbox_mode():
+    with pytest.raises(ValueError):
+        SandboxExecutor(sandbox_mode="threads")
+
+
+@pytest.mark.skipif(subinterpreters_supported(), reason="exercises the unsupported-interpreter path")
+def test_subinterpreter_mode_falls_back_to_subprocess_when_unsupported():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=True)
+    env = {"x": 2}
+    out = executor.run("y = x + 3", env)
+    assert out.error is None
+    assert env["y"] == 5
+
+
+@pytest.mark.skipif(subinterpreters_supported(), reason="exercises the unsupported-interpreter path")
+def test_subinterpreter_mode_without_fallback_reports_unavailable():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=False)
+    out = executor.run("x = 1", {})
+    assert out.error is not None
+    assert "SubinterpreterUnavailableError" in out.error
+
+
+@requires_subinterpreters
+def test_subinterpreter_mode_runs_on_pooled_interpreters():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=False)
+    env = {"x": 2}
+    assert executor.run("print(x)\ny = x + 3", env).stdout == "2\n"
+    assert executor.run("z = y * 2", env).error is None
+    assert env["z"] == 10
+    assert "blocked by sandbox policy" in executor.run("import os", env).stderr
+
+
+@requires_subinterpreters
+def test_module_state_does_not_leak_between_subinterpreter_runs():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=False, subinterpreter_pool_size=1)
+    env = {}
+    assert executor.run("import json\njson.dumps = lambda *a, **k: '{}'", env).error is None
+    out = executor.run("print('still here')\ny = 2", env)
+    assert out.error is None and out.stdout == "still here\n" and env["y"] == 2
+    assert executor.run("import json\nprint(json.dumps([1]))", {}).stdout == "[1]\n"
+
+    assert executor.run("import re\nre.leak = 7", {}).error is None
+    probe = "import re\ntry:\n    print(re.leak)\nexcept Exception:\n    print('clean')"
+    assert executor.run(probe, {}).stdout == "clean\n"
+
+
+@requires_subinterpreters
+def test_subinterpreter_watchdog_stops_runaway_loop():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=False)
+    env = {}
+    out = executor.run("try:\n    while True:\n        pass\nexcept BaseException:\n    pass\nafter = 1", env, timeout_ms=300)
+    assert out.error is not None
+    assert "TimeoutError" in out.error
+    assert "after" not in env
+
+
+@requires_subinterpreters
+def test_subinterpreter_reports_thread_cpu_time():
+    executor = SandboxExecutor(sandbox_mode="subinterpreter", fallback_to_subprocess=False)
+    out = executor.run("t = 0\nfor i in range(500_000):\n    t += i", {})
+    assert out.error is None
+    assert out.cpu_ms > 0
+
+
+def test_timed_out_interpreter_is_replaced_and_stuck_ones_are_capped(monkeypatch):
+    # Fake interpreters so the pool bookkeeping runs on any CPython.
+    monkeypatch.setattr(subinterpreter, "_interpreters", object())
+    monkeypatch.setattr(subinterpreter, "_JOIN_GRACE_SECONDS", 0.0)
+    unstick = threading.Event()
+    created: list[int] = []
+    destroyed: list[int] = []
+
+    def fake_create() -> int:
+        created.append(len(created))
+        return created[-1]
+
+    def fake_exec(interp_id, script, shared):
+        if script == subinterpreter._RUN_SCRIPT:
+            if json.loads(shared["_rlm_payload"]).get("stuck"):
+                unstick.wait()
+            os.write(shared["_rlm_fd"], b'{"interp": %d}' % interp_id)
+
+    monkeypatch.setattr(SubinterpreterPool, "_create", staticmethod(fake_create))
+    monkeypatch.setattr(SubinterpreterPool, "_exec", staticmethod(fake_exec))
+    monkeypatch.setattr(SubinterpreterPool, "_destroy", staticmethod(destroyed.append))
+    pool = SubinterpreterPool("", size=1, max_abandoned=2)
+
+    def join(name):
+        for thread in threading.enumerate():
+            if thread.name == name:
+                thread.join(5)
+
+    try:
+        with pytest.raises(TimeoutError):
+            pool.run({"stuck": True}, timeout_ms=1)
+        assert pool.run({}, timeout_ms=1000) == {"interp": 1}
+        # The used interpreter is destroyed and a fresh one is warmed in its place.
+        join("rlm-subinterpreter-warm")
+        assert destroyed == [1] and pool._idle == [2]
+        with pytest.raises(TimeoutError):
+            pool.run({"stuck": True}, timeout_ms=1)
+        assert pool.abandoned == 2
+        with pytest.raises(SubinterpreterPoolExhaustedError):
+            pool.run({}, timeout_ms=1000)
+
+        unstick.set()
+        join("rlm-subinterpreter")
+        assert pool.run({}, timeout_ms=1000) == {"interp": 3}
+        join("rlm-subinterpreter-warm")
+        assert sorted(destroyed) == [0, 1, 2, 3] and pool._idle == [4]
+    finally:
+        unstick.set()
+        pool.close()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+from rlm_mcp.scheduler import AdmissionScheduler
+
+
+def _queue_runs(scheduler, runs, order):
+    threads = []
+    for client_id, session_id, priority in runs:
+
+        def target(client_id=client_id, session_id=session_id, priority=priority):
+            with scheduler.admit(client_id=client_id, session_id=session_id, priority=priority):
+                order.append(session_id)
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        threads.append(thread)
+        while scheduler.stats()["queue_depth"] < len(threads):
+            time.sleep(0.001)
+    return threads
+
+
+def _admission_order(scheduler, runs):
+    order = []
+    with scheduler.admit(client_id="holder", session_id="holder"):
+        threads = _queue_runs(scheduler, runs, order)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_clients_are_served_round_robin():
+    scheduler = AdmissionScheduler(max_concurrent=1, max_memory_bytes=1 << 30, max_queue=8, max_wait_seconds=5)
+    runs = [("a", "a1", 0.0), ("a", "a2", 0.0), ("a", "a3", 0.0), ("b", "b1", 0.0)]
+    assert _admission_order(scheduler, runs) == ["a1", "b1", "a2", "a3"]
+
+
+def test_sessions_close_to_finishing_go_first():
+    scheduler = AdmissionScheduler(max_concurrent=1, max_memory_bytes=1 << 30, max_queue=8, max_wait_seconds=5)
+    runs = [("a", "fresh", 0.0), ("a", "almost-done", 0.9)]
+    assert _admission_order(scheduler, runs) == ["almost-done", "fresh"]
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = AdmissionScheduler(max_concurrent=1, max_memory_bytes=1 << 30, max_queue=0, max_wait_seconds=5)
+    with scheduler.admit(client_id="a", session_id="s1"):
+        with pytest.raises(RlmMcpError) as excinfo:
+            with scheduler.admit(client_id="b", session_id="s2"):
+                pass
+    assert excinfo.value.code == ErrorCode.SERVER_BUSY
+    assert excinfo.value.retry_after_seconds >= 1.0
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_memory_cap_and_wait_timeout():
+    scheduler = AdmissionScheduler(max_concurrent=4, max_memory_bytes=300, max_queue=8, max_wait_seconds=0.05)
+    with scheduler.admit(client_id="a", session_id="s1", memory_bytes=200):
+        with pytest.raises(RlmMcpError) as excinfo:
+            with scheduler.admit(client_id="a", session_id="s2", memory_bytes=200):
+                pass
+    assert excinfo.value.code == ErrorCode.SERVER_BUSY
+    stats = scheduler.stats()
+    assert stats["timed_out"] == 1
+    assert stats["active"] == 0
+    assert stats["reserved_memory_bytes"] == 0
+
+
+def test_shards_split_host_limits_across_server_processes():
+    shards = [
+        AdmissionScheduler(max_concurrent=5, max_memory_bytes=900, max_queue=10, shard=(index, 3)) for index in range(3)
+    ]
+    assert [scheduler.max_concurrent for scheduler in shards] == [2, 2, 1]
+    assert sum(scheduler.max_memory_bytes for scheduler in shards) == 900
+    assert sum(scheduler.max_queue for scheduler in shards) == 10
+    assert AdmissionScheduler(max_concurrent=2, max_memory_bytes=900, shard=(3, 4)).max_concurrent == 1
@@ -1,6 +1,116 @@
+import asyncio
+import time
+
+from rlm_mcp.sandbox import SandboxResult
+from rlm_mcp.scheduler import AdmissionScheduler
 from rlm_mcp.server import build_mcp_app
+from rlm_mcp.service import RlmMcpService
 
 
 def test_build_mcp_app_constructs_without_annotation_errors():
     app = build_mcp_app()
     assert app is not None
+
+
+def _slow_service(delay, **scheduler):
+    svc = RlmMcpService(scheduler=AdmissionScheduler(max_memory_bytes=1 << 40, **scheduler))
+
+    def slow_run(code, env, **kwargs):
+        time.sleep(delay)
+        return SandboxResult(stdout="done\n", stderr="", error=None)
+
+    svc.sandbox.run = slow_run
+    return svc
+
+
+async def _call(app, tool, **params):
+    _, structured = await app.call_tool(tool, {"params": params})
+    return structured
+
+
+def test_tool_calls_run_off_the_event_loop():
+    app = build_mcp_app(_slow_service(0.5, max_concurrent=4))
+
+    async def scenario():
+        sessions = [(await _call(app, "rlm_init_context", context_text="ctx"))["data"]["session_id"] for _ in range(4)]
+        started = time.monotonic()
+        runs = [asyncio.create_task(_call(app, "rlm_run_repl", session_id=sid, code="x = 1")) for sid in sessions]
+        await asyncio.sleep(0.2)
+        # The loop still answers while every run is inside the sandbox.
+        stats = await _call(app, "rlm_scheduler_stats")
+        results = await asyncio.gather(*runs)
+        return stats, results, time.monotonic() - started
+
+    stats, results, elapsed = asyncio.run(scenario())
+    assert stats["data"]["active"] == 4
+    assert all(result["ok"] and result["data"]["stdout"] == "done\n" for result in results)
+    assert elapsed < 1.5
+
+
+def test_runs_beyond_the_queue_get_server_busy_with_a_retry_hint():
+    app = build_mcp_app(_slow_service(0.3, max_concurrent=1, max_queue=1))
+
+    async def scenario():
+        sessions = [(await _call(app, "rlm_init_context", context_text="ctx"))["data"]["session_id"] for _ in range(4)]
+        return await asyncio.gather(*(_call(app, "rlm_run_repl", session_id=sid, code="x = 1") for sid in sessions))
+
+    results = asyncio.run(scenario())
+    done = [result for result in results if result["ok"]]
+    busy = [result["error"] for result in results if not result["ok"]]
+    # One run in the sandbox, one queued behind it, the rest turned away instead of piling up.
+    assert len(done) == 2
+    assert len(busy) == 2
+    assert all(error["code"] == "SERVER_BUSY" and error["retry_after_seconds"] >= 1.0 for error in busy)
+
+
+def test_queued_runs_are_admitted_fairly_across_clients():
+    svc = _slow_service(0.1, max_concurrent=1)
+    order = []
+    slow_run = svc.sandbox.run
+
+    def recording_run(code, env, **kwargs):
+        order.append(code)
+        return slow_run(code, env, **kwargs)
+
+    svc.sandbox.run = recording_run
+    app = build_mcp_app(svc)
+
+    async def scenario():
+        async def session(client_id):
+            response = await _call(app, "rlm_init_context", context_text="ctx", client_id=client_id)
+            return response["data"]["session_id"]
+
+        busy_client = [await session("a") for _ in range(4)]
+        quiet_client = await session("b")
+        runs = []
+        for index, sid in enumerate(busy_client):
+            runs.append(asyncio.create_task(_call(app, "rlm_run_repl", session_id=sid, code=f"a{index} = 1")))
+            await asyncio.sleep(0.02)
+        runs.append(asyncio.create_task(_call(app, "rlm_run_repl", session_id=quiet_client, code="b0 = 1")))
+        return await asyncio.gather(*runs)
+
+    results = asyncio.run(scenario())
+    assert all(result["ok"] for result in results)
+    # Client b arrived last but is served right after the run already in the sandbox.
+    assert order.index("b0 = 1") <= 2
+
+
+def test_child_sessions_of_one_parent_run_at_the_same_time():
+    app = build_mcp_app(_slow_service(0.5, max_concurrent=2))
+
+    async def scenario():
+        parent = (await _call(app, "rlm_init_context", context_text="abcdefgh" * 50))["data"]["session_id"]
+        children = [
+            (await _call(app, "rlm_spawn_child", session_id=parent, budget=1_000, start=start, end=start + 200))["data"]
+            for start in (0, 200)
+        ]
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(_call(app, "rlm_run_repl", session_id=child["session_id"], code="x = 1") for child in children)
+        )
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(scenario())
+    assert all(result["ok"] and result["data"]["stdout"] == "done\n" for result in results)
+    # Both children were in the sandbox together rather than one after the other.
+    assert elapsed < 0.9
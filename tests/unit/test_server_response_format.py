@@ -1,4 +1,6 @@
-from rlm_mcp.server import ResponseFormat, _tool_error, _tool_success
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+from rlm_mcp.server import ResponseFormat, RlmMcpServer, _tool_error, _tool_success
+from rlm_mcp.service import RlmMcpService
 
 
 def test_tool_success_json_format():
@@ -21,3 +23,82 @@ def test_tool_error_markdown_format_contains_next_step():
     assert out["ok"] is False
     assert out["format"] == "markdown"
     assert "Next step:" in out["markdown"]
+
+
+def test_tool_error_reports_retry_after_for_busy_server():
+    exc = RlmMcpError(ErrorCode.SERVER_BUSY, "sandbox queue is full", retry_after_seconds=2.5)
+    out = _tool_error(exc, response_format=ResponseFormat.JSON)
+    assert out["error"]["code"] == "SERVER_BUSY"
+    assert out["error"]["retry_after_seconds"] == 2.5
+
+
+def test_cached_read_reuses_rendered_response_until_the_session_changes():
+    server = RlmMcpServer(RlmMcpService())
+    sid = server.init_context(context_text="hello")["session_id"]
+    reads = []
+
+    def read(if_version=None):
+        return server.cached_read(
+            "rlm_get_var",
+            sid,
+            {"var_name": "context"},
+            lambda: reads.append(1) or server.get_var(sid, "context"),
+            response_format=ResponseFormat.MARKDOWN,
+            if_version=if_version,
+        )
+
+    first = read()
+    assert read() is first and len(reads) == 1
+    assert read(if_version=first["version"]) == {
+        "ok": True,
+        "format": "markdown",
+        "version": first["version"],
+        "not_modified": True,
+        "markdown": f"Not modified since version {first['version']}.",
+    }
+
+    server.run_repl(sid, "x = 1")
+    fresh = read(if_version=first["version"])
+    assert fresh["version"] > first["version"] and fresh["data"]["value"] == "hello"
+    assert len(reads) == 2
+
+
+def test_cached_reads_keep_the_version_and_are_all_recorded(tmp_path, monkeypatch):
+    import json
+
+    from rlm_mcp.replay import TrajectoryRecorder
+    from rlm_mcp.session_store import SqliteSessionStore
+
+    recording = tmp_path / "trajectories.jsonl"
+    recorder = TrajectoryRecorder(str(recording))
+    service = RlmMcpService(SqliteSessionStore(str(tmp_path / "sessions.sqlite3")))
+    server = RlmMcpServer(service, recorder)
+    sid = server.init_context(context_text="# Title\n\nalpha beta\n\n## Part\n\ngamma\n")["session_id"]
+    version = service.session_version(sid)
+
+    def read(tool, args, method, if_version=None):
+        return server.cached_read(
+            tool,
+            sid,
+            args,
+            lambda: method(sid, **args),
+            response_format=ResponseFormat.JSON,
+            if_version=if_version,
+        )
+
+    first = read("rlm_outline", {"max_depth": None, "max_nodes": 500}, server.outline)
+    dedup_args = {"chunk_chars": None, "threshold": None, "max_clusters": 100}
+    dupes = read("rlm_find_duplicates", dedup_args, server.find_duplicates)
+    # Building the outline and dedup index lazily does not move the version.
+    assert first["version"] == dupes["version"] == version == service.session_version(sid)
+    assert read("rlm_outline", {"max_depth": None, "max_nodes": 500}, server.outline) is first
+    assert read("rlm_outline", {"max_depth": None, "max_nodes": 500}, server.outline, version)["not_modified"]
+    recorder.close()
+
+    events = [json.loads(line) for line in recording.read_text().splitlines()]
+    assert [event["tool"] for event in events] == ["rlm_init_context", "rlm_outline", "rlm_find_duplicates"] + [
+        "rlm_outline"
+    ] * 2
+    assert events[1]["args"] == {"session_id": sid, "max_depth": None, "max_nodes": 500}
+    # The index survives a reload from the store.
+    assert SqliteSessionStore(str(tmp_path / "sessions.sqlite3")).get_session(sid).outline is not None
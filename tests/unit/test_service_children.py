@@ -0,0 +1,70 @@
+import pickle
+
+import pytest
+
+from rlm_mcp.context_store import CompressedText, ContextView
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+from rlm_mcp.models import SessionConfig
+from rlm_mcp.service import RlmMcpService
+
+
+def test_context_view_reads_parent_in_place_and_pickles_only_the_slice():
+    text = "0123456789" * 10
+    view = ContextView.of(ContextView.of(text, 10, 60), 5, 25)
+    assert view.source is text and (view.start, view.end) == (15, 35)
+    assert view.text() == text[15:35] and view[-1] == text[34] and view[::5] == text[15:35:5]
+    restored = pickle.loads(pickle.dumps(view))
+    assert restored.text() == text[15:35] and len(restored.source) == 20
+    blocks = CompressedText.from_text(text, block_chars=16)
+    assert ContextView.of(blocks, 30, 70)[2:12] == text[32:42]
+
+
+def test_spawn_child_carves_budget_and_rolls_up_on_finalize():
+    svc = RlmMcpService()
+    context = "header\n" + "alpha beta gamma\n" * 10
+    sid = svc.init_context(context, SessionConfig(budget_limit=1000))
+    first = svc.spawn_child(sid, 7, 24, 400, label="first")
+    second = svc.spawn_child(sid, 24, None, 300)
+    assert first["parent_budget_remaining"] == 600 and second["parent_budget_remaining"] == 300
+    assert svc.store.get_session(first["session_id"]).context_blocks.source is context
+
+    out = svc.run_repl(first["session_id"], "words = len(context.split())")
+    assert out["step_index"] == 1
+    svc.finalize(first["session_id"], final_var_name="words")
+    parent = svc.store.get_session(sid)
+    used = svc.store.get_session(first["session_id"]).budget_used
+    assert parent.budget_used == 300 + used
+    assert parent.vars["child_results"] == {"first": "3"}
+    assert list(parent.children) == [second["session_id"]]
+
+    svc.finalize(first["session_id"], final_text="again")
+    assert svc.store.get_session(sid).vars["child_results"] == {"first": "3"}
+
+
+def test_spawn_child_rejects_budget_beyond_parent_remaining():
+    svc = RlmMcpService()
+    sid = svc.init_context("some context", SessionConfig(budget_limit=100))
+    svc.spawn_child(sid, 0, 4, 80)
+    with pytest.raises(RlmMcpError) as excinfo:
+        svc.spawn_child(sid, 0, 4, 30)
+    assert excinfo.value.code == ErrorCode.INVALID_INPUT
+    with pytest.raises(RlmMcpError):
+        svc.spawn_child(sid, 5, 50, 10)
+
+
+def test_sqlite_children_store_their_range_not_a_copy_of_the_text(tmp_path):
+    from rlm_mcp.session_store import SqliteSessionStore
+
+    path = str(tmp_path / "sessions.sqlite3")
+    svc = RlmMcpService(store=SqliteSessionStore(path))
+    context = "alpha beta gamma\n" * 2000
+    sid = svc.init_context(context, SessionConfig(budget_limit=100_000))
+    child = svc.spawn_child(sid, 100, 30_000, 1000)["session_id"]
+    grandchild = svc.spawn_child(child, 10, 20, 100)["session_id"]
+
+    (column,) = svc.store._conn.execute("SELECT context_text FROM sessions WHERE session_id = ?", (child,)).fetchone()
+    assert len(column) < 200
+    fresh = SqliteSessionStore(path)
+    view = fresh.get_session(grandchild).context_blocks
+    assert view.owner == sid and view.text() == context[110:120]
+    assert fresh.get_session(child).context_blocks.source is fresh.get_session(sid).context_text
@@ -1,3 +1,8 @@
+import os
+
+import pytest
+
+from rlm_mcp.errors import RlmMcpError
 from rlm_mcp.models import SessionConfig
 from rlm_mcp.service import RlmMcpService
 
@@ -7,3 +12,82 @@ def test_init_context_creates_session_and_get_var_reads_context():
     sid = svc.init_context("hello", SessionConfig())
     val = svc.get_var(sid, "context")
     assert val["value"] == "hello"
+
+
+def test_init_context_with_documents_exposes_docs_sequence():
+    svc = RlmMcpService()
+    sid = svc.init_context(
+        "",
+        documents=[
+            {"id": "d1", "text": "first doc", "metadata": {"source": "web"}},
+            {"id": "d2", "text": "second doc"},
+        ],
+    )
+    out = svc.run_repl(sid, "ids = [d.id for d in docs]\nsecond = docs['d2'].text\nsource = docs[0].metadata['source']")
+    assert "docs" not in out["updated_vars_summary"]
+    assert svc.get_var(sid, "ids")["value"] == ["d1", "d2"]
+    assert svc.get_var(sid, "second")["value"] == "second doc"
+    assert svc.get_var(sid, "source")["value"] == "web"
+
+    svc.run_repl(sid, "context = 'rebound'")
+    svc.run_repl(sid, "first = docs[0].text")
+    assert svc.get_var(sid, "first")["value"] == "first doc"
+
+
+def test_streaming_init_appends_chunks_and_seals():
+    svc = RlmMcpService()
+    sid = svc.init_context("", streaming=True)
+    with pytest.raises(RlmMcpError):
+        svc.run_repl(sid, "x = 1")
+
+    assert svc.append_context(sid, 0, "alpha ")["next_seq"] == 1
+    assert svc.append_context(sid, 0, "alpha ")["duplicate"] is True
+    with pytest.raises(RlmMcpError):
+        svc.append_context(sid, 2, "gamma")
+    svc.append_context(sid, 1, "beta")
+
+    assert svc.seal_context(sid) == {"chars": 10, "chunks": 2, "documents": None}
+    svc.run_repl(sid, "words = context.split()")
+    assert svc.get_var(sid, "words")["value"] == ["alpha", "beta"]
+    with pytest.raises(RlmMcpError):
+        svc.append_context(sid, 2, "late")
+
+
+def test_idle_and_stopped_uploads_release_their_temp_files():
+    svc = RlmMcpService(ingest_idle_seconds=60)
+    stale = svc.init_context("", streaming=True)
+    svc.append_context(stale, 0, "partial")
+    stale_path = svc.store.get_session(stale).ingest.path
+    svc.store.get_session(stale).ingest.touched_at -= 120
+
+    fresh = svc.init_context("", streaming=True)
+    assert not os.path.exists(stale_path)
+    session = svc.store.get_session(stale)
+    assert (session.status, session.finish_reason, session.ingest) == ("stopped", "ingest_idle_timeout", None)
+    with pytest.raises(RlmMcpError):
+        svc.append_context(stale, 1, "more")
+
+    fresh_session = svc.store.get_session(fresh)
+    fresh_path = fresh_session.ingest.path
+    svc._stop_session(fresh_session, "max_runtime")
+    assert not os.path.exists(fresh_path) and fresh_session.ingest is None
+
+
+def test_compressed_context_behaves_like_plain_context():
+    svc = RlmMcpService(context_compression="zlib")
+    sid = svc.init_context("", documents=[{"id": "a", "text": "alpha " * 5000}, {"id": "b", "text": "beta"}])
+    session = svc.store.get_session(sid)
+    assert session.context_text == ""
+    assert "context" not in session.vars
+
+    out = svc.run_repl(sid, "n = len(context)\nlast = docs['b'].text")
+    assert "context" in out["updated_vars_summary"]
+    assert "context" not in session.vars
+    assert svc.get_var(sid, "n")["value"] == len("alpha " * 5000) + len("\n\nbeta")
+    assert svc.get_var(sid, "last")["value"] == "beta"
+    preview = svc.get_var(sid, "context")
+    assert preview["truncated"] is True and preview["value"].startswith("alpha ")
+
+    svc.run_repl(sid, "context = context[:5]")
+    assert svc.get_var(sid, "context")["value"] == "alpha"
+    assert svc.finalize(sid, final_var_name="context")["final_answer"] == "alpha"
@@ -1,4 +1,8 @@
+import pytest
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
 from rlm_mcp.models import SessionConfig
+from rlm_mcp.scheduler import AdmissionScheduler
 from rlm_mcp.service import RlmMcpService
 
 
@@ -8,3 +12,52 @@ def test_run_repl_increments_step_and_updates_vars():
     out = svc.run_repl(sid, "result = context.upper()")
     assert out["step_index"] == 1
     assert svc.get_var(sid, "result")["value"] == "ABC"
+
+
+def test_run_repl_busy_scheduler_does_not_consume_step():
+    svc = RlmMcpService(scheduler=AdmissionScheduler(max_concurrent=1, max_queue=0))
+    sid = svc.init_context("ctx")
+    with svc.scheduler.admit(client_id="other", session_id="other"):
+        with pytest.raises(RlmMcpError) as excinfo:
+            svc.run_repl(sid, "x = 1")
+    assert excinfo.value.code == ErrorCode.SERVER_BUSY
+    assert svc.store.get_session(sid).step_index == 0
+    assert svc.run_repl(sid, "x = 1")["step_index"] == 1
+
+
+def test_run_repl_stores_large_output_behind_handle():
+    svc = RlmMcpService(inline_output_chars=50)
+    sid = svc.init_context("ctx")
+    out = svc.run_repl(sid, "for i in range(100):\n    print(f'line {i} é')")
+    handle = out["stdout_handle"]
+    assert out["stdout"] == "".join(f"line {i} é\n" for i in range(100))[:50]
+    assert handle["total_lines"] == 100 and out["stderr_handle"] is None
+
+    lines = svc.read_output(sid, handle["handle"], start_line=98, line_count=5)
+    assert lines["text"] == "line 98 é\nline 99 é\n"
+
+    pages, offset = [], 0
+    while offset is not None:
+        page = svc.read_output(sid, handle["handle"], offset=offset, length=17)
+        pages.append(page["text"])
+        offset = page["next_offset"]
+    assert "".join(pages) == "".join(f"line {i} é\n" for i in range(100))
+
+    with pytest.raises(RlmMcpError):
+        svc.read_output(sid, "step-9-stdout")
+    assert svc.run_repl(sid, "print('x' * 80)", max_inline_output_chars=0)["stdout_handle"] is None
+
+
+def test_run_repl_profile_summary_counts_toward_budget():
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx")
+    out = svc.run_repl(sid, "total = sum(range(1000))", profile="cpu")
+    summary = out["profile"]["summary"]
+    assert "top functions by cumulative time" in summary
+    assert svc.store.get_session(sid).budget_used == len("total = sum(range(1000))") + len(summary)
+    artifact = svc.read_output(sid, out["profile"]["artifact"]["handle"], length=100_000)
+    assert "cProfile" in artifact["text"]
+
+    with pytest.raises(RlmMcpError):
+        svc.run_repl(sid, "x = 1", profile="disk")
+    assert svc.run_repl(sid, "x = 1")["profile"] is None
@@ -1,8 +1,9 @@
 import pytest
 
+from rlm_mcp.context_store import CompressedText
 from rlm_mcp.errors import RlmMcpError
 from rlm_mcp.models import SessionConfig
-from rlm_mcp.session_store import InMemorySessionStore
+from rlm_mcp.session_store import InMemorySessionStore, SqliteSessionStore, shard_for
 
 
 def test_create_and_read_session_context():
@@ -16,3 +17,91 @@ def test_missing_session_raises():
     store = InMemorySessionStore()
     with pytest.raises(RlmMcpError):
         store.get_session("missing")
+
+
+def test_sqlite_store_shares_sessions_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SqliteSessionStore(path)
+    second = SqliteSessionStore(path)
+    sid = first.create_session("long context", SessionConfig())
+
+    session = first.get_session(sid)
+    session.vars["context"] = session.context_text
+    session.vars["n"] = 3
+    session.step_index = 1
+    first.save_session(session)
+
+    loaded = second.get_session(sid)
+    assert loaded.context_text == "long context"
+    assert loaded.vars == {"context": "long context", "n": 3}
+    assert loaded.step_index == 1
+    assert second.get_session(sid) is loaded
+
+    loaded.status = "finalized"
+    second.save_session(loaded)
+    assert first.get_session(sid).status == "finalized"
+
+
+def test_sqlite_store_missing_session_raises(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    with pytest.raises(RlmMcpError):
+        store.get_session("missing")
+
+
+def test_sharded_store_mints_ids_for_its_shard(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), shard=(2, 3))
+    for _ in range(5):
+        assert shard_for(store.create_session("ctx", SessionConfig()), 3) == 2
+
+
+def test_sqlite_store_persists_compressed_context(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    blocks = CompressedText.from_text("hello " * 100, block_chars=64)
+    sid = SqliteSessionStore(path).create_session("", SessionConfig(), context_blocks=blocks)
+    loaded = SqliteSessionStore(path).get_session(sid).context_blocks
+    assert loaded.text() == "hello " * 100
+
+
+def test_sqlite_store_reads_result_ranges(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    sid = store.create_session("ctx", SessionConfig())
+    store.put_result(sid, "step-1-stdout", b"one\ntwo\nthree")
+    size, starts = store.result_info(sid, "step-1-stdout")
+    assert (size, starts.tolist()) == (13, [0, 4, 8])
+    assert store.read_result(sid, "step-1-stdout", 4, 7) == b"two"
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_stored_results_are_bounded_per_session_and_deleted(tmp_path, kind):
+    if kind == "memory":
+        store = InMemorySessionStore(max_results_per_session=2)
+    else:
+        store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), max_results_per_session=2)
+    sid = store.create_session("ctx", SessionConfig())
+    other = store.create_session("ctx", SessionConfig())
+    for step in range(3):
+        store.put_result(sid, f"step-{step}-stdout", b"x" * (step + 1))
+    store.put_result(other, "step-0-stdout", b"kept")
+    with pytest.raises(RlmMcpError):
+        store.result_info(sid, "step-0-stdout")
+    assert store.result_info(sid, "step-2-stdout")[0] == 3
+
+    store.delete_results(sid)
+    with pytest.raises(RlmMcpError):
+        store.result_info(sid, "step-2-stdout")
+    assert store.read_result(other, "step-0-stdout", 0, 4) == b"kept"
+
+
+def test_session_version_advances_on_every_save(tmp_path):
+    store = InMemorySessionStore()
+    session = store.get_session(store.create_session("ctx", SessionConfig()))
+    store.save_session(session)
+    store.save_session(session)
+    assert session.version == 2
+
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SqliteSessionStore(path), SqliteSessionStore(path)
+    sid = first.create_session("ctx", SessionConfig())
+    session = first.get_session(sid)
+    first.save_session(session)
+    assert session.version == second.get_session(sid).version == 2
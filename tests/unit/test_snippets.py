@@ -0,0 +1,68 @@
+import pytest
+
+from rlm_mcp.models import SessionConfig
+from rlm_mcp.service import RlmMcpService
+from rlm_mcp.snippets import SnippetCompiler, SnippetRejectedError
+
+
+def test_rejects_syntax_error():
+    compiler = SnippetCompiler(("math",))
+    with pytest.raises(SnippetRejectedError) as exc_info:
+        compiler.compile("x = (")
+    assert exc_info.value.error.startswith("SyntaxError:")
+
+
+def test_rejects_blocked_imports_including_unguarded_blocks_and_relative():
+    compiler = SnippetCompiler(("math",))
+    for code in ("import os", "from os import path", "class A:\n    import socket", "from . import x"):
+        with pytest.raises(SnippetRejectedError) as exc_info:
+            compiler.compile(code)
+        assert "blocked by sandbox policy" in exc_info.value.error
+    assert compiler.compile("from math import fsum").code is not None
+
+
+def test_guarded_and_uncalled_imports_are_left_to_the_runtime_guard():
+    compiler = SnippetCompiler(("math",))
+    guarded = "try:\n    import numpy\nexcept ImportError:\n    numpy = None\n"
+    assert compiler.compile(guarded).code is not None
+    assert compiler.compile("def f():\n    import socket\nx = 1").code is not None
+
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx", SessionConfig(max_steps=5, max_runtime_ms=60000, budget_limit=10000))
+    out = svc.run_repl(sid, guarded + "fallback = numpy is None")
+    assert out["stderr"] == ""
+    assert svc.get_var(sid, "fallback")["value"] is True
+
+
+def test_caches_compiled_code_by_hash():
+    compiler = SnippetCompiler(("math",), max_entries=1)
+    first = compiler.compile("x = 1")
+    assert compiler.compile("x = 1") is first
+    assert compiler.hits == 1
+    compiler.compile("y = 2")
+    assert compiler.compile("x = 1") is not first
+
+
+def test_rejected_snippet_is_charged_without_spawning_sandbox():
+    svc = RlmMcpService()
+    sid = svc.init_context("ctx", SessionConfig(max_steps=5, max_runtime_ms=60000, budget_limit=10000))
+
+    def fail_run(*args, **kwargs):
+        raise AssertionError("sandbox must not be spawned")
+
+    svc.sandbox.run = fail_run
+    out = svc.run_repl(sid, "import os\nx = 1")
+    assert "blocked by sandbox policy" in out["stderr"]
+    assert out["step_index"] == 1
+    session = svc.store.get_session(sid)
+    assert session.budget_used > 0
+    assert session.trace[-1]["result_status"] == "error"
+
+
+def test_worker_reuses_marshalled_code_object():
+    compiler = SnippetCompiler(("math",))
+    svc = RlmMcpService()
+    env = {}
+    out = svc.sandbox.run("origin = 'source'", env, compiled=compiler.compile("origin = 'cached'"))
+    assert out.error is None
+    assert env["origin"] == "cached"
@@ -0,0 +1,83 @@
+import os
+
+from rlm_mcp.errors import ErrorCode, RlmMcpError
+from rlm_mcp.models import SessionConfig
+from rlm_mcp.service import RlmMcpService
+from rlm_mcp.session_store import SqliteSessionStore
+from rlm_mcp.spill import BlobStore, SpilledVar, SpillManager, estimate_size
+
+
+def test_blob_store_round_trips_values_and_estimates_size(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    value = {"rows": [f"line {i}" for i in range(5000)]}
+    ref = blobs.put("sid", value, estimated_bytes=estimate_size(value))
+    assert ref.type_name == "dict" and ref.size_bytes < ref.estimated_bytes
+    assert blobs.load(ref) == value
+    blobs.discard(ref)
+    assert os.listdir(tmp_path / "sid") == []
+
+
+def test_large_vars_spill_and_load_only_when_needed(tmp_path):
+    spill = SpillManager(BlobStore(str(tmp_path)), threshold_bytes=10_000, memory_budget_bytes=0)
+    svc = RlmMcpService(spill=spill)
+    sid = svc.init_context("ctx")
+    svc.run_repl(sid, "rows = [str(i) * 20 for i in range(2000)]\nsmall = 1")
+    session = svc.store.get_session(sid)
+    assert isinstance(session.vars["rows"], SpilledVar) and session.vars["small"] == 1
+
+    loads = []
+    original_load = spill.blobs.load
+    spill.blobs.load = lambda ref: loads.append(ref) or original_load(ref)
+    svc.run_repl(sid, "small += 1")
+    assert loads == [] and isinstance(session.vars["rows"], SpilledVar)
+    out = svc.run_repl(sid, "print(len(rows))")
+    assert out["stdout"] == "2000\n" and len(loads) == 1
+    assert svc.get_var(sid, "rows")["spilled_bytes"] == session.vars["rows"].size_bytes
+    assert svc.finalize(sid, final_var_name="small")["final_answer"] == "2"
+
+
+def test_vars_stay_in_memory_within_budget_and_spill_across_processes(tmp_path):
+    svc = RlmMcpService(spill=SpillManager(BlobStore(str(tmp_path)), threshold_bytes=10_000))
+    sid = svc.init_context("ctx")
+    svc.run_repl(sid, "rows = [str(i) * 20 for i in range(2000)]")
+    assert isinstance(svc.store.get_session(sid).vars["rows"], list)
+
+    path = str(tmp_path / "sessions.db")
+    writer = RlmMcpService(
+        SqliteSessionStore(path),
+        spill=SpillManager(BlobStore(path + ".blobs"), threshold_bytes=10_000, memory_budget_bytes=0),
+    )
+    sid = writer.init_context("ctx")
+    writer.run_repl(sid, "rows = list(range(500))")
+    reader = RlmMcpService(SqliteSessionStore(path))
+    assert reader.get_var(sid, "rows")["value"][:3] == [0, 1, 2]
+
+
+def test_finished_sessions_give_back_their_spill_budget(tmp_path):
+    spill = SpillManager(BlobStore(str(tmp_path)), threshold_bytes=10_000, memory_budget_bytes=300_000)
+    svc = RlmMcpService(spill=spill)
+    make_rows = "rows = [str(i) * 20 for i in range(2000)]"
+
+    first = svc.init_context("ctx")
+    svc.run_repl(first, make_rows)
+    svc.run_repl(first, make_rows.replace("rows", "more"))
+    assert isinstance(svc.store.get_session(first).vars["rows"], SpilledVar)
+    assert os.listdir(tmp_path / first)
+    svc.finalize(first, final_text="done")
+    assert spill.resident_bytes == 0 and not (tmp_path / first).exists()
+    try:
+        svc.get_var(first, "rows")
+    except RlmMcpError as exc:
+        assert exc.code == ErrorCode.INVALID_INPUT
+    else:
+        raise AssertionError("released variable still loaded")
+
+    # Later sessions get the whole budget back instead of spilling at once.
+    second = svc.init_context("ctx", SessionConfig(max_steps=1))
+    svc.run_repl(second, make_rows)
+    assert isinstance(svc.store.get_session(second).vars["rows"], list)
+    assert svc.store.get_session(second).status == "stopped" and spill.resident_bytes == 0
+    third = svc.init_context("ctx")
+    svc.run_repl(third, make_rows)
+    assert isinstance(svc.store.get_session(third).vars["rows"], list)
+    assert svc.finalize(second, final_var_name="rows")["final_answer"].startswith("['000")
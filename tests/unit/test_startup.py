@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import rlm_mcp
+from rlm_mcp import sandbox
+from rlm_mcp.sandbox import SandboxExecutor
+
+
+def test_server_defers_service_and_replay_until_first_tool_call():
+    probe = (
+        "import sys\n"
+        "from rlm_mcp.server import RlmMcpServer\n"
+        "server = RlmMcpServer()\n"
+        "print('rlm_mcp.service' in sys.modules, 'rlm_mcp.replay' in sys.modules)\n"
+        "server.init_context('alpha beta')\n"
+        "print('rlm_mcp.service' in sys.modules)\n"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "RLM_RECORD_TRAJECTORIES"}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(rlm_mcp.__file__))
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, env=env, check=True)
+    assert out.stdout.split() == ["False", "False", "True"]
+
+
+def test_subprocess_worker_runs_from_cached_bytecode(tmp_path, monkeypatch):
+    monkeypatch.setenv("RLM_WORKER_CACHE_DIR", str(tmp_path))
+    sandbox.worker_bytecode_path.cache_clear()
+    try:
+        path = sandbox.worker_bytecode_path()
+        assert os.path.dirname(path) == str(tmp_path) and path.endswith(".pyc")
+        command = SandboxExecutor()._build_subprocess_command()
+        assert command[-1] == path and "-S" in command
+
+        env = {"context": "alpha beta gamma"}
+        result = SandboxExecutor().run("from rlm_tools import grep\nhits = len(grep(context, 'beta'))", env)
+        assert result.error is None
+        assert env["hits"] == 1
+        # A second lookup reuses the file already written.
+        sandbox.worker_bytecode_path.cache_clear()
+        assert sandbox.worker_bytecode_path() == path
+    finally:
+        sandbox.worker_bytecode_path.cache_clear()
+
+
+def test_writing_worker_bytecode_prunes_files_of_older_sources(tmp_path, monkeypatch):
+    monkeypatch.setenv("RLM_WORKER_CACHE_DIR", str(tmp_path))
+    tag = sys.implementation.cache_tag
+    stale = tmp_path / f"_worker.0123456789abcdef.{tag}.pyc"
+    other_python = tmp_path / "_worker.0123456789abcdef.cpython-399.pyc"
+    module_cache = tmp_path / f"_worker.{tag}.pyc"
+    for leftover in (stale, other_python, module_cache):
+        leftover.write_bytes(b"old")
+    sandbox.worker_bytecode_path.cache_clear()
+    try:
+        path = sandbox.worker_bytecode_path()
+        assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(path), other_python.name, module_cache.name])
+
+        # A server with another worker source pruned ours; the next spawn writes it again.
+        os.unlink(path)
+        assert sandbox._worker_invocation() == [path] and os.path.exists(path)
+    finally:
+        sandbox.worker_bytecode_path.cache_clear()